@@ -1,21 +1,20 @@
 import os
+import sys
+import time
+import importlib
 import streamlit as st
 
-try:
-    from docx import Document
-except ImportError:
-    st.error("Required package 'python-docx' is not installed. Please install it using: pip install python-docx")
-    st.stop()
-
-try:
-    import google.generativeai as genai
-except ImportError:
-    st.error("Required package 'google-generativeai' is not installed. Please install it using: pip install google-generativeai")
-    st.stop()
+# The engine imports these only when it needs them (python-docx to read sample_scripts.docx,
+# google-generativeai in GeminiProvider), so check up front to show how to install them
+for module, package in (("docx", "python-docx"), ("google.generativeai", "google-generativeai")):
+    try:
+        importlib.import_module(module)
+    except ImportError:
+        st.error(f"Required package '{package}' is not installed. Please install it using: pip install {package}")
+        st.stop()
 
 import io
 import markdown
-import base64
 
 try:
     from xhtml2pdf import pisa
@@ -24,70 +23,60 @@ except ImportError:
     pisa = None
 
 # ----------------------------
-# 1. Load Reference Scripts from DOCX
+# 1. Shared Generation Engine (backend/engine)
 # ----------------------------
-def load_sample_scripts(file_path="streamlit/sample_scripts.docx"):
-    if not os.path.exists(file_path):
-        return []
-    document = Document(file_path)
-    scripts = [p.text.strip() for p in document.paragraphs if p.text.strip()]
-    return scripts
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "backend"))
 
-sample_scripts = load_sample_scripts()  # Reads from streamlit/sample_scripts.docx
+from engine import ChannelRegistry, GeminiProvider, JobRunner, ScriptEngine
 
-# ----------------------------
-# 2. Load Prompt from TXT
-# ----------------------------
-def load_prompt(file_path="streamlit/prompt.txt"):
-    if not os.path.exists(file_path):
-        return ""
-    with open(file_path, "r", encoding="utf-8") as file:
-        return file.read()
+@st.cache_resource(show_spinner=False)
+def get_engine():
+    """One engine per process, so the corpus index, Gemini client and metrics are shared by every session"""
+    registry = ChannelRegistry(
+        channels_dir=os.path.join(BASE_DIR, "backend", "channels"),
+        default_dir=os.path.join(BASE_DIR, "streamlit"),  # sample_scripts.docx and prompt files
+    )
+    # A failed generation shows its error (the job fails) rather than a template script
+    return ScriptEngine(registry, providers=[GeminiProvider(st.secrets["google_api"])], template_fallback=False)
 
-# Load the prompt from the external file
-base_prompt = load_prompt()
+@st.cache_resource(show_spinner=False)
+def get_job_runner():
+    """One generation queue per process: at most GENERATION_WORKERS scripts generate at once across all editors"""
+    return JobRunner(get_engine(), max_workers=int(os.getenv("GENERATION_WORKERS", "4")))
 
-# ----------------------------
-# 3. YouTube Script Generation Function
-# ----------------------------
-def generate_youtube_script(topic):
-    """
-    Generates a YouTube script using Gemini 2.0 Flash.
-    It uses a base prompt with a preset context and (optionally) a reference excerpt.
-    """
-    # Optionally find a reference excerpt from the sample scripts
-    reference = ""
-    if sample_scripts:
-        reference = max(sample_scripts, key=lambda s: s.lower().count(topic.lower()))
-    
-    # Append the topic to the base prompt
-    full_prompt = base_prompt + "\n\nThe topic of the script is: {}.".format(topic)
-    
-    if reference:
-        full_prompt += "\n\nReference Script Excerpts:\n" + reference + "\n\n"
-    
-    try:
-        response = model.generate_content(full_prompt)
-        if response.text:
-            return response.text.strip()
-        else:
-            return "No content generated. Please try again."
-    except Exception as e:
-        return f"Error generating script: {e}"
+engine = get_engine()
+job_runner = get_job_runner()
 
 # ----------------------------
-# 4. Configure Gemini 2.0 Flash API
-
-api_key = st.secrets["google_api"]
+# 2. YouTube Script Generation Jobs
+# ----------------------------
+# Sidebar "Script Length" choices mapped to the engine's video types
+VIDEO_TYPES = {"Short": "short", "Medium": "long", "Long": "long"}
 
-# Configure the API
-genai.configure(api_key=api_key)
+# How often the page refreshes while this session has scripts generating
+JOB_POLL_SECONDS = 1.0
 
-# Initialize the model
-model = genai.GenerativeModel("gemini-2.0-flash")
+def collect_finished_jobs():
+    """Move finished jobs into the current script and history; returns the jobs still running"""
+    running = []
+    for job in st.session_state.jobs:
+        if not job.done:
+            running.append(job)
+        elif job.status == "failed":
+            st.error(f"Could not generate a script for '{job.topic}': {job.error}")
+        else:
+            # Only the best version goes to the history; the others can be swapped in below
+            st.session_state.current_script = job.results[0].script
+            st.session_state.current_topic = job.topic
+            st.session_state.script_variants = [result.script for result in job.results[1:]]
+            st.session_state.script_history.append(job.results[0].script)
+            st.success(f"Script for '{job.topic}' generated successfully!")
+    st.session_state.jobs = running
+    return running
 
 # ----------------------------
-# 5. Helper Functions for Markdown and PDF Conversion
+# 3. Helper Functions for Markdown and PDF Conversion
 # ----------------------------
 def convert_markdown_to_html(markdown_text):
     """Convert markdown text to HTML for preview display with enhanced styling"""
@@ -264,8 +253,9 @@ def convert_html_to_pdf(source_html):
     result_file.seek(0)
     return result_file.getvalue()
 
+@st.cache_data(show_spinner=False, max_entries=32)
 def markdown_to_pdf(markdown_text):
-    """Convert markdown to PDF"""
+    """Convert markdown to PDF (cached by content: the download button re-renders on every rerun)"""
     # First convert markdown to HTML (without the style tags for xhtml2pdf)
     html = markdown.markdown(markdown_text)
     
@@ -273,7 +263,7 @@ def markdown_to_pdf(markdown_text):
     return convert_html_to_pdf(html)
 
 # ----------------------------
-# 6. Streamlit App Layout & Settings
+# 4. Streamlit App Layout & Settings
 # ----------------------------
 st.set_page_config(page_title="YouTube Script Generator", page_icon="🎬")
 st.title("🎬 YouTube Script Generator")
@@ -282,35 +272,48 @@ st.caption("Powered by Gemini 2.0 Flash with Retrieval-Augmented Generation")
 # Sidebar: Additional Settings
 st.sidebar.header("Settings")
 script_length = st.sidebar.selectbox("Script Length", ["Short", "Medium", "Long"])
-# (You could further modify the prompt based on the chosen length)
+# (Sets the video type, see VIDEO_TYPES; every length uses prompt.txt, see streamlit/channel.json)
+variant_count = st.sidebar.slider("Variants per click", 1, 4, 1,
+                                  help="Generate several versions in one request and show the best first")
 
 # ----------------------------
-# 7. Session State & Script Storage
+# 5. Session State & Script Storage
 # ----------------------------
 if "current_script" not in st.session_state:
     st.session_state.current_script = ""
 if "script_history" not in st.session_state:
     st.session_state.script_history = []
+if "script_variants" not in st.session_state:
+    st.session_state.script_variants = []
+if "jobs" not in st.session_state:
+    st.session_state.jobs = []
 
 if st.button("🆕 New Script"):
     st.session_state.current_script = ""
     st.session_state.script_history = []
+    st.session_state.script_variants = []
     st.experimental_set_query_params(new_script="true")
 
 # ----------------------------
-# 8. Topic Input and Script Generation
+# 6. Topic Input and Script Generation
 # ----------------------------
 topic_input = st.text_input("Enter the topic for your YouTube script:")
 
 if st.button("Generate Script") and topic_input:
-    with st.spinner("Generating script..."):
-        generated_script = generate_youtube_script(topic_input)
-    st.session_state.current_script = generated_script
-    st.session_state.script_history.append(generated_script)
-    st.success("Script generated successfully!")
+    # Queued on the shared runner: the page stays usable and more topics can be queued meanwhile
+    try:
+        st.session_state.jobs.append(job_runner.submit(topic_input, VIDEO_TYPES[script_length], candidates=variant_count))
+    except RuntimeError:
+        st.warning("Too many scripts are generating right now, please try again in a moment.")
+
+running_jobs = collect_finished_jobs()
+for job in running_jobs:
+    label = "waiting for a free slot" if job.status == "queued" else "generating"
+    with st.expander(f"⏳ {job.topic} ({label}, {job.elapsed:.0f}s)", expanded=job.status == "running"):
+        st.markdown(job.text + " ▌" if job.text else "...")
 
 # ----------------------------
-# 9. Display the Generated Script and Download Option
+# 7. Display the Generated Script and Download Option
 # ----------------------------
 if st.session_state.current_script:
     st.subheader("Generated Script:")
@@ -356,8 +359,18 @@ if st.session_state.current_script:
         except Exception as e:
             st.error(f"Could not generate PDF: {str(e)}")
 
+    # Other versions from the same click, next best first
+    if st.session_state.script_variants:
+        with st.expander(f"Other versions ({len(st.session_state.script_variants)})", expanded=False):
+            for idx, variant in enumerate(st.session_state.script_variants):
+                st.text_area(f"Version {idx + 2}", variant, height=150, key=f"variant_{idx}")
+                if st.button(f"Use Version {idx + 2}", key=f"use_variant_{idx}"):
+                    st.session_state.script_variants[idx] = st.session_state.current_script
+                    st.session_state.current_script = variant
+                    st.experimental_rerun()
+
 # ----------------------------
-# 10. Modify a Specific Paragraph
+# 8. Modify a Specific Paragraph
 # ----------------------------
 if st.session_state.current_script:
     st.subheader("Modify a Specific Paragraph")
@@ -375,9 +388,30 @@ if st.session_state.current_script:
             st.session_state.current_script = updated_full_script
             st.success("Paragraph updated!")
             st.experimental_rerun()
+        
+        # Or let the AI rewrite only this paragraph (the rest of the script is not regenerated)
+        instruction = st.text_input("What should change? (optional)", placeholder="e.g. make it funnier, add a stat")
+        if st.button("✨ Regenerate Paragraph with AI"):
+            with st.spinner("Rewriting paragraph..."):
+                try:
+                    revision = engine.revise(
+                        st.session_state.current_script,
+                        para_idx - 1,
+                        para_idx,
+                        topic=st.session_state.get("current_topic", ""),
+                        instruction=instruction,
+                        video_type=VIDEO_TYPES[script_length],
+                    )
+                except RuntimeError:
+                    revision = None
+                    st.error("Could not rewrite the paragraph, please try again.")
+            if revision:
+                st.session_state.current_script = revision.script
+                st.success("Paragraph regenerated!")
+                st.experimental_rerun()
 
 # ----------------------------
-# 11. Display Full Script History (if needed)
+# 9. Display Full Script History (if needed)
 # ----------------------------
 if st.session_state.script_history:
     st.subheader("Previously Generated Scripts:")
@@ -385,8 +419,16 @@ if st.session_state.script_history:
         st.text_area(f"Script {idx}", script, height=150)
 
 # ----------------------------
-# 12. Close App Button
+# 10. Close App Button
 # ----------------------------
 if st.sidebar.button("Close App"):
     st.warning("The app is closing...")
     os._exit(0)
+
+# ----------------------------
+# 11. Refresh While Scripts Generate
+# ----------------------------
+# Any widget interaction interrupts the wait, so editing is never blocked
+if running_jobs:
+    time.sleep(JOB_POLL_SECONDS)
+    st.experimental_rerun()
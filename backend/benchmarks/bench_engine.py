@@ -0,0 +1,60 @@
+"""Benchmarks for the shared generation engine (retrieval, prompt building, cache, template path).
+
+Run from the backend directory:  python benchmarks/bench_engine.py
+
+With PROVIDER_CASSETTE_DIR pointing at recordings made with PROVIDER_MODE=record,
+the provider path is benchmarked offline through the replay providers, using the
+recorded latencies (scaled by PROVIDER_REPLAY_SPEED).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engine import (
+    ChannelRegistry,
+    ResponseCache,
+    ScriptEngine,
+    apply_provider_mode,
+    build_prompt,
+    generate_techfela_template,
+    validate_script,
+)
+
+TOPICS = ["ChatGPT in Pakistan", "Type-C charger", "Five-in-One mouse", "Electric cars", "5G internet"]
+
+def bench(name, fn, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(TOPICS[i % len(TOPICS)])
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed / iterations * 1e6:10.1f} us/op  {iterations / elapsed:12.0f} ops/s")
+
+def main(iterations=20000):
+    registry = ChannelRegistry(default_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    engine = ScriptEngine(registry, providers=[], cache=ResponseCache())
+    channel = registry.get()
+
+    print(f"🏁 Engine benchmarks ({iterations} iterations, {len(channel.index.paragraphs)} sample paragraphs)")
+    print("-" * 70)
+    bench("retrieval (best_match)", channel.index.best_match, iterations)
+    bench("build_prompt", lambda t: build_prompt(channel.prompt_for("short"), t, channel.index.best_match(t)), iterations)
+    bench("template fallback (short)", lambda t: generate_techfela_template(t, "short"), iterations)
+    bench("template fallback (long)", lambda t: generate_techfela_template(t, "long"), iterations)
+    bench("engine.generate (no keys)", lambda t: engine.generate(t, "short"), iterations)
+    bench("validate_script (short)", lambda t: validate_script(generate_techfela_template(t, "short"), "short"), iterations)
+    bench("validate_script (long)", lambda t: validate_script(generate_techfela_template(t, "long"), "long"), iterations)
+
+    cassette_dir = os.getenv("PROVIDER_CASSETTE_DIR")
+    if cassette_dir:
+        replay = apply_provider_mode([], "replay", cassette_dir, float(os.getenv("PROVIDER_REPLAY_SPEED", "1.0")))
+        replay_engine = ScriptEngine(registry, providers=replay, metrics=engine.metrics)
+        bench("engine.generate (replay)", lambda t: replay_engine.generate(t, "long"), max(1, iterations // 100))
+        bench("engine.stream (replay)", lambda t: list(replay_engine.stream(t, "long")), max(1, iterations // 100))
+    print()
+    for name, timing in engine.metrics.snapshot()["timings"].items():
+        print(f"{name:<28} p50={timing['p50_ms']:.3f}ms p95={timing['p95_ms']:.3f}ms")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,125 @@
+"""Per-request memory benchmark for the generation hot path.
+
+Measures, with tracemalloc, how many bytes a single engine.generate() call
+allocates at its peak and how much it leaves behind, then runs the same path
+from a thread pool and reports the process's peak RSS. The provider is a local
+stand-in returning a fixed long script, so no API keys are needed and only
+the engine's own work is measured (retrieval, prompt, cache, analysis).
+
+Exits non-zero when a request goes over ALLOCATION_BUDGET, so it can gate CI.
+
+Run from the backend directory:  python benchmarks/bench_memory.py [iterations] [--top]
+"""
+import gc
+import os
+import sys
+import resource
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engine import ChannelRegistry, Provider, ProviderResponse, ResponseCache, ScriptEngine, generate_techfela_template
+
+TOPICS = ["ChatGPT in Pakistan", "Type-C charger", "Five-in-One mouse", "Electric cars", "5G internet"]
+
+# Per request, in bytes: transient peak above the prompt + script themselves,
+# and what may stay allocated afterwards (metrics windows, trace buffers)
+ALLOCATION_BUDGET = {"peak": 24 * 1024, "retained": 4 * 1024}
+
+class FixedProvider(Provider):
+    """Returns the same script text for every prompt, in one piece or in small chunks"""
+
+    name = "fixed"
+
+    def __init__(self, script: str, chunk_chars: int = 40):
+        self.script = script
+        self.chunk_chars = chunk_chars
+
+    def generate(self, prompt, system_prompt="", max_tokens=None, temperature=None):
+        # Assembled per call, like a real client building the response text
+        text = "".join(self.stream(prompt))
+        return ProviderResponse(text, len(prompt) // 4, len(text) // 4)
+
+    def stream(self, prompt, system_prompt="", max_tokens=None, temperature=None):
+        for offset in range(0, len(self.script), self.chunk_chars):
+            yield self.script[offset:offset + self.chunk_chars]
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def measure(name, fn, iterations, baseline):
+    """Average transient peak and retained bytes per call, on top of ``baseline`` bytes"""
+    for i in range(min(iterations, 50)):  # warm caches, metric windows and the trace ring buffer
+        fn(TOPICS[i % len(TOPICS)])
+    gc.collect()
+    peaks = []
+    start_current, _ = tracemalloc.get_traced_memory()
+    for i in range(iterations):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn(TOPICS[i % len(TOPICS)])
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    gc.collect()
+    retained = (tracemalloc.get_traced_memory()[0] - start_current) / iterations
+    peak = max(0, sum(peaks) / len(peaks) - baseline)
+    within = peak <= ALLOCATION_BUDGET["peak"] and retained <= ALLOCATION_BUDGET["retained"]
+    print(f"{name:<30} {peak / 1024:9.1f} KiB peak  {retained / 1024:7.2f} KiB retained  {'ok' if within else 'OVER BUDGET'}")
+    return within
+
+def top_allocations(fn, iterations, limit=15):
+    """Allocation sites for a batch of calls, largest total first"""
+    gc.collect()
+    before = tracemalloc.take_snapshot()
+    for i in range(iterations):
+        fn(TOPICS[i % len(TOPICS)])
+    after = tracemalloc.take_snapshot()
+    engine_only = [tracemalloc.Filter(True, "*engine*")]
+    stats = after.filter_traces(engine_only).compare_to(before.filter_traces(engine_only), "lineno")
+    print(f"\nTop retained allocation sites over {iterations} calls:")
+    for stat in stats[:limit]:
+        print(f"  {stat}")
+
+def main(iterations=500, show_top=False):
+    registry = ChannelRegistry(default_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    script = "\n\n".join([generate_techfela_template("ChatGPT in Pakistan", "long")] * 2)
+    provider = FixedProvider(script)
+    engines = {
+        "plain": ScriptEngine(registry, providers=[provider]),
+        "length control": ScriptEngine(registry, providers=[provider], length_control=True),
+        "cached": ScriptEngine(registry, providers=[provider], cache=ResponseCache()),
+    }
+    channel = registry.get()
+    prompt = channel.prompt_for("long")
+
+    tracemalloc.start()
+    # The prompt and script a request must hold no matter what
+    baseline = sys.getsizeof(prompt) + sys.getsizeof(script)
+    print(f"🏁 Memory benchmarks ({iterations} iterations, {len(script)} char script, {len(prompt)} char prompt)")
+    print(f"Budget per request: {ALLOCATION_BUDGET['peak'] // 1024} KiB peak above prompt + script, "
+          f"{ALLOCATION_BUDGET['retained'] // 1024} KiB retained")
+    print("-" * 78)
+    results = [
+        measure("generate (plain)", lambda t: engines["plain"].generate(t, "long"), iterations, baseline),
+        measure("generate (length control)", lambda t: engines["length control"].generate(t, "long"), iterations, baseline),
+        measure("stream (plain)", lambda t: list(engines["plain"].stream(t, "long")), iterations, baseline),
+        measure("generate (cache hit)", lambda t: engines["cached"].generate(t, "long"), iterations, 0),
+    ]
+    if show_top:
+        top_allocations(lambda t: engines["plain"].generate(t, "long"), iterations)
+    tracemalloc.stop()
+
+    print()
+    for workers in (1, 8, 32):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda i: engines["plain"].generate(TOPICS[i % len(TOPICS)], "long"), range(iterations * 4)))
+        print(f"peak RSS after {workers:>2} workers          {peak_rss_bytes() / 1024 / 1024:9.1f} MiB")
+
+    if not all(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    main(int(args[0]) if args else 500, "--top" in sys.argv)
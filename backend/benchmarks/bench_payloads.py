@@ -0,0 +1,56 @@
+"""Payload size and serialization time for short vs long script responses.
+
+Compares JSON and msgpack bodies, uncompressed and with gzip/brotli, for the
+payload returned by POST /generate-script.
+
+Run from the backend directory:  python benchmarks/bench_payloads.py
+"""
+import os
+import sys
+import json
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engine import generate_techfela_template
+from transport import brotli, msgpack
+
+def timed(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        out = fn()
+    return out, (time.perf_counter() - start) / iterations * 1e6
+
+def payload_for(script, duration):
+    return {"script": script, "word_count": len(script.split()), "estimated_duration": duration}
+
+def main(iterations=2000):
+    long_script = generate_techfela_template("ChatGPT in Pakistan", "long")
+    cases = {
+        "short": payload_for(generate_techfela_template("ChatGPT in Pakistan", "short"), "60-90 seconds"),
+        "long": payload_for(long_script, "3-6 minutes"),
+        # Long-form model outputs run several times the template length
+        "long x4": payload_for("\n\n".join([long_script] * 4), "3-6 minutes"),
+    }
+
+    print(f"🏁 Payload benchmarks ({iterations} iterations)")
+    print(f"{'case':<9} {'format':<16} {'bytes':>8} {'encode us':>10}")
+    print("-" * 48)
+    for name, payload in cases.items():
+        body, encode_us = timed(lambda: json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), iterations)
+        rows = [("json", len(body), encode_us)]
+        if msgpack is not None:
+            packed, pack_us = timed(lambda: msgpack.packb(payload, use_bin_type=True), iterations)
+            rows.append(("msgpack", len(packed), pack_us))
+        gz, gz_us = timed(lambda: zlib.compress(body, 6), iterations)
+        rows.append(("json+gzip", len(gz), encode_us + gz_us))
+        if brotli is not None:
+            br, br_us = timed(lambda: brotli.compress(body, quality=5), iterations)
+            rows.append(("json+br", len(br), encode_us + br_us))
+        for fmt, size, us in rows:
+            print(f"{name:<9} {fmt:<16} {size:>8} {us:>10.1f}")
+        print()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
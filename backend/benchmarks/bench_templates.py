@@ -0,0 +1,50 @@
+"""Microbenchmark for the template fallback path (used when every provider is down).
+
+Compares the compiled template registry against formatting the same template
+text on every call, and reports sustained fallback throughput.
+
+Run from the backend directory:  python benchmarks/bench_templates.py
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engine import ChannelRegistry, default_template_registry
+
+TOPICS = ["ChatGPT in Pakistan", "Type-C charger", "Five-in-One mouse", "Electric cars", "5G internet"]
+
+def bench(name, fn, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(TOPICS[i % len(TOPICS)])
+    elapsed = time.perf_counter() - start
+    print(f"{name:<34} {elapsed / iterations * 1e6:8.2f} us/op  {iterations / elapsed:12.0f} ops/s")
+
+def main(iterations=200000):
+    templates = default_template_registry()
+    index = ChannelRegistry(default_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")).get().index
+    with open(os.path.join(templates.directory, "long", "default.txt"), encoding="utf-8") as file:
+        raw_long = file.read()
+    compiled_long = templates.select("x", "long")
+
+    print(f"🏁 Template fallback benchmarks ({iterations} iterations)")
+    print("-" * 70)
+    bench("str.format per call (long)", lambda t: raw_long.format(topic=t), iterations)
+    bench("compiled render (long)", lambda t: compiled_long.render(topic=t), iterations)
+    bench("select + render (short)", lambda t: templates.render(t, "short"), iterations)
+    bench("select + render w/ reference", lambda t: templates.render(t, "short", index.best_match(t)), iterations)
+
+    # Sustained fallback QPS with many concurrent request handlers
+    workers = 32
+    per_worker = iterations // workers
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(lambda w: [templates.render(TOPICS[i % len(TOPICS)], "long") for i in range(per_worker)], range(workers)))
+    elapsed = time.perf_counter() - start
+    print(f"{'fallback QPS (' + str(workers) + ' threads)':<34} {per_worker * workers / elapsed:23.0f} req/s")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,229 @@
+"""Multi-process harness for cluster mode.
+
+Starts several backend processes on local ports, wired together as a cluster,
+with replay providers serving a synthetic cassette (no API keys; every
+generation takes --latency-ms). It then:
+
+1. sends every topic several times, each time to a random node, and counts
+   the provider generations across the fleet (ideally one per topic);
+2. stops one node and repeats, checking that no request fails while the
+   ring drops the node and its topics move to the others;
+3. restarts the node and checks that it rejoins the ring.
+
+Run with --no-cluster to see the same traffic against independent nodes.
+Exits non-zero when a request fails.
+
+Run from the backend directory:  python benchmarks/cluster_harness.py [--nodes 3] [--topics 12]
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SCRIPT = """(0-15 seconds)
+Assalam o Alaikum doston! Aaj baat karte hain ek zabardast cheez ki.
+
+(15-45 seconds)
+Yeh gadget aapki zindagi asaan bana deta hai, aur price bhi bilkul jaib ke mutabiq hai.
+
+(45-60 seconds)
+Toh batayein comments mein, aap lenge ya nahi? Like aur subscribe karna na bhoolein!"""
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def write_cassette(directory: str, latency_ms: float):
+    """A gemini cassette whose recordings every prompt falls back to"""
+    path = os.path.join(directory, "gemini.jsonl")
+    with open(path, "w", encoding="utf-8") as file:
+        for index in range(4):
+            text = SCRIPT.replace("zabardast", ["zabardast", "kamaal", "naya", "mazedar"][index])
+            file.write(json.dumps({"key": f"synthetic-{index}", "text": text, "prompt_tokens": 600,
+                                   "output_tokens": len(text) // 4, "latency_ms": latency_ms,
+                                   "chunks": [[latency_ms, text]]}) + "\n")
+
+class Node:
+    def __init__(self, port: int, peers, workdir: str, cluster: bool):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.peers = peers
+        self.workdir = workdir
+        self.cluster = cluster
+        self.process = None
+
+    def start(self):
+        env = dict(
+            os.environ,
+            PORT=str(self.port),
+            PROVIDER_MODE="replay",
+            PROVIDER_CASSETTE_DIR=os.path.join(self.workdir, "cassettes"),
+            SCRIPT_STORE_PATH="",
+            TRACE_FILE="",
+            PREGEN_ENABLED="false",
+            CLUSTER_SELF_URL=self.url,
+            CLUSTER_PEERS=",".join(peer for peer in self.peers if peer != self.url) if self.cluster else "",
+            CLUSTER_SECRET="harness-secret",
+            CLUSTER_HEALTH_INTERVAL="0.5",
+        )
+        log = open(os.path.join(self.workdir, f"node-{self.port}.log"), "w")
+        self.process = subprocess.Popen([sys.executable, "main.py"], cwd=BACKEND_DIR, env=env,
+                                        stdout=log, stderr=subprocess.STDOUT)
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+def wait_ready(client, nodes, timeout=60):
+    deadline = time.monotonic() + timeout
+    for node in nodes:
+        while True:
+            try:
+                if client.get(f"{node.url}/ready").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{node.url} did not become ready, see {node.workdir}")
+            time.sleep(0.2)
+
+def wait_for(condition, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.2)
+    return False
+
+def generations(client, nodes):
+    """Provider generations and cache hits summed over the live nodes"""
+    total = {"generated": 0, "cache_hits": 0}
+    for node in nodes:
+        counters = client.get(f"{node.url}/metrics").json()["metrics"]["counters"]
+        total["generated"] += sum(value for name, value in counters.items()
+                                  if name.startswith("result.") and name != "result.template")
+        total["cache_hits"] += counters.get("cache.hit", 0)
+    return total
+
+def send_round(client, nodes, topics, repeats, concurrency, rng):
+    """Every topic `repeats` times, each request to a random node; returns (failures, latencies, owners)"""
+    requests = [(topic, rng.choice(nodes)) for topic in topics for _ in range(repeats)]
+    rng.shuffle(requests)
+
+    def send(item):
+        topic, node = item
+        started = time.perf_counter()
+        try:
+            response = client.post(f"{node.url}/generate-script", json={"topic": topic, "video_type": "short"})
+            return response.status_code == 200, (time.perf_counter() - started) * 1000, topic, response.headers.get("x-cluster-node", node.url)
+        except httpx.HTTPError:
+            return False, (time.perf_counter() - started) * 1000, topic, None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, requests))
+    failures = sum(not ok for ok, _, _, _ in results)
+    latencies = sorted(latency for _, latency, _, _ in results)
+    owners = {}
+    for _, _, topic, owner in results:
+        owners.setdefault(topic, set()).add(owner)
+    return failures, latencies, owners
+
+def report(name, failures, latencies, owners, before, after, topics):
+    generated = after["generated"] - before["generated"]
+    hits = after["cache_hits"] - before["cache_hits"]
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    single_owner = sum(len(nodes) == 1 for nodes in owners.values())
+    print(f"{name:<10} {len(latencies):>5} requests  {failures:>3} failed  {generated:>4} generated "
+          f"for {len(topics)} topics  {hits:>4} cache hits  p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  "
+          f"{single_owner}/{len(owners)} topics served by one node")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local multi-process cluster and check routing, failover and rejoin")
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--topics", type=int, default=12)
+    parser.add_argument("--repeats", type=int, default=4, help="requests per topic and round")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="replayed provider latency")
+    parser.add_argument("--no-cluster", action="store_true", help="independent nodes, for comparison")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    topics = [f"Harness topic {index}" for index in range(args.topics)]
+    workdir = tempfile.mkdtemp(prefix="cluster-harness-")
+    os.makedirs(os.path.join(workdir, "cassettes"))
+    write_cassette(os.path.join(workdir, "cassettes"), args.latency_ms)
+
+    ports = [free_port() for _ in range(args.nodes)]
+    urls = [f"http://127.0.0.1:{port}" for port in ports]
+    nodes = [Node(port, urls, workdir, cluster=not args.no_cluster) for port in ports]
+    print(f"🧪 {args.nodes} {'independent' if args.no_cluster else 'clustered'} nodes, logs in {workdir}")
+    print("-" * 110)
+
+    failed = 0
+    with httpx.Client(timeout=60) as client:
+        try:
+            for node in nodes:
+                node.start()
+            wait_ready(client, nodes)
+
+            before = generations(client, nodes)
+            failures, latencies, owners = send_round(client, nodes, topics, args.repeats, args.concurrency, rng)
+            report("spread", failures, latencies, owners, before, generations(client, nodes), topics)
+            failed += failures
+
+            if args.nodes > 1:
+                # A node goes away: requests must keep succeeding while the ring drops it
+                leaving, remaining = nodes[-1], nodes[:-1]
+                leaving.process.kill()
+                before = generations(client, remaining)
+                failures, latencies, owners = send_round(client, remaining, topics, args.repeats, args.concurrency, rng)
+                report("failover", failures, latencies, owners, before, generations(client, remaining), topics)
+                failed += failures
+                if not args.no_cluster:
+                    dropped = wait_for(lambda: all(leaving.url in client.get(f"{node.url}/cluster").json()["down"]
+                                                   for node in remaining))
+                    print(f"{'':<10} {leaving.url} off every ring: {'yes' if dropped else 'NO'}")
+
+                # ...and comes back: the others put it back on their rings
+                leaving.start()
+                wait_ready(client, [leaving])
+                if not args.no_cluster:
+                    rejoined = wait_for(lambda: all(leaving.url not in client.get(f"{node.url}/cluster").json()["down"]
+                                                    for node in remaining))
+                    print(f"{'':<10} {leaving.url} back on every ring: {'yes' if rejoined else 'NO'}")
+                before = generations(client, nodes)
+                failures, latencies, owners = send_round(client, nodes, topics, args.repeats, args.concurrency, rng)
+                report("rejoin", failures, latencies, owners, before, generations(client, nodes), topics)
+                failed += failures
+
+            if not args.no_cluster:
+                stats = [client.get(f"{node.url}/cluster").json() for node in nodes]
+                print(f"{'':<10} forwarded {sum(s['forwarded'] for s in stats)}  "
+                      f"fallbacks {sum(s['fallbacks'] for s in stats)}  rebalances {sum(s['rebalances'] for s in stats)}")
+        finally:
+            for node in nodes:
+                node.stop()
+
+    print("-" * 110)
+    print("✅ No failed requests" if not failed else f"❌ {failed} failed requests")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
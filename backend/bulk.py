@@ -0,0 +1,190 @@
+"""Bulk script generation from the command line, for overnight backfills.
+
+Reads topics from a CSV (columns ``topic`` and optionally ``video_type``,
+``channel``, ``id``) or a JSONL file with the same keys, generates them with
+bounded concurrency under a requests-per-minute limit, and appends one JSON
+line per script to the output file as soon as it is done.
+
+The output file is the checkpoint: rerunning the same command skips every
+topic that already has a successful line, so an interrupted or crashed run
+resumes where it stopped. Failed topics and template fallbacks are retried.
+
+Run from the backend directory:
+    python bulk.py topics.csv -o scripts.jsonl --concurrency 4 --rpm 30
+"""
+import os
+import csv
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+
+from engine import DEFAULT_CHANNEL, cache_key
+
+logger = logging.getLogger(__name__)
+
+def read_topics(path: str, video_type: str = "short", channel: str = DEFAULT_CHANNEL):
+    """Items as dicts with id, topic, video_type and channel; rows without a topic are skipped"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as file:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            rows = [json.loads(line) for line in file if line.strip()]
+        else:
+            rows = list(csv.DictReader(file))
+    items = []
+    for row in rows:
+        topic = " ".join(str(row.get("topic") or "").split())
+        if not topic:
+            continue
+        item = {
+            "topic": topic,
+            "video_type": row.get("video_type") or video_type,
+            "channel": row.get("channel") or channel,
+        }
+        item["id"] = str(row.get("id") or "/".join(cache_key(item["topic"], item["video_type"], item["channel"])))
+        items.append(item)
+    return items
+
+def completed_ids(path: str):
+    """Ids with a successful line in an existing output file; a line cut off by a crash is ignored"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+class RateLimiter:
+    """Spaces request starts at least 60/rpm seconds apart (no limit when rpm is 0)"""
+
+    def __init__(self, rpm: float):
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(self._next, time.monotonic()) + self.interval
+
+def percentile(values, q: float):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))] if values else 0.0
+
+async def run(items, output_path: str, generate, concurrency: int = 4, rpm: float = 0.0):
+    """Generate every item and append results to output_path; returns the summary dict"""
+    limiter = RateLimiter(rpm)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    counts = {"ok": 0, "fallback": 0, "error": 0}
+    tokens = 0
+    started = time.perf_counter()
+
+    # A crash can leave a partial last line; start the next record on a fresh one
+    if os.path.exists(output_path) and os.path.getsize(output_path):
+        with open(output_path, "rb") as existing:
+            existing.seek(-1, os.SEEK_END)
+            needs_newline = existing.read(1) != b"\n"
+    else:
+        needs_newline = False
+
+    with open(output_path, "a", encoding="utf-8") as output:
+        if needs_newline:
+            output.write("\n")
+
+        async def worker(item):
+            nonlocal tokens
+            async with semaphore:
+                await limiter.wait()
+                record = {**item, "finished_at": None}
+                try:
+                    result = await asyncio.to_thread(generate, item["topic"], item["video_type"], item["channel"])
+                    # Template output means every provider failed; retry it on the next run
+                    record["status"] = "fallback" if result.provider == "template" else "ok"
+                    record.update(
+                        provider=result.provider,
+                        latency_ms=round(result.latency_ms, 1),
+                        prompt_tokens=result.prompt_tokens,
+                        output_tokens=result.output_tokens,
+                        word_count=result.analysis.word_count if result.analysis else len(result.script.split()),
+                        script=result.script,
+                        repairs=result.repairs,
+                        defects=result.defects,
+                    )
+                    latencies.append(result.latency_ms)
+                    tokens += result.prompt_tokens + result.output_tokens
+                except Exception as e:
+                    record.update(status="error", error=f"{type(e).__name__}: {e}")
+                    logger.error(f"Failed to generate '{item['topic']}': {e}")
+                record["finished_at"] = time.time()
+                counts[record["status"]] += 1
+                # Written and flushed per item, so progress survives a crash
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+                done = sum(counts.values())
+                print(f"[{done}/{len(items)}] {record['status']:<8} {item['topic']}", flush=True)
+
+        await asyncio.gather(*(worker(item) for item in items))
+
+    elapsed = time.perf_counter() - started
+    return {
+        **counts,
+        "elapsed_seconds": round(elapsed, 1),
+        "scripts_per_minute": round(counts["ok"] / elapsed * 60, 2) if elapsed else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50), 1),
+        "latency_p95_ms": round(percentile(latencies, 95), 1),
+        "latency_max_ms": round(max(latencies, default=0.0), 1),
+        "tokens": tokens,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate scripts for many topics, resumably")
+    parser.add_argument("input", help="CSV or JSONL file with a 'topic' column/key")
+    parser.add_argument("-o", "--output", default="bulk_scripts.jsonl", help="JSONL results file, also the checkpoint")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="scripts generating at once")
+    parser.add_argument("--rpm", type=float, default=30.0, help="max requests started per minute (0 = unlimited)")
+    parser.add_argument("--video-type", default="short", help="default when the input has no video_type")
+    parser.add_argument("--channel", default=DEFAULT_CHANNEL, help="default when the input has no channel")
+    parser.add_argument("--limit", type=int, default=0, help="only generate this many pending topics")
+    args = parser.parse_args(argv)
+
+    items = read_topics(args.input, args.video_type, args.channel)
+    done = completed_ids(args.output)
+    pending = [item for item in items if item["id"] not in done]
+    # The same topic listed twice is generated once
+    pending = list({item["id"]: item for item in pending}.values())
+    if args.limit:
+        pending = pending[:args.limit]
+    print(f"{len(items)} topics, {len(done)} already done, {len(pending)} to generate")
+    if not pending:
+        return 0
+
+    # Same engine configuration as the API (providers, routing, cache, length control)
+    from main import generate_techfela_script
+
+    try:
+        summary = asyncio.run(run(pending, args.output, generate_techfela_script, args.concurrency, args.rpm))
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; finished scripts are in {args.output}. Rerun the same command to resume.")
+        return 130
+
+    print("-" * 60)
+    print(f"ok {summary['ok']}  fallback {summary['fallback']}  error {summary['error']}  "
+          f"in {summary['elapsed_seconds']}s ({summary['scripts_per_minute']} scripts/min)")
+    print(f"latency p50 {summary['latency_p50_ms']} ms  p95 {summary['latency_p95_ms']} ms  "
+          f"max {summary['latency_max_ms']} ms  tokens {summary['tokens']}")
+    return 0 if not summary["error"] and not summary["fallback"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
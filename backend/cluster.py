@@ -0,0 +1,213 @@
+import hmac
+import bisect
+import asyncio
+import hashlib
+import logging
+import threading
+
+import httpx
+from fastapi.responses import Response
+
+from engine import cache_key
+
+logger = logging.getLogger(__name__)
+
+# Set on requests a node forwards, so the owner always handles them itself
+FORWARDED_HEADER = "x-cluster-forwarded-by"
+# Request headers passed on to the owner, and response headers passed back
+FORWARD_REQUEST_HEADERS = ("accept", "if-none-match", "idempotency-key", "x-client-id", "traceparent")
+FORWARD_RESPONSE_HEADERS = ("content-type", "etag", "idempotent-replayed")
+
+def normalize_url(url: str) -> str:
+    return url.strip().rstrip("/")
+
+class HashRing:
+    """Consistent hash ring: every node has ``replicas`` points and owns the keys up to each point.
+
+    Adding or removing a node only moves the keys between its points and their
+    neighbours (about 1/n of them), so the other nodes keep their caches.
+    """
+
+    def __init__(self, nodes=(), replicas: int = 100):
+        self.replicas = replicas
+        self.nodes = set()
+        self._points = []
+        self._owners = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def _rebuild(self):
+        points = sorted((self._hash(f"{node}#{replica}"), node) for node in self.nodes for replica in range(self.replicas))
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def add(self, node: str):
+        if node not in self.nodes:
+            self.nodes.add(node)
+            self._rebuild()
+
+    def remove(self, node: str):
+        if node in self.nodes:
+            self.nodes.discard(node)
+            self._rebuild()
+
+    def owner(self, key: str):
+        """Node owning key, or None for an empty ring"""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[index]
+
+class Cluster:
+    """Optional cluster mode: each (topic, video type, channel) has one owner node.
+
+    A node that receives /generate-script for a key it doesn't own forwards the
+    request to the owner, so the owner's response cache, Idempotency-Key store
+    and in-flight dedup serve the whole fleet instead of each node generating
+    the same topic. Members are the configured peers plus nodes that joined
+    (``join``/``leave``, announced at start and stop). A background thread
+    checks every member's /live: a node that fails drops off the ring and its
+    keys move to the next node, and a node that answers again gets them back.
+    A forward that can't reach the owner is generated locally instead.
+    """
+
+    def __init__(self, self_url: str, peers=(), replicas: int = 100, timeout_seconds: float = 60.0,
+                 connect_timeout_seconds: float = 1.0, health_interval_seconds: float = 5.0, secret: str = ""):
+        self.self_url = normalize_url(self_url)
+        self.members = {self.self_url} | {normalize_url(peer) for peer in peers if peer.strip()}
+        self.down = set()
+        self.ring = HashRing(self.members, replicas)
+        self.timeout = httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds)
+        self.health_interval_seconds = health_interval_seconds
+        self.secret = secret
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._client = None
+        self.forwarded = 0
+        self.received = 0
+        self.fallbacks = 0
+        self.rebalances = 0
+
+    # ----------------------------
+    # Membership
+    # ----------------------------
+    def _update(self, members=None, down=None):
+        with self._lock:
+            members = self.members if members is None else members
+            down = self.down if down is None else down
+            live = (members - down) | {self.self_url}
+            if live != self.ring.nodes:
+                self.ring = HashRing(live, self.ring.replicas)
+                self.rebalances += 1
+                logger.info(f"Cluster ring now has {len(live)} nodes: {', '.join(sorted(live))}")
+            self.members, self.down = members, down
+
+    def join(self, url: str):
+        self._update(members=self.members | {normalize_url(url)}, down=self.down - {normalize_url(url)})
+
+    def leave(self, url: str):
+        url = normalize_url(url)
+        if url != self.self_url:
+            self._update(members=self.members - {url}, down=self.down - {url})
+
+    def mark_down(self, url: str):
+        if url != self.self_url and url not in self.down:
+            logger.warning(f"Cluster node {url} is unreachable, taking it off the ring")
+            self._update(down=self.down | {url})
+
+    def mark_up(self, url: str):
+        if url in self.down:
+            logger.info(f"Cluster node {url} is back")
+            self._update(down=self.down - {url})
+
+    def check_secret(self, value: str) -> bool:
+        """Join/leave need the shared CLUSTER_SECRET; without one, membership is the configured peers only"""
+        return bool(self.secret) and hmac.compare_digest(value or "", self.secret)
+
+    # ----------------------------
+    # Routing
+    # ----------------------------
+    def owner(self, topic: str, video_type: str, channel: str) -> str:
+        # The response cache key, so the owner's cache entries are exactly the keys it owns
+        return self.ring.owner("/".join(cache_key(topic, video_type, channel))) or self.self_url
+
+    def is_local(self, node: str) -> bool:
+        return node == self.self_url
+
+    async def forward(self, owner: str, path: str, payload: dict, headers) -> Response:
+        """The owner's response to the request, or None when it can't be reached (then generate locally)"""
+        if self._client is None:
+            # Created on the serving event loop; pooled connections to every peer
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        forward_headers = {name: headers[name] for name in FORWARD_REQUEST_HEADERS if name in headers}
+        forward_headers[FORWARDED_HEADER] = self.self_url
+        try:
+            response = await self._client.post(f"{owner}{path}", json=payload, headers=forward_headers)
+        except httpx.TransportError as e:
+            self.fallbacks += 1
+            if isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+                self.mark_down(owner)
+            logger.warning(f"Forwarding to {owner} failed ({type(e).__name__}), generating locally")
+            return None
+        self.forwarded += 1
+        response_headers = {name: response.headers[name] for name in FORWARD_RESPONSE_HEADERS if name in response.headers}
+        response_headers["X-Cluster-Node"] = owner
+        return Response(response.content, status_code=response.status_code, headers=response_headers)
+
+    # ----------------------------
+    # Background health checks
+    # ----------------------------
+    def _announce(self, client, action: str):
+        if not self.secret:
+            return
+        for peer in self.members - {self.self_url}:
+            try:
+                client.post(f"{peer}/cluster/{action}", json={"url": self.self_url}, headers={"X-Cluster-Secret": self.secret})
+            except httpx.HTTPError as e:
+                logger.debug(f"Could not announce {action} to {peer}: {e}")
+
+    def _run(self):
+        with httpx.Client(timeout=httpx.Timeout(2.0, connect=1.0)) as client:
+            self._announce(client, "join")
+            while not self._stop.is_set():
+                for peer in self.members - {self.self_url}:
+                    try:
+                        client.get(f"{peer}/live").raise_for_status()
+                        self.mark_up(peer)
+                    except httpx.HTTPError:
+                        self.mark_down(peer)
+                self._stop.wait(self.health_interval_seconds)
+            self._announce(client, "leave")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cluster-health", daemon=True)
+            self._thread.start()
+            logger.info(f"Cluster mode on as {self.self_url} with {len(self.members) - 1} peers")
+
+    async def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            # Joined off the event loop: the thread may still be announcing the leave
+            await asyncio.to_thread(self._thread.join, 5)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "self": self.self_url,
+                "members": sorted(self.members),
+                "down": sorted(self.down),
+                "ring_nodes": len(self.ring.nodes),
+                "forwarded": self.forwarded,
+                "received": self.received,
+                "fallbacks": self.fallbacks,
+                "rebalances": self.rebalances,
+            }
@@ -0,0 +1,87 @@
+"""Shared script generation engine used by the FastAPI backend and the Streamlit apps."""
+
+from .cache import ResponseCache, cache_key
+from .core import GenerationResult, GenerationStream, ScriptEngine, estimate_tokens
+from .corpus import (
+    DEFAULT_CHANNEL,
+    Channel,
+    ChannelRegistry,
+    CorpusIndex,
+    load_channel,
+    load_prompt,
+    load_sample_scripts,
+)
+from .experiments import DEFAULT_PROMPT_VARIANTS, PromptExperiment, PromptVariant, load_experiment
+from .jobs import Job, JobRunner
+from .metrics import Metrics
+from .postprocess import LengthBudget, ScriptAnalysis, ScriptAnalyzer, Section, analyze, format_duration, length_budget
+from .prompts import build_prompt
+from .providers import GeminiProvider, OpenAIProvider, Provider, ProviderResponse, create_providers
+from .ranking import score_script
+from .replay import RecordingProvider, ReplayProvider, apply_provider_mode
+from .revise import Revision, build_revision_prompt, find_section, split_paragraphs
+from .routing import DEFAULT_ROUTES, ModelChoice, ModelRouter, Route, load_routes
+from .streaming import render_incrementally
+from .templates import CompiledTemplate, TemplateRegistry, default_template_registry, generate_techfela_template
+from .tracing import FileSpanExporter, Span, Tracer, parse_traceparent
+from .validation import Defect, validate_script
+
+__all__ = [
+    "Channel",
+    "CompiledTemplate",
+    "ChannelRegistry",
+    "CorpusIndex",
+    "DEFAULT_CHANNEL",
+    "DEFAULT_PROMPT_VARIANTS",
+    "DEFAULT_ROUTES",
+    "Defect",
+    "FileSpanExporter",
+    "GeminiProvider",
+    "GenerationResult",
+    "GenerationStream",
+    "Job",
+    "JobRunner",
+    "LengthBudget",
+    "Metrics",
+    "ModelChoice",
+    "ModelRouter",
+    "OpenAIProvider",
+    "PromptExperiment",
+    "PromptVariant",
+    "Provider",
+    "ProviderResponse",
+    "RecordingProvider",
+    "ReplayProvider",
+    "ResponseCache",
+    "Revision",
+    "Route",
+    "ScriptAnalysis",
+    "ScriptAnalyzer",
+    "ScriptEngine",
+    "Section",
+    "Span",
+    "TemplateRegistry",
+    "Tracer",
+    "analyze",
+    "apply_provider_mode",
+    "build_prompt",
+    "build_revision_prompt",
+    "cache_key",
+    "create_providers",
+    "default_template_registry",
+    "estimate_tokens",
+    "find_section",
+    "format_duration",
+    "generate_techfela_template",
+    "length_budget",
+    "load_channel",
+    "load_experiment",
+    "load_prompt",
+    "load_routes",
+    "load_sample_scripts",
+    "parse_traceparent",
+    "render_incrementally",
+    "score_script",
+    "split_paragraphs",
+    "validate_script",
+]
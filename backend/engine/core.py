@@ -0,0 +1,712 @@
+import time
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from typing import List, Optional
+
+from .cache import ResponseCache, cache_key
+from .corpus import ChannelRegistry, DEFAULT_CHANNEL
+from .experiments import PromptExperiment
+from .metrics import Metrics
+from .postprocess import ScriptAnalysis, ScriptAnalyzer, analyze, duration_target, format_duration, length_budget
+from .prompts import build_prompt
+from .providers import ProviderResponse
+from .ranking import score_script
+from .revise import Revision, build_continuation_prompt, build_revision_prompt, clean_revision, join_continuation, split_paragraphs
+from .routing import ModelRouter
+from .templates import TemplateRegistry, default_template_registry
+from .tracing import Tracer
+from .validation import (
+    LANGUAGE_INSTRUCTION,
+    MAX_REPAIRS,
+    SECTION_INSTRUCTION,
+    Defect,
+    section_tokens,
+    validate_script,
+)
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class GenerationResult:
+    """A generated script plus what it cost to produce"""
+    script: str
+    provider: str
+    prompt_tokens: int
+    output_tokens: int
+    latency_ms: float
+    cached: bool = False
+    analysis: Optional[ScriptAnalysis] = None
+    tokens_saved: int = 0  # estimated output tokens not generated thanks to length control
+    score: Optional[float] = None  # local ranking score when generated as one of several candidates
+    variant: Optional[str] = None  # prompt variant when the request was part of a prompt experiment
+    repairs: List[str] = field(default_factory=list)  # defects fixed by targeted retries, e.g. "language (15-30 seconds)"
+    defects: List[str] = field(default_factory=list)  # defects found by validation that are still there
+    error: Optional[str] = None  # why the script stopped early, e.g. a provider failing mid-stream
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) when the provider reports none"""
+    return max(1, len(text) // 4) if text else 0
+
+class GenerationStream:
+    """Iterate to receive text chunks; ``result`` is set once the stream is exhausted.
+
+    ``prepared`` holds the (channel data, full prompt, reference) the stream
+    was built from, for callers that generate again with the same context.
+    """
+
+    def __init__(self, chunks, prepared=None):
+        self._chunks = chunks
+        self.prepared = prepared
+        self.result = None
+
+    def __iter__(self):
+        return self._chunks
+
+class ScriptEngine:
+    """Corpus retrieval, prompt building, provider fallback, caching and metrics in one place.
+
+    Shared by the FastAPI backend and the Streamlit apps so every entry point
+    gets the same retrieval, cache and instrumentation.
+    """
+
+    def __init__(self, registry: ChannelRegistry, providers=None, cache: ResponseCache = None, metrics: Metrics = None,
+                 templates: TemplateRegistry = None, tracer: Tracer = None, router: ModelRouter = None,
+                 length_control: bool = False, experiment: PromptExperiment = None, validation: bool = False,
+                 template_fallback: bool = True):
+        self.registry = registry
+        self.providers = list(providers or [])
+        self.cache = cache
+        self.metrics = metrics or Metrics()
+        self.templates = templates or default_template_registry()
+        self.tracer = tracer or Tracer()
+        self.router = router
+        self.length_control = length_control
+        self.experiment = experiment
+        self.validation = validation
+        # Without it, generation raises RuntimeError when no provider answers instead of returning a template
+        self.template_fallback = template_fallback
+        # Running average of output tokens for scripts that ended on their own, per video type
+        self._natural_tokens = {}
+        if router is not None and router.metrics is None:
+            router.metrics = self.metrics
+
+    @contextmanager
+    def _stage(self, name: str, **attributes):
+        """Time a stage as both a metric and a trace span"""
+        with self.tracer.span(name, **attributes) as span, self.metrics.timer(name):
+            yield span
+
+    def prepare(self, topic: str, video_type: str = "short", channel: str = DEFAULT_CHANNEL, prompt: str = None):
+        """Return (channel data, full prompt, reference excerpt); ``prompt`` replaces the channel's. Raises KeyError for unknown channels."""
+        channel_data = self.registry.get(channel)
+        with self._stage("retrieval") as span:
+            reference = channel_data.index.best_match(topic) if topic else ""
+            span.set_attribute("reference_chars", len(reference))
+        with self._stage("prompt_build") as span:
+            # short: 60-90 seconds, long: 3-6 minutes
+            length_hint = length_budget(video_type).hint() if self.length_control else ""
+            full_prompt = build_prompt(prompt or channel_data.prompt_for(video_type), topic, reference, length_hint)
+            span.set_attribute("prompt_tokens", estimate_tokens(full_prompt))
+        return channel_data, full_prompt, reference
+
+    def template(self, topic: str, video_type: str, reference: str = "", fallback_reason: str = None) -> str:
+        """Fallback script from the compiled template registry; raises RuntimeError when template_fallback is off"""
+        if not self.template_fallback:
+            raise RuntimeError(f"No provider could generate the script ({fallback_reason or 'no providers configured'})")
+        with self._stage("template", fallback_reason=fallback_reason or "no providers configured"):
+            return self.templates.render(topic, video_type, reference)
+
+    def _variant(self, topic, video_type, channel, unit):
+        """(variant name, prompt override) for a request; (None, None) when it's not in the experiment"""
+        if self.experiment is None:
+            return None, None
+        # Without a client id, the topic keeps repeated requests on one variant (and its cache entry)
+        variant = self.experiment.assign(unit or cache_key(topic, video_type, channel)[2], channel)
+        if variant is None:
+            return None, None
+        return variant.name, self.experiment.prompt(variant, video_type)
+
+    @staticmethod
+    def _key(topic, video_type, channel, variant):
+        # Variants get their own cache entries so one prompt's scripts aren't served for another
+        key = cache_key(topic, video_type, channel)
+        return key + (variant,) if variant else key
+
+    def cache_key_for(self, topic: str, video_type: str = "short", channel: str = DEFAULT_CHANNEL, unit: str = None):
+        """The response cache key generate() uses for a request, including its prompt variant"""
+        return self._key(topic, video_type, channel, self._variant(topic, video_type, channel, unit)[0])
+
+    def _record(self, result: GenerationResult, video_type, channel, variant):
+        if variant is None:
+            return
+        result.variant = variant
+        quality = result.score
+        if quality is None and not result.cached and result.provider != "template":
+            quality = score_script(result.script, result.analysis, video_type, self.registry.get(channel).index)
+        self.experiment.record(variant, result, video_type, quality)
+
+    def _result(self, start, full_prompt, script, provider, video_type, prompt_tokens=None, output_tokens=None, analysis=None,
+                record=True):
+        latency_ms = (time.perf_counter() - start) * 1000
+        if record:
+            self.metrics.observe("generate", latency_ms)
+            self.metrics.incr(f"result.{provider}")
+        if analysis is None:
+            with self.metrics.timer("postprocess"):
+                analysis = analyze(script, video_type)
+        if analysis.overrun:
+            self.metrics.incr("postprocess.overrun")
+        output_tokens = output_tokens or estimate_tokens(script)
+        return GenerationResult(
+            script=script,
+            provider=provider,
+            prompt_tokens=prompt_tokens or estimate_tokens(full_prompt),
+            output_tokens=output_tokens,
+            latency_ms=latency_ms,
+            analysis=analysis,
+            tokens_saved=self._tokens_saved(video_type, analysis, output_tokens) if provider != "template" else 0,
+        )
+
+    def _tokens_saved(self, video_type: str, analysis: ScriptAnalysis, output_tokens: int) -> int:
+        """Estimate of the tokens an early stop saved, against recent scripts that ended on their own"""
+        if not self.length_control:
+            return 0
+        key = "short" if video_type == "short" else "long"
+        if analysis.stop_reason is None:
+            natural = self._natural_tokens.get(key)
+            self._natural_tokens[key] = output_tokens if natural is None else 0.8 * natural + 0.2 * output_tokens
+            return 0
+        # Until a script has ended naturally, the token cap is the best guess of where it would have stopped
+        natural = self._natural_tokens.get(key, length_budget(video_type).max_tokens)
+        saved = max(0, int(natural) - output_tokens)
+        self.metrics.incr("length.stopped_early")
+        self.metrics.incr("length.tokens_saved", saved)
+        return saved
+
+    def _cached(self, key, start):
+        if self.cache is None:
+            return None
+        with self.tracer.span("cache_lookup") as span:
+            hit = self.cache.get(key)
+            span.set_attribute("cache.hit", hit is not None)
+        self.metrics.incr("cache.hit" if hit else "cache.miss")
+        if hit is None:
+            return None
+        return replace(hit, cached=True, latency_ms=(time.perf_counter() - start) * 1000)
+
+    def _store(self, key, result):
+        # Template fallbacks and scripts with unrepaired defects are not cached so the next request retries
+        if self.cache is not None and result.provider != "template" and not result.defects:
+            self.cache.set(key, result)
+
+    def _plan(self, video_type: str):
+        """(provider, model choice) attempts in order; without a router, every provider with its defaults"""
+        if self.router is None:
+            return [(provider, None) for provider in self.providers]
+        return self.router.plan(video_type, self.providers)
+
+    def _settings(self, choice, video_type: str):
+        """(max_tokens, temperature) for an attempt; length control caps max_tokens at the video type's budget"""
+        max_tokens, temperature = (choice.max_tokens, choice.temperature) if choice is not None else (None, None)
+        if self.length_control:
+            cap = length_budget(video_type).max_tokens
+            max_tokens = cap if max_tokens is None else min(max_tokens, cap)
+        return max_tokens, temperature
+
+    def _generate_bounded(self, provider, full_prompt, system_prompt, video_type, settings):
+        """Stream from the provider and stop as soon as the script reaches its length budget"""
+        analyzer = ScriptAnalyzer(video_type, length_budget(video_type))
+        parts = []
+        chunks = provider.stream(full_prompt, system_prompt, *settings)
+        try:
+            for text in chunks:
+                parts.append(analyzer.feed(text))
+                if analyzer.stop_reason:
+                    break
+        finally:
+            # Closing the stream ends the provider request, so no more tokens are produced
+            if hasattr(chunks, "close"):
+                chunks.close()
+        parts.append(analyzer.flush())
+        return ProviderResponse("".join(parts).strip()), analyzer.finish()
+
+    def _start_attempt(self, provider, choice, attempt, fallback_reason, parent=None):
+        attributes = {"provider": provider.name, "attempt": attempt}
+        if choice is not None:
+            attributes.update(model=choice.model, max_tokens=choice.max_tokens, temperature=choice.temperature)
+        if fallback_reason:
+            attributes["fallback_reason"] = fallback_reason
+        if parent is None:
+            return self.tracer.span(f"provider.{provider.name}", **attributes)
+        return self.tracer.start_span(f"provider.{provider.name}", parent, **attributes)
+
+    def _observe(self, video_type, choice, attempt, started, failed=False):
+        if self.router is not None:
+            self.router.observe(video_type, choice, (time.perf_counter() - started) * 1000, primary=attempt == 1, failed=failed)
+
+    def _failed(self, span, provider, error, down) -> str:
+        """Count a failed attempt and return its fallback reason; adds the provider to ``down`` when none of its models can answer"""
+        span.record_exception(error)
+        self.metrics.incr(f"provider.{provider.name}.error")
+        if provider.unavailable(error):
+            # e.g. a rejected key: the provider's other models in the plan would fail the same way
+            down.add(provider.name)
+        return f"{provider.name}: {type(error).__name__}"
+
+    @staticmethod
+    def _annotate(span, result: GenerationResult):
+        span.set_attribute("provider", result.provider)
+        span.set_attribute("cached", result.cached)
+        span.set_attribute("prompt_tokens", result.prompt_tokens)
+        span.set_attribute("output_tokens", result.output_tokens)
+        if result.variant:
+            span.set_attribute("prompt_variant", result.variant)
+        if result.analysis is not None:
+            span.set_attribute("estimated_seconds", result.analysis.estimated_seconds)
+            if result.analysis.stop_reason:
+                span.set_attribute("length.stop_reason", result.analysis.stop_reason)
+                span.set_attribute("length.tokens_saved", result.tokens_saved)
+
+    def generate(self, topic: str, video_type: str = "short", channel: str = DEFAULT_CHANNEL, use_cache: bool = True,
+                 unit: str = None, record: bool = True) -> GenerationResult:
+        """Generate a script, trying each provider in order and falling back to the template.
+
+        ``unit`` (e.g. a client id) picks the prompt variant when an experiment runs.
+        With ``validation``, fresh provider results are checked locally and
+        defective parts are retried on their own (see ``repair``).
+        ``record=False`` keeps the call out of the experiment, routing and
+        request latency statistics, for background work that no user is waiting on.
+        """
+        with self.tracer.span("generate", topic=topic, video_type=video_type, channel=channel) as root:
+            variant, prompt = self._variant(topic, video_type, channel, unit)
+            # With validation the result is cached once it has been checked and repaired
+            result = self._generate(topic, video_type, channel, use_cache, variant, prompt, record, store=not self.validation)
+            if self.validation and not result.cached:
+                result = self.repair(result, topic, video_type, channel)
+                self._store(self._key(topic, video_type, channel, variant), result)
+            if record:
+                self._record(result, video_type, channel, variant)
+            else:
+                result.variant = variant
+            self._annotate(root, result)
+            return result
+
+    def _generate(self, topic, video_type, channel, use_cache, variant=None, prompt=None, record=True, store=True):
+        start = time.perf_counter()
+        key = self._key(topic, video_type, channel, variant)
+        if use_cache:
+            hit = self._cached(key, start)
+            if hit:
+                return hit
+
+        channel_data, full_prompt, reference = self.prepare(topic, video_type, channel, prompt)
+        fallback_reason = None
+        down = set()
+        for attempt, (provider, choice) in enumerate(self._plan(video_type), start=1):
+            if provider.name in down:
+                continue
+            with self._start_attempt(provider, choice, attempt, fallback_reason) as span:
+                started = time.perf_counter()
+                try:
+                    logger.info(f"Generating script with {provider.name}" + (f" ({choice.model})" if choice else ""))
+                    settings = self._settings(choice, video_type)
+                    analysis = None
+                    with self.metrics.timer(f"provider.{provider.name}"):
+                        if self.length_control:
+                            response, analysis = self._generate_bounded(provider, full_prompt, channel_data.system_prompt, video_type, settings)
+                        else:
+                            response = provider.generate(full_prompt, channel_data.system_prompt, *settings)
+                    if record:
+                        self._observe(video_type, choice, attempt, started)
+                    if response.text:
+                        result = self._result(start, full_prompt, response.text, provider.name, video_type,
+                                              response.prompt_tokens, response.output_tokens, analysis, record=record)
+                        self._annotate(span, result)
+                        if store:
+                            self._store(key, result)
+                        return result
+                    fallback_reason = f"{provider.name}: empty response"
+                except Exception as e:
+                    fallback_reason = self._failed(span, provider, e, down)
+                    if record:
+                        self._observe(video_type, choice, attempt, started, failed=True)
+                    logger.error(f"{provider.name} generation failed: {e}")
+
+        # Ultimate fallback to template
+        script = self.template(topic, video_type, reference, fallback_reason)
+        return self._result(start, full_prompt, script, "template", video_type, record=record)
+
+    def generate_candidates(self, topic: str, video_type: str = "short", n: int = 3, channel: str = DEFAULT_CHANNEL,
+                            unit: str = None) -> List[GenerationResult]:
+        """Generate n variants in one provider round trip and return them best first.
+
+        Providers that can, return every variant from a single request (Gemini
+        ``candidate_count``, OpenAI ``n``); others are called concurrently. The
+        variants are ranked locally by score_script (length fit, section
+        completeness, closeness to the sample scripts) and the best one is
+        cached like a generate() result. The cache is not read: the caller
+        asked for fresh variants.
+        """
+        with self.tracer.span("generate_candidates", topic=topic, video_type=video_type, channel=channel, candidates=n) as root:
+            variant, prompt = self._variant(topic, video_type, channel, unit)
+            results = self._generate_candidates(topic, video_type, n, channel, variant, prompt)
+            if self.validation:
+                # Only the best variant is returned as the script, so only it is repaired
+                results[0] = self.repair(results[0], topic, video_type, channel)
+            self._store(self._key(topic, video_type, channel, variant), results[0])
+            self._record(results[0], video_type, channel, variant)
+            for result in results[1:]:
+                result.variant = variant
+            self._annotate(root, results[0])
+            root.set_attribute("score", results[0].score)
+            return results
+
+    def _candidate(self, start, full_prompt, response, provider, video_type, record):
+        analysis = None
+        script = response.text
+        if self.length_control:
+            # Several variants can't be cut off mid-stream, so trim them to the budget afterwards
+            analyzer = ScriptAnalyzer(video_type, length_budget(video_type))
+            script = (analyzer.feed(script) + analyzer.flush()).strip()
+            analysis = analyzer.finish()
+        return self._result(start, full_prompt, script, provider, video_type,
+                            response.prompt_tokens, response.output_tokens, analysis, record)
+
+    def _generate_candidates(self, topic, video_type, n, channel, variant=None, prompt=None):
+        start = time.perf_counter()
+        channel_data, full_prompt, reference = self.prepare(topic, video_type, channel, prompt)
+        fallback_reason = None
+        down = set()
+        for attempt, (provider, choice) in enumerate(self._plan(video_type), start=1):
+            if provider.name in down:
+                continue
+            with self._start_attempt(provider, choice, attempt, fallback_reason) as span:
+                span.set_attribute("candidates", n)
+                started = time.perf_counter()
+                try:
+                    logger.info(f"Generating {n} candidates with {provider.name}" + (f" ({choice.model})" if choice else ""))
+                    with self.metrics.timer(f"provider.{provider.name}"):
+                        responses = provider.generate_many(full_prompt, n, channel_data.system_prompt, *self._settings(choice, video_type))
+                    self._observe(video_type, choice, attempt, started)
+                    # Latency and provider metrics are recorded once per request, not per variant
+                    results = [self._candidate(start, full_prompt, response, provider.name, video_type, record=not index)
+                               for index, response in enumerate(response for response in responses if response.text)]
+                    if results:
+                        with self._stage("rank", candidates=len(results)):
+                            for result in results:
+                                result.score = score_script(result.script, result.analysis, video_type, channel_data.index)
+                            results.sort(key=lambda result: result.score, reverse=True)
+                        self.metrics.incr("candidates.generated", len(results))
+                        self._annotate(span, results[0])
+                        return results
+                    fallback_reason = f"{provider.name}: empty response"
+                except Exception as e:
+                    fallback_reason = self._failed(span, provider, e, down)
+                    self._observe(video_type, choice, attempt, started, failed=True)
+                    logger.error(f"{provider.name} candidate generation failed: {e}")
+
+        script = self.template(topic, video_type, reference, fallback_reason)
+        return [self._result(start, full_prompt, script, "template", video_type)]
+
+    def stream(self, topic: str, video_type: str = "short", channel: str = DEFAULT_CHANNEL, use_cache: bool = True,
+               unit: str = None, prepared=None) -> GenerationStream:
+        """Like generate(), but yields text chunks as the provider produces them.
+
+        Pass an earlier stream's ``prepared`` context to skip retrieval and prompt building.
+        """
+        start = time.perf_counter()
+        variant, prompt = self._variant(topic, video_type, channel, unit)
+        key = self._key(topic, video_type, channel, variant)
+        # Spans are started/ended explicitly: the generator may resume in another context
+        root = self.tracer.start_span("stream", self.tracer.current_span(), topic=topic, video_type=video_type, channel=channel)
+        try:
+            with self.tracer.activate(root):
+                if prepared is None:
+                    prepared = self.prepare(topic, video_type, channel, prompt)
+                channel_data, full_prompt, reference = prepared
+        except Exception as e:
+            root.record_exception(e)
+            self.tracer.end_span(root)
+            raise
+
+        def chunks():
+            try:
+                yield from produce()
+            finally:
+                if stream.result is not None:
+                    if stream.result.error is None:
+                        self._record(stream.result, video_type, channel, variant)
+                    else:
+                        # A cut-off script would skew the experiment like a failure counted as a success
+                        stream.result.variant = variant
+                    self._annotate(root, stream.result)
+                self.tracer.end_span(root)
+
+        def produce():
+            if use_cache:
+                with self.tracer.activate(root):
+                    hit = self._cached(key, start)
+                if hit:
+                    stream.result = hit
+                    yield hit.script
+                    return
+
+            fallback_reason = None
+            down = set()
+            for attempt, (provider, choice) in enumerate(self._plan(video_type), start=1):
+                if provider.name in down:
+                    continue
+                span = self._start_attempt(provider, choice, attempt, fallback_reason, parent=root)
+                parts = []
+                # Analyzed chunk by chunk, so the finished script needs no second pass
+                analyzer = ScriptAnalyzer(video_type, length_budget(video_type) if self.length_control else None)
+                complete = True
+                started = time.perf_counter()
+                try:
+                    logger.info(f"Streaming script with {provider.name}" + (f" ({choice.model})" if choice else ""))
+                    provider_chunks = provider.stream(full_prompt, channel_data.system_prompt, *self._settings(choice, video_type))
+                    with self.metrics.timer(f"provider.{provider.name}"):
+                        for text in provider_chunks:
+                            if "time_to_first_chunk_ms" not in span.attributes:
+                                span.set_attribute("time_to_first_chunk_ms", span.duration_ms)
+                            accepted = analyzer.feed(text)
+                            # With length control only whole, accepted lines are passed on
+                            text = accepted if self.length_control else text
+                            if text:
+                                parts.append(text)
+                                yield text
+                            if analyzer.stop_reason:
+                                if hasattr(provider_chunks, "close"):
+                                    provider_chunks.close()
+                                break
+                        tail = analyzer.flush() if self.length_control else ""
+                        if tail:
+                            parts.append(tail)
+                            yield tail
+                    self._observe(video_type, choice, attempt, started)
+                except Exception as e:
+                    fallback_reason = self._failed(span, provider, e, down)
+                    self._observe(video_type, choice, attempt, started, failed=True)
+                    logger.error(f"{provider.name} streaming failed: {e}")
+                    # Chunks already reached the caller, so another provider can't take over
+                    complete = False
+                finally:
+                    span.set_attribute("chunks", len(parts))
+                    self.tracer.end_span(span)
+                script = "".join(parts).strip()
+                if script:
+                    stream.result = self._result(start, full_prompt, script, provider.name, video_type, analysis=analyzer.finish())
+                    if not complete:
+                        # Marked even without validation, so callers don't show it as a finished script
+                        stream.result.error = fallback_reason
+                    if self.validation or not complete:
+                        # The text has already reached the caller, so it is only checked here; callers
+                        # that can replace it afterwards pass the result to repair()
+                        with self.tracer.activate(root):
+                            stream.result.defects = [defect.describe() for defect in
+                                                     self._validate(script, video_type, topic, cut_off=not complete)]
+                    if complete:
+                        self._store(key, stream.result)
+                    return
+                fallback_reason = fallback_reason or f"{provider.name}: empty response"
+
+            with self.tracer.activate(root):
+                script = self.template(topic, video_type, reference, fallback_reason)
+            stream.result = self._result(start, full_prompt, script, "template", video_type)
+            yield script
+
+        stream = GenerationStream(chunks(), prepared)
+        return stream
+
+    def _ask(self, prompt: str, video_type: str, channel_data, max_tokens: int, clean, purpose: str):
+        """First non-empty, cleaned provider answer to a rewrite prompt: (text, provider name, response).
+        Raises RuntimeError when no provider answers."""
+        fallback_reason = None
+        down = set()
+        for attempt, (provider, choice) in enumerate(self._plan(video_type), start=1):
+            if provider.name in down:
+                continue
+            with self._start_attempt(provider, choice, attempt, fallback_reason) as span:
+                span.set_attribute("max_tokens", max_tokens)
+                try:
+                    temperature = choice.temperature if choice is not None else None
+                    with self.metrics.timer(f"provider.{provider.name}"):
+                        response = provider.generate(prompt, channel_data.system_prompt, max_tokens, temperature)
+                    text = clean(response.text) if response.text else ""
+                    if text:
+                        return text, provider.name, response
+                    fallback_reason = f"{provider.name}: empty response"
+                except Exception as e:
+                    fallback_reason = self._failed(span, provider, e, down)
+                    logger.error(f"{provider.name} failed to {purpose}: {e}")
+        raise RuntimeError(f"No provider could {purpose} ({fallback_reason or 'no providers configured'})")
+
+    def revise(self, script: str, start: int, end: int, topic: str = "", instruction: str = "",
+               video_type: str = "short", channel: str = DEFAULT_CHANNEL, max_tokens: int = None) -> Revision:
+        """Rewrite paragraphs [start, end) of a script and splice the result back in.
+
+        Only those paragraphs and a clipped excerpt around them are sent, with
+        max_tokens sized to the section, so cost follows the section's length
+        rather than the script's. Raises IndexError for a bad range, KeyError
+        for unknown channels and RuntimeError when no provider answers.
+        """
+        paragraphs = split_paragraphs(script)
+        if not 0 <= start < end <= len(paragraphs):
+            raise IndexError(f"Paragraph range {start}-{end} outside 0-{len(paragraphs)}")
+        channel_data = self.registry.get(channel)
+        original = "\n\n".join(paragraphs[start:end])
+        started = time.perf_counter()
+        with self.tracer.span("revise", video_type=video_type, channel=channel, paragraphs=end - start) as root:
+            prompt = build_revision_prompt(paragraphs, start, end, topic, instruction)
+            # The rewrite should be about as long as the section it replaces
+            max_tokens = max_tokens or 2 * estimate_tokens(original) + 100
+            root.set_attribute("prompt_tokens", estimate_tokens(prompt))
+            revised, provider, response = self._ask(prompt, video_type, channel_data, max_tokens,
+                                                    lambda text: clean_revision(text, original), "revise the section")
+            paragraphs[start:end] = [revised]
+            latency_ms = (time.perf_counter() - started) * 1000
+            self.metrics.observe("revise", latency_ms)
+            self.metrics.incr(f"revise.{provider}")
+            root.set_attribute("provider", provider)
+            return Revision(
+                script="\n\n".join(paragraphs),
+                original=original,
+                revised=revised,
+                start=start,
+                end=end,
+                provider=provider,
+                prompt_tokens=response.prompt_tokens or estimate_tokens(prompt),
+                output_tokens=response.output_tokens or estimate_tokens(revised),
+                latency_ms=latency_ms,
+            )
+
+    def continue_script(self, script: str, topic: str = "", video_type: str = "short", channel: str = DEFAULT_CHANNEL,
+                        seconds: float = 15) -> Revision:
+        """Generate the rest of a cut-off script and append it; the prompt only carries the script's end.
+
+        ``seconds`` is about how much voiceover is missing and sizes max_tokens.
+        Raises KeyError for unknown channels and RuntimeError when no provider answers.
+        """
+        channel_data = self.registry.get(channel)
+        _, high = duration_target(video_type)
+        paragraphs = len(split_paragraphs(script))
+        started = time.perf_counter()
+        with self.tracer.span("continue", video_type=video_type, channel=channel) as root:
+            prompt = build_continuation_prompt(script, topic, format_duration(high))
+            max_tokens = section_tokens(seconds)
+            root.set_attribute("prompt_tokens", estimate_tokens(prompt))
+            continuation, provider, response = self._ask(prompt, video_type, channel_data, max_tokens,
+                                                         lambda text: text.strip(), "continue the script")
+            latency_ms = (time.perf_counter() - started) * 1000
+            self.metrics.observe("continue", latency_ms)
+            self.metrics.incr(f"continue.{provider}")
+            root.set_attribute("provider", provider)
+            return Revision(
+                script=join_continuation(script, continuation),
+                original="",
+                revised=continuation,
+                start=paragraphs,
+                end=paragraphs,
+                provider=provider,
+                prompt_tokens=response.prompt_tokens or estimate_tokens(prompt),
+                output_tokens=response.output_tokens or estimate_tokens(continuation),
+                latency_ms=latency_ms,
+            )
+
+    def _fix(self, script: str, defect: Defect, topic: str, video_type: str, channel: str) -> Revision:
+        """One targeted retry for a defect: rewrite its paragraphs, write the missing section, or continue the ending"""
+        if defect.kind == "language":
+            return self.revise(script, defect.start, defect.end, topic, LANGUAGE_INSTRUCTION, video_type, channel)
+        if defect.kind in ("truncated", "incomplete"):
+            return self.continue_script(script, topic, video_type, channel, defect.seconds)
+        if defect.kind == "missing_section":
+            # The header is put in as a paragraph of its own and written like an empty section
+            paragraphs = split_paragraphs(script)
+            paragraphs.insert(defect.start, defect.label)
+            script = "\n\n".join(paragraphs)
+            end = defect.start + 1
+        else:
+            end = defect.end
+        return self.revise(script, defect.start, end, topic, SECTION_INSTRUCTION, video_type, channel, section_tokens(defect.seconds))
+
+    def _validate(self, script: str, video_type: str, topic: str, cut_off: bool = False):
+        with self._stage("validate") as span:
+            defects = validate_script(script, video_type, cut_off)
+            span.set_attribute("defects", len(defects))
+        for defect in defects:
+            self.metrics.incr(f"validation.{defect.kind}")
+        if defects:
+            logger.warning(f"Script for '{topic}' failed validation: {', '.join(defect.describe() for defect in defects)}")
+        return defects
+
+    def repair(self, result: GenerationResult, topic: str, video_type: str = "short", channel: str = DEFAULT_CHANNEL) -> GenerationResult:
+        """Validate a result locally and retry only its defective parts.
+
+        Language, section coverage and truncation are checked by
+        validate_script (well under a millisecond). Each defect is fixed by one
+        targeted call: the wrong-language or empty section is rewritten, a
+        missing section is written into its gap and a cut-off ending is
+        continued, never the whole script. The script is checked again after
+        every fix, with at most MAX_REPAIRS calls; what can't be fixed is left
+        in ``defects``. Cached and template results are returned as they are.
+        A stream cut off by a provider error (``error``) is continued, and the
+        error is cleared once it has been.
+        """
+        if result.cached or result.provider == "template":
+            return result
+        if result.defects:
+            # Checked (and counted) when it was streamed
+            defects = validate_script(result.script, video_type, cut_off=result.error is not None)
+        else:
+            defects = self._validate(result.script, video_type, topic)
+        if not defects:
+            return result
+
+        started = time.perf_counter()
+        script, repairs, tried = result.script, [], set()
+        prompt_tokens = output_tokens = 0
+        while len(repairs) < MAX_REPAIRS:
+            defect = next((d for d in defects if d.repairable and (d.kind, d.label) not in tried), None)
+            if defect is None:
+                break
+            tried.add((defect.kind, defect.label))
+            with self._stage("repair", defect=defect.kind, section=defect.label):
+                try:
+                    revision = self._fix(script, defect, topic, video_type, channel)
+                except RuntimeError as e:
+                    logger.error(f"Could not repair {defect.describe()}: {e}")
+                    break
+            script = revision.script
+            prompt_tokens += revision.prompt_tokens
+            output_tokens += revision.output_tokens
+            repairs.append(defect.describe())
+            self.metrics.incr("validation.repaired")
+            defects = validate_script(script, video_type)
+
+        if defects:
+            self.metrics.incr("validation.unrepaired")
+        if not repairs:
+            return replace(result, defects=[defect.describe() for defect in defects])
+        analysis = replace(analyze(script, video_type), stop_reason=result.analysis.stop_reason if result.analysis else None)
+        return replace(
+            result,
+            script=script,
+            analysis=analysis,
+            prompt_tokens=result.prompt_tokens + prompt_tokens,
+            output_tokens=result.output_tokens + output_tokens,
+            latency_ms=result.latency_ms + (time.perf_counter() - started) * 1000,
+            repairs=repairs,
+            defects=[defect.describe() for defect in defects],
+            error=result.error if any(defect.kind == "truncated" for defect in defects) else None,
+        )
+
+    def stats(self):
+        """Metrics, cache and channel stats for monitoring endpoints"""
+        return {
+            "providers": [provider.name for provider in self.providers],
+            "metrics": self.metrics.snapshot(),
+            "cache": self.cache.stats() if self.cache else None,
+            "routing": self.router.stats() if self.router else None,
+            "channels": self.registry.stats(),
+        }
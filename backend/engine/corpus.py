@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import logging
+import threading
+from collections import Counter, OrderedDict
+
+from docx import Document
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNEL = "techfela"
+
+DEFAULT_SYSTEM_PROMPT = (
+    "You are a creative scriptwriter for TechFela YouTube channel that creates engaging, "
+    "humorous content in Roman Urdu for a Pakistani audience."
+)
+
+# File names used by the original single-channel layout (prompts next to main.py)
+DEFAULT_CHANNEL_FILES = {
+    "sample_scripts": "sample_scripts.docx",
+    "prompts": {
+        "base": "prompt.txt",
+        "short": "prompt that already worked no 2.txt",
+        "long": "prompt long Video.txt",
+    },
+}
+
+# ----------------------------
+# Loaders
+# ----------------------------
+def load_sample_scripts(file_path="sample_scripts.docx"):
+    """Load sample scripts from DOCX file"""
+    try:
+        if not os.path.exists(file_path):
+            logger.warning(f"Sample scripts file not found: {file_path}")
+            return []
+        document = Document(file_path)
+        scripts = [p.text.strip() for p in document.paragraphs if p.text.strip()]
+        logger.info(f"Loaded {len(scripts)} sample script paragraphs from {file_path}")
+        return scripts
+    except Exception as e:
+        logger.error(f"Error loading sample scripts: {e}")
+        return []
+
+def load_prompt(file_path="prompt.txt"):
+    """Load prompt from TXT file"""
+    try:
+        if not os.path.exists(file_path):
+            logger.warning(f"Prompt file not found: {file_path}")
+            return ""
+        with open(file_path, "r", encoding="utf-8") as file:
+            content = file.read()
+            logger.info(f"Loaded prompt from {file_path}")
+            return content
+    except Exception as e:
+        logger.error(f"Error loading prompt: {e}")
+        return ""
+
+# ----------------------------
+# Retrieval Index
+# ----------------------------
+class CorpusIndex:
+    """Inverted index over sample script paragraphs.
+
+    A lookup scans the distinct words of the corpus rather than its full text
+    and only touches the postings of words containing a topic word, so
+    retrieval cost grows with the vocabulary, not with the number of paragraphs.
+    """
+
+    def __init__(self, paragraphs):
+        self.paragraphs = paragraphs
+        self._postings = {}
+        for idx, paragraph in enumerate(paragraphs):
+            for word in set(paragraph.lower().split()):
+                self._postings.setdefault(word, []).append(idx)
+
+    def best_match(self, topic: str) -> str:
+        """Return the paragraph containing the most topic words (as substrings, so "phone" matches "iPhone,")"""
+        if not self.paragraphs:
+            return ""
+        scores = {}
+        for word, count in Counter((topic or "").lower().split()).items():
+            # A word without whitespace can only occur inside one whitespace-separated token,
+            # so scanning the vocabulary finds every paragraph that contains it
+            matches = set()
+            for token, postings in self._postings.items():
+                if word in token:
+                    matches.update(postings)
+            for idx in matches:
+                scores[idx] = scores.get(idx, 0) + count
+        if not scores:
+            return self.paragraphs[0]
+        # Ties go to the earliest paragraph, like max() over the list did
+        return self.paragraphs[min(scores, key=lambda idx: (-scores[idx], idx))]
+
+    def style_overlap(self, text: str) -> float:
+        """Share of the distinct words in text that also occur in the sample scripts (0-1)"""
+        words = set(text.lower().split())
+        if not words or not self._postings:
+            return 0.0
+        return sum(word in self._postings for word in words) / len(words)
+
+    def size_bytes(self) -> int:
+        """Approximate memory held by the paragraphs and postings"""
+        size = sum(sys.getsizeof(p) for p in self.paragraphs)
+        for word, postings in self._postings.items():
+            size += sys.getsizeof(word) + sys.getsizeof(postings) + 28 * len(postings)
+        return size
+
+# ----------------------------
+# Channels
+# ----------------------------
+class Channel:
+    """Prompts, system prompt and retrieval index for one channel/style"""
+
+    def __init__(self, name, system_prompt, prompts, index):
+        self.name = name
+        self.system_prompt = system_prompt
+        self.prompts = prompts
+        self.index = index
+        self.size_bytes = index.size_bytes() + sum(sys.getsizeof(p) for p in prompts.values())
+
+    def prompt_for(self, video_type: str) -> str:
+        """Pick the prompt for a video type, falling back to the base prompt"""
+        kind = "short" if video_type == "short" else "long"
+        return self.prompts.get(kind) or self.prompts.get("base", "")
+
+def load_channel(name: str, directory: str) -> Channel:
+    """Load a channel from its directory.
+
+    The directory holds the sample scripts DOCX, the prompt files and an
+    optional ``channel.json`` overriding file names and the system prompt.
+    """
+    config = {}
+    config_path = os.path.join(directory, "channel.json")
+    if os.path.exists(config_path):
+        with open(config_path, "r", encoding="utf-8") as file:
+            config = json.load(file)
+
+    prompt_files = dict(DEFAULT_CHANNEL_FILES["prompts"])
+    prompt_files.update(config.get("prompts", {}))
+    prompts = {kind: load_prompt(os.path.join(directory, file_name)) for kind, file_name in prompt_files.items()}
+
+    samples_file = config.get("sample_scripts", DEFAULT_CHANNEL_FILES["sample_scripts"])
+    index = CorpusIndex(load_sample_scripts(os.path.join(directory, samples_file)))
+
+    return Channel(name, config.get("system_prompt", DEFAULT_SYSTEM_PROMPT), prompts, index)
+
+class ChannelRegistry:
+    """Lazily loaded channels, evicted least-recently-used under a memory budget.
+
+    Channels live in ``channels_dir/<name>/``. The default channel falls back to
+    ``default_dir`` so the original single-channel layout keeps working.
+    """
+
+    def __init__(self, channels_dir="channels", memory_budget_bytes=64 * 1024 * 1024, default_dir="."):
+        self.channels_dir = channels_dir
+        self.memory_budget_bytes = memory_budget_bytes
+        self.default_dir = default_dir
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def _directory_for(self, name: str):
+        if not name or os.sep in name or name.startswith("."):
+            return None
+        directory = os.path.join(self.channels_dir, name)
+        if os.path.isdir(directory):
+            return directory
+        if name == DEFAULT_CHANNEL:
+            return self.default_dir
+        return None
+
+    def available(self):
+        """Names of all channels that can be loaded"""
+        names = {DEFAULT_CHANNEL}
+        if os.path.isdir(self.channels_dir):
+            names.update(entry for entry in os.listdir(self.channels_dir)
+                         if os.path.isdir(os.path.join(self.channels_dir, entry)))
+        return sorted(names)
+
+    def get(self, name: str = DEFAULT_CHANNEL) -> Channel:
+        """Return a loaded channel, loading it on first use. Raises KeyError for unknown channels."""
+        with self._lock:
+            channel = self._loaded.get(name)
+            if channel is not None:
+                self._loaded.move_to_end(name)
+                return channel
+
+        # Checked before a load lock is made, so unknown names never add one
+        directory = self._directory_for(name)
+        if directory is None:
+            raise KeyError(name)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Load outside the registry lock so other channels stay servable
+        with load_lock:
+            with self._lock:
+                channel = self._loaded.get(name)
+                if channel is not None:
+                    self._loaded.move_to_end(name)
+                    return channel
+
+            channel = load_channel(name, directory)
+
+            with self._lock:
+                self._loaded[name] = channel
+                self.loads += 1
+                self._evict()
+            logger.info(f"Loaded channel '{name}' ({channel.size_bytes} bytes)")
+            return channel
+
+    def _evict(self):
+        # Always keep the most recently used channel, even if it alone exceeds the budget
+        while len(self._loaded) > 1 and self.loaded_bytes() > self.memory_budget_bytes:
+            name, _ = self._loaded.popitem(last=False)
+            self.evictions += 1
+            logger.info(f"Evicted channel '{name}' from memory")
+
+    def loaded_bytes(self) -> int:
+        return sum(channel.size_bytes for channel in self._loaded.values())
+
+    def stats(self):
+        """Loaded channels and memory usage for health/monitoring"""
+        with self._lock:
+            return {
+                "available": self.available(),
+                "loaded": list(self._loaded),
+                "loaded_bytes": self.loaded_bytes(),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
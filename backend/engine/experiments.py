@@ -0,0 +1,176 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional
+
+from .corpus import DEFAULT_CHANNEL, load_prompt
+from .ranking import length_fit
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PromptVariant:
+    """A prompt arm: file names per kind ("short"/"long"); kinds left out use the channel's own prompt"""
+    name: str
+    weight: float = 1.0
+    prompts: Dict[str, str] = field(default_factory=dict)
+
+# The prompts shipped next to main.py; "control" is what the channel uses today
+DEFAULT_PROMPT_VARIANTS = [
+    PromptVariant("control", 50),
+    PromptVariant("worked_v1", 25, {"short": "prompt That Already Worked.txt"}),
+    PromptVariant("base", 25, {"short": "prompt.txt", "long": "prompt.txt"}),
+]
+
+def load_experiment(path: str, **kwargs) -> "PromptExperiment":
+    """Experiment from a JSON file shaped like
+    ``{"name": "prompts", "channel": "techfela", "prompt_dir": ".", "variants": [{"name": ..., "weight": ..., "prompts": {...}}]}``
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        config = json.load(file)
+    variants = [PromptVariant(**variant) for variant in config.pop("variants")]
+    return PromptExperiment(variants, **{**config, **kwargs})
+
+def _kind(video_type: str) -> str:
+    return "short" if video_type == "short" else "long"
+
+class PromptExperiment:
+    """Weighted, sticky assignment of requests to prompt variants, with per-variant telemetry.
+
+    A unit (client id, or the topic when there is none) is hashed together
+    with the experiment name onto [0, 1) and mapped to a variant by
+    cumulative weight, so the same unit always lands on the same prompt
+    while the weights stay the same. Only requests for ``channel`` take
+    part. ``record`` keeps prompt/output tokens, latency, length fit and
+    quality per variant and kind; cache hits and template fallbacks are
+    counted but left out of the averages.
+    """
+
+    def __init__(self, variants: List[PromptVariant] = None, name: str = "prompts", channel: str = DEFAULT_CHANNEL,
+                 prompt_dir: str = ".", window: int = 1024):
+        self.name = name
+        self.channel = channel
+        self.window = window
+        # Copies, since set_weights changes them
+        self.variants = [replace(variant, prompts=dict(variant.prompts)) for variant in variants or DEFAULT_PROMPT_VARIANTS]
+        if not self.variants or len({variant.name for variant in self.variants}) != len(self.variants):
+            raise ValueError("An experiment needs variants with unique names")
+        self._texts = {}
+        for variant in self.variants:
+            for kind, file_name in variant.prompts.items():
+                text = load_prompt(os.path.join(prompt_dir, file_name))
+                if not text:
+                    raise ValueError(f"Prompt {file_name} for variant {variant.name} is missing or empty")
+                self._texts[(variant.name, kind)] = text
+        self._lock = threading.Lock()
+        self._stats = defaultdict(self._empty)
+        self.set_weights({variant.name: variant.weight for variant in self.variants})
+
+    def _empty(self):
+        return {"requests": 0, "cached": 0, "fallbacks": 0, "prompt_tokens": 0, "output_tokens": 0,
+                "word_count": 0, "length_fit": 0.0, "quality": 0.0, "latencies": deque(maxlen=self.window)}
+
+    def set_weights(self, weights: Dict[str, float]):
+        """Change variant weights (unlisted variants keep theirs). Raises ValueError for unknown names or no positive weight."""
+        unknown = set(weights) - {variant.name for variant in self.variants}
+        if unknown:
+            raise ValueError(f"Unknown variants: {', '.join(sorted(unknown))}")
+        if any(weight < 0 for weight in weights.values()):
+            raise ValueError("Weights can't be negative")
+        updated = {variant.name: float(weights.get(variant.name, variant.weight)) for variant in self.variants}
+        total = sum(updated.values())
+        if total <= 0:
+            raise ValueError("At least one variant needs a positive weight")
+        with self._lock:
+            for variant in self.variants:
+                variant.weight = updated[variant.name]
+            # Cumulative upper bounds on [0, 1); zero-weight variants get an empty slice
+            bounds, running = [], 0.0
+            for variant in self.variants:
+                running += variant.weight / total
+                bounds.append((running, variant))
+            self._bounds = bounds
+
+    def assign(self, unit: str, channel: str = DEFAULT_CHANNEL) -> Optional[PromptVariant]:
+        """The unit's variant, or None when the channel is not in the experiment"""
+        if channel != self.channel:
+            return None
+        digest = hashlib.blake2b(f"{self.name}:{unit}".encode("utf-8"), digest_size=8).digest()
+        point = int.from_bytes(digest, "big") / 2 ** 64
+        bounds = self._bounds
+        for bound, variant in bounds:
+            if point < bound and variant.weight > 0:
+                return variant
+        # Rounding can leave the very top of [0, 1) uncovered
+        return next(variant for _, variant in reversed(bounds) if variant.weight > 0)
+
+    def prompt(self, variant: Optional[PromptVariant], video_type: str) -> Optional[str]:
+        """The variant's prompt text for a video type, or None to use the channel's"""
+        if variant is None:
+            return None
+        return self._texts.get((variant.name, _kind(video_type)))
+
+    def record(self, variant: str, result, video_type: str, quality: float = None):
+        """Add a finished generation (a GenerationResult) to its variant's numbers"""
+        with self._lock:
+            stats = self._stats[(variant, _kind(video_type))]
+            stats["requests"] += 1
+            if result.cached:
+                stats["cached"] += 1
+                return
+            if result.provider == "template":
+                # Template scripts say nothing about the prompt, only that every provider failed
+                stats["fallbacks"] += 1
+                return
+            stats["prompt_tokens"] += result.prompt_tokens
+            stats["output_tokens"] += result.output_tokens
+            stats["latencies"].append(result.latency_ms)
+            if result.analysis is not None:
+                stats["word_count"] += result.analysis.word_count
+                stats["length_fit"] += length_fit(result.analysis, video_type)
+            if quality is not None:
+                stats["quality"] += quality
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    @staticmethod
+    def _percentile(values, q: float):
+        return round(values[min(len(values) - 1, int(len(values) * q / 100))], 1) if values else None
+
+    def stats(self):
+        """Per variant: weight, share and, per kind, request counts, fallback rate and averages"""
+        with self._lock:
+            snapshot = {key: dict(stats, latencies=sorted(stats["latencies"])) for key, stats in self._stats.items()}
+            total_weight = sum(variant.weight for variant in self.variants)
+            variants = {variant.name: {"weight": variant.weight, "share": round(variant.weight / total_weight, 4),
+                                       "prompts": dict(variant.prompts), "results": {}}
+                        for variant in self.variants}
+        for (name, kind), stats in snapshot.items():
+            if name not in variants:
+                continue
+            served = stats["requests"] - stats["cached"]
+            generated = served - stats["fallbacks"]
+            latencies = stats["latencies"]
+
+            def average(key):
+                return round(stats[key] / generated, 3) if generated else None
+
+            variants[name]["results"][kind] = {
+                "requests": stats["requests"],
+                "cached": stats["cached"],
+                "fallback_rate": round(stats["fallbacks"] / served, 4) if served else None,
+                "prompt_tokens_avg": average("prompt_tokens"),
+                "output_tokens_avg": average("output_tokens"),
+                "latency_p50_ms": self._percentile(latencies, 50),
+                "latency_p95_ms": self._percentile(latencies, 95),
+                "word_count_avg": average("word_count"),
+                "length_fit_avg": average("length_fit"),
+                "quality_avg": average("quality"),
+            }
+        return {"name": self.name, "channel": self.channel, "variants": variants}
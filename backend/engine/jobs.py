@@ -0,0 +1,119 @@
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .corpus import DEFAULT_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    """Handle for a queued generation; safe to keep in session state and poll"""
+
+    def __init__(self, topic: str, video_type: str, channel: str, candidates: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.topic = topic
+        self.video_type = video_type
+        self.channel = channel
+        self.candidates = candidates
+        self.status = "queued"  # queued -> running -> done | failed
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.results = []  # GenerationResults, best first
+        self.error = None
+        self._parts = []
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    @property
+    def result(self):
+        return self.results[0] if self.results else None
+
+    @property
+    def text(self) -> str:
+        """The script so far: streamed text while running, the best script once done"""
+        if self.results:
+            return self.results[0].script
+        return "".join(self._parts)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.time()) - self.submitted_at
+
+class JobRunner:
+    """Process-wide generation queue with a global concurrency limit.
+
+    ``submit`` returns a Job immediately; at most ``max_workers`` generations
+    run at once across every caller (all Streamlit sessions share one runner),
+    and the rest wait in order. Single scripts are streamed so ``Job.text``
+    shows progress; several candidates come from one generate_candidates call.
+    """
+
+    def __init__(self, engine, max_workers: int = 4, max_pending: int = 100):
+        self.engine = engine
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generation")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, topic: str, video_type: str = "short", channel: str = DEFAULT_CHANNEL, candidates: int = 1) -> Job:
+        """Queue a generation. Raises RuntimeError when max_pending jobs are already waiting or running."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise RuntimeError(f"Generation queue is full ({self.max_pending} jobs)")
+            self._pending += 1
+        job = Job(topic, video_type, channel, candidates)
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job):
+        job.started_at = time.time()
+        job.status = "running"
+        try:
+            if job.candidates > 1:
+                job.results = self.engine.generate_candidates(job.topic, job.video_type, job.candidates, job.channel)
+            else:
+                # Every request should produce a fresh script, so skip the response cache
+                stream = self.engine.stream(job.topic, job.video_type, job.channel, use_cache=False)
+                for text in stream:
+                    job._parts.append(text)
+                result = stream.result
+                if self.engine.validation or result.error:
+                    # Job.text switches to the result once done, so the repaired script replaces the streamed one
+                    result = self.engine.repair(result, job.topic, job.video_type, job.channel)
+                if result.error:
+                    raise RuntimeError(f"Generation stopped early ({result.error})")
+                job.results = [result]
+            job.status = "done"
+        except Exception as e:
+            logger.error(f"Generation job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            job._parts = []
+            with self._lock:
+                self._pending -= 1
+                if job.status == "done":
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "pending": self._pending,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,57 @@
+import time
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+class Metrics:
+    """Thread-safe counters and latency timings (kept over a sliding window)"""
+
+    def __init__(self, window=1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._timings = defaultdict(lambda: deque(maxlen=self.window))
+        self._timing_totals = defaultdict(int)
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, ms: float):
+        with self._lock:
+            self._timings[name].append(ms)
+            self._timing_totals[name] += 1
+
+    @contextmanager
+    def timer(self, name: str):
+        """Record how long the block took, in milliseconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def percentile(self, name: str, q: float):
+        """q-th percentile (0-100) of the recent timings for name, or None"""
+        with self._lock:
+            values = sorted(self._timings.get(name, ()))
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+    def snapshot(self):
+        """Counters plus count/p50/p95/max per timing"""
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {name: (sorted(values), self._timing_totals[name]) for name, values in self._timings.items()}
+        summary = {}
+        for name, (values, count) in timings.items():
+            if not values:
+                continue
+            summary[name] = {
+                "count": count,
+                "p50_ms": round(values[len(values) // 2], 3),
+                "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+                "max_ms": round(values[-1], 3),
+            }
+        return {"counters": counters, "timings": summary}
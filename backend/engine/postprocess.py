@@ -0,0 +1,228 @@
+import re
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Average Roman Urdu / English voiceover pace
+SPEAKING_RATE_WPM = 150
+
+# Target length per video type, in seconds (anything that isn't short is long)
+DURATION_TARGETS = {"short": (60, 90), "long": (180, 360)}
+
+# A section may run this much over its time slot before it is flagged
+SECTION_TOLERANCE = 1.25
+
+# Length control: hard word ceiling relative to the target, and a generous
+# tokens-per-word ratio (Roman Urdu plus on-screen cues) for max_tokens
+WORD_SLACK = 1.5
+TOKENS_PER_WORD = 2.5
+
+# "(0-15 seconds)", "(90-150 secs)", "(1:30-2:00)", "(2-3 minutes)"
+SECTION_HEADER = re.compile(
+    r"\(\s*(\d+(?::\d{1,2})?)\s*[-–]\s*(\d+(?::\d{1,2})?)\s*"
+    r"(s|secs?|seconds?|m|mins?|minutes?)?\s*\)",
+    re.IGNORECASE,
+)
+
+# Lines that are shown on screen rather than spoken
+UNSPOKEN_LINE = re.compile(r"^[\W_]*(visual|video title|title)\b[^:]*:", re.IGNORECASE)
+SPEAKER_LABEL = re.compile(r"^[\W_]*(voiceover|voice over|vo)\s*:[*_]*", re.IGNORECASE)
+MARKUP = " \t*_#>"
+
+def _seconds(value: str, unit: str) -> float:
+    if ":" in value:
+        minutes, _, seconds = value.partition(":")
+        return int(minutes) * 60 + int(seconds)
+    return int(value) * (60 if unit and unit.lower().startswith("m") else 1)
+
+def spoken_seconds(words: int) -> float:
+    return words * 60 / SPEAKING_RATE_WPM
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 120:
+        return f"{seconds} seconds"
+    minutes, seconds = divmod(seconds, 60)
+    return f"{minutes} min {seconds} sec" if seconds else f"{minutes} minutes"
+
+def duration_target(video_type: str):
+    return DURATION_TARGETS["short" if video_type == "short" else "long"]
+
+@dataclass(frozen=True)
+class LengthBudget:
+    """How long a script may get before generation is stopped"""
+    max_seconds: float
+    target_words: int
+    max_words: int
+    max_tokens: int
+
+    @lru_cache(maxsize=None)
+    def hint(self) -> str:
+        """Prompt line steering the model towards the target length"""
+        return (f"Keep the whole script within {format_duration(self.max_seconds)} of voiceover "
+                f"(about {self.target_words} spoken words) and finish with the closing section.")
+
+def length_budget(video_type: str) -> LengthBudget:
+    return _length_budget("short" if video_type == "short" else "long")
+
+@lru_cache(maxsize=None)
+def _length_budget(kind: str) -> LengthBudget:
+    # One shared instance per kind: it is looked up several times per request
+    max_seconds = DURATION_TARGETS[kind][1]
+    target_words = int(max_seconds * SPEAKING_RATE_WPM / 60)
+    max_words = int(target_words * WORD_SLACK)
+    return LengthBudget(max_seconds, target_words, max_words, int(max_words * TOKENS_PER_WORD))
+
+@dataclass
+class Section:
+    """A timestamped block of the script, e.g. ``(0-15 seconds)``"""
+    label: str
+    start_seconds: float
+    end_seconds: float
+    word_count: int = 0
+    estimated_seconds: float = 0.0
+    overrun: bool = False
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "start_seconds": self.start_seconds,
+            "end_seconds": self.end_seconds,
+            "word_count": self.word_count,
+            "estimated_seconds": round(self.estimated_seconds, 1),
+            "overrun": self.overrun,
+        }
+
+@dataclass
+class ScriptAnalysis:
+    """Word counts, sections and spoken-duration estimates for a script"""
+    word_count: int
+    spoken_words: int
+    estimated_seconds: float
+    estimated_duration: str
+    sections: List[Section] = field(default_factory=list)
+    overrun: bool = False
+    stop_reason: Optional[str] = None  # why length control ended the script early
+
+class ScriptAnalyzer:
+    """Single-pass, incremental analysis of a script as its chunks arrive.
+
+    ``feed`` only scans complete lines (the unfinished tail is held back until
+    its newline arrives), so a streamed script is processed once in total and
+    ``finish`` only has the last line left to look at. Batch callers feed the
+    whole text once via ``analyze``.
+
+    With a ``budget`` the analyzer also decides where the script ends: the
+    first line that opens a section past the target duration, or that pushes
+    the spoken words over the ceiling, sets ``stop_reason`` and is dropped
+    along with everything after it. ``feed`` and ``flush`` return the text
+    that made it in, line by line.
+    """
+
+    def __init__(self, video_type: str = "short", budget: LengthBudget = None):
+        self.video_type = video_type
+        self.budget = budget
+        self.word_count = 0
+        self.spoken_words = 0
+        self.sections = []
+        self.stop_reason = None
+        self._tail = []
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk; returns the complete lines accepted so far"""
+        if self.stop_reason:
+            return ""
+        cut = chunk.rfind("\n")
+        if cut < 0:
+            self._tail.append(chunk)
+            return ""
+        if self._tail:
+            self._tail.append(chunk)
+            chunk = "".join(self._tail)
+            cut = chunk.rfind("\n")
+        accepted = self._scan(chunk, cut + 1)
+        rest = chunk[cut + 1:]
+        self._tail = [rest] if rest and not self.stop_reason else []
+        # A chunk ending on a newline and accepted whole is passed on without a copy
+        return chunk if accepted == len(chunk) else chunk[:accepted]
+
+    def _scan(self, text: str, end: int) -> int:
+        """Analyze the lines in text[:end] one at a time; returns where the accepted lines end"""
+        position = 0
+        while position < end:
+            newline = text.find("\n", position, end)
+            stop = end if newline < 0 else newline
+            if not self._line(text[position:stop]):
+                return position
+            position = stop + 1
+        return end
+
+    def flush(self) -> str:
+        """Consume the unfinished last line; returns it if accepted"""
+        line = "".join(self._tail)
+        self._tail = []
+        if self.stop_reason or not line or not self._line(line):
+            return ""
+        return line
+
+    def _line(self, line: str) -> bool:
+        words = len(line.split())
+        if not words:
+            return True
+        match = SECTION_HEADER.search(line)
+        section = None
+        if match:
+            start, end, unit = match.groups()
+            # "(0-1 minutes)" style: the unit applies to both numbers
+            section = Section(match.group(0), _seconds(start, unit), _seconds(end, unit))
+            before, after = self._spoken(line[:match.start()]), self._spoken(line[match.end():])
+        else:
+            before, after = self._spoken(line), 0
+
+        if self.budget is not None:
+            if section is not None and section.start_seconds >= self.budget.max_seconds:
+                self.stop_reason = f"section {section.label} starts past {format_duration(self.budget.max_seconds)}"
+                return False
+            if self.spoken_words + before + after > self.budget.max_words:
+                self.stop_reason = f"over {self.budget.max_words} spoken words"
+                return False
+
+        self.word_count += words
+        self.spoken_words += before + after
+        if self.sections:
+            self.sections[-1].word_count += before
+        if section is not None:
+            self.sections.append(section)
+            section.word_count += after
+        return True
+
+    @staticmethod
+    def _spoken(text: str) -> int:
+        text = text.strip(MARKUP)
+        if not text or UNSPOKEN_LINE.match(text):
+            return 0
+        return len(SPEAKER_LABEL.sub("", text, count=1).split())
+
+    def finish(self) -> ScriptAnalysis:
+        self.flush()
+        for section in self.sections:
+            section.estimated_seconds = spoken_seconds(section.word_count)
+            slot = section.end_seconds - section.start_seconds
+            section.overrun = slot > 0 and section.estimated_seconds > slot * SECTION_TOLERANCE
+        estimated = spoken_seconds(self.spoken_words)
+        return ScriptAnalysis(
+            word_count=self.word_count,
+            spoken_words=self.spoken_words,
+            estimated_seconds=round(estimated, 1),
+            estimated_duration=format_duration(estimated),
+            sections=self.sections,
+            overrun=estimated > duration_target(self.video_type)[1],
+            stop_reason=self.stop_reason,
+        )
+
+def analyze(script: str, video_type: str = "short") -> ScriptAnalysis:
+    """Analyze a finished script in one pass"""
+    analyzer = ScriptAnalyzer(video_type)
+    # Scanned in place: no line list or accepted copy is built for a batch call
+    analyzer._scan(script, len(script))
+    return analyzer.finish()
@@ -0,0 +1,10 @@
+MIN_REFERENCE_CHARS = 50  # Shorter excerpts add tokens without adding style
+
+def build_prompt(prompt: str, topic: str, reference: str = "", length_hint: str = "") -> str:
+    """Assemble the full prompt sent to the model: instructions, topic, length hint and reference excerpt"""
+    parts = [prompt, "\n\nThe topic of the script is: ", topic, "."]
+    if length_hint:
+        parts += ["\n", length_hint]
+    if reference and len(reference) > MIN_REFERENCE_CHARS:
+        parts += ["\n\nReference Script Excerpt:\n", reference, "\n\n"]
+    return "".join(parts)
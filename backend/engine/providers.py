@@ -0,0 +1,223 @@
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ProviderResponse:
+    """Text returned by a provider, with token usage when the provider reports it"""
+    text: str
+    prompt_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+class Provider:
+    """Interface every text generation provider implements.
+
+    ``name`` identifies the provider in metrics and stored results. Providers
+    without native streaming can rely on the default ``stream``, which yields
+    the whole text as a single chunk.
+    """
+
+    name = "provider"
+
+    def generate(self, prompt: str, system_prompt: str = "", max_tokens=None, temperature=None) -> ProviderResponse:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, system_prompt: str = "", max_tokens=None, temperature=None):
+        response = self.generate(prompt, system_prompt, max_tokens, temperature)
+        if response.text:
+            yield response.text
+
+    def generate_many(self, prompt: str, n: int, system_prompt: str = "", max_tokens=None, temperature=None):
+        """n independent responses to one prompt; providers that can return several in one call override this"""
+        if n <= 1:
+            return [self.generate(prompt, system_prompt, max_tokens, temperature)]
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            futures = [pool.submit(self.generate, prompt, system_prompt, max_tokens, temperature) for _ in range(n)]
+        responses = []
+        for future in futures:
+            try:
+                responses.append(future.result())
+            except Exception as e:
+                logger.error(f"{self.name} candidate failed: {e}")
+        if not responses:
+            # Every call failed: surface the error so the caller can fall back
+            futures[0].result()
+        return responses
+
+    def with_model(self, model_name: str) -> "Provider":
+        """This provider bound to another model; providers without model choice return themselves"""
+        return self
+
+    def unavailable(self, error: Exception) -> bool:
+        """Whether an error rules out all of this provider's models (rejected key, no connection), not just the one called"""
+        return isinstance(error, ConnectionError)
+
+    def warmup(self):
+        """Initialize the SDK and open a connection without generating anything (no-op by default)"""
+
+class GeminiProvider(Provider):
+    """Google Gemini via google-generativeai"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = "gemini-2.0-flash"):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def with_model(self, model_name: str) -> "GeminiProvider":
+        import google.generativeai as genai
+
+        if model_name == self.model_name:
+            return self
+        variant = copy.copy(self)
+        variant.model_name = model_name
+        variant.model = genai.GenerativeModel(model_name)
+        return variant
+
+    def unavailable(self, error: Exception) -> bool:
+        from google.api_core import exceptions
+
+        if isinstance(error, (exceptions.Unauthenticated, exceptions.PermissionDenied)):
+            return True
+        # A bad key is a 400 with this reason; a 503 is usually an overloaded model unless gRPC couldn't connect
+        if getattr(error, "reason", None) == "API_KEY_INVALID":
+            return True
+        if isinstance(error, exceptions.ServiceUnavailable) and "failed to connect" in str(error).lower():
+            return True
+        return super().unavailable(error)
+
+    def warmup(self):
+        import google.generativeai as genai
+
+        # Model metadata is free and sets up the client and its connection
+        genai.get_model(f"models/{self.model_name}")
+
+    def _config(self, max_tokens, temperature):
+        config = {}
+        if max_tokens is not None:
+            config["max_output_tokens"] = max_tokens
+        if temperature is not None:
+            config["temperature"] = temperature
+        return config or None
+
+    def generate(self, prompt: str, system_prompt: str = "", max_tokens=None, temperature=None) -> ProviderResponse:
+        response = self.model.generate_content(prompt, generation_config=self._config(max_tokens, temperature))
+        return ProviderResponse(response.text.strip() if response.text else "")
+
+    def generate_many(self, prompt: str, n: int, system_prompt: str = "", max_tokens=None, temperature=None):
+        """n candidates from a single request via ``candidate_count``"""
+        config = self._config(max_tokens, temperature) or {}
+        config["candidate_count"] = n
+        response = self.model.generate_content(prompt, generation_config=config)
+        responses = []
+        for candidate in response.candidates:
+            content = getattr(candidate, "content", None)
+            text = "".join(getattr(part, "text", "") for part in getattr(content, "parts", None) or [])
+            responses.append(ProviderResponse(text.strip()))
+        return responses
+
+    def stream(self, prompt: str, system_prompt: str = "", max_tokens=None, temperature=None):
+        """Yield text chunks as Gemini produces them"""
+        response = self.model.generate_content(prompt, generation_config=self._config(max_tokens, temperature), stream=True)
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+class OpenAIProvider(Provider):
+    """OpenAI chat completions (openai>=1.0 client)"""
+
+    name = "openai"
+
+    def __init__(self, api_key: str, model_name: str = "gpt-3.5-turbo", max_tokens: int = 2000, temperature: float = 0.7):
+        import openai
+
+        self.client = openai.OpenAI(api_key=api_key)
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    def with_model(self, model_name: str) -> "OpenAIProvider":
+        if model_name == self.model_name:
+            return self
+        variant = copy.copy(self)  # shares the HTTP client
+        variant.model_name = model_name
+        return variant
+
+    def unavailable(self, error: Exception) -> bool:
+        import openai
+
+        if isinstance(error, openai.APITimeoutError):
+            return False  # a slow model; a faster one may still answer in time
+        if isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError, openai.APIConnectionError)):
+            return True
+        return super().unavailable(error)
+
+    def warmup(self):
+        # Free request that opens the pooled TLS connection later calls reuse
+        self.client.models.retrieve(self.model_name)
+
+    def _request(self, prompt, system_prompt, max_tokens, temperature, **kwargs):
+        return self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=self.max_tokens if max_tokens is None else max_tokens,
+            temperature=self.temperature if temperature is None else temperature,
+            **kwargs
+        )
+
+    def generate(self, prompt: str, system_prompt: str = "", max_tokens=None, temperature=None) -> ProviderResponse:
+        response = self._request(prompt, system_prompt, max_tokens, temperature)
+        usage = getattr(response, "usage", None)
+        return ProviderResponse(
+            (response.choices[0].message.content or "").strip(),
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+        )
+
+    def generate_many(self, prompt: str, n: int, system_prompt: str = "", max_tokens=None, temperature=None):
+        """n choices from a single request; the prompt is billed once"""
+        response = self._request(prompt, system_prompt, max_tokens, temperature, n=n)
+        usage = getattr(response, "usage", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        return [
+            ProviderResponse(
+                (choice.message.content or "").strip(),
+                getattr(usage, "prompt_tokens", None),
+                # Usage covers all choices together
+                completion_tokens // len(response.choices) if completion_tokens else None,
+            )
+            for choice in response.choices
+        ]
+
+    def stream(self, prompt: str, system_prompt: str = "", max_tokens=None, temperature=None):
+        """Yield text chunks as OpenAI produces them"""
+        for chunk in self._request(prompt, system_prompt, max_tokens, temperature, stream=True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+def create_providers(google_api_key: Optional[str] = None, openai_api_key: Optional[str] = None):
+    """Configured providers in fallback order (Gemini first, then OpenAI)"""
+    providers = []
+    if google_api_key:
+        try:
+            providers.append(GeminiProvider(google_api_key))
+            logger.info("Gemini AI initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize Gemini AI: {e}")
+    if openai_api_key:
+        try:
+            providers.append(OpenAIProvider(openai_api_key))
+            logger.info("OpenAI initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize OpenAI: {e}")
+    return providers
@@ -0,0 +1,31 @@
+from .postprocess import ScriptAnalysis, duration_target
+
+# How much each signal counts towards a candidate's score
+WEIGHTS = {"length": 0.5, "sections": 0.3, "style": 0.2}
+
+def length_fit(analysis: ScriptAnalysis, video_type: str) -> float:
+    """1 inside the video type's target duration, falling off linearly outside it"""
+    low, high = duration_target(video_type)
+    seconds = analysis.estimated_seconds
+    if seconds < low:
+        return seconds / low
+    if seconds > high:
+        return max(0.0, 1 - (seconds - high) / high)
+    return 1.0
+
+def section_completeness(analysis: ScriptAnalysis, video_type: str) -> float:
+    """How much of the target duration the timestamp sections cover, discounted for overrunning sections"""
+    if not analysis.sections:
+        return 0.0
+    low, _ = duration_target(video_type)
+    covered = min(1.0, max(section.end_seconds for section in analysis.sections) / low)
+    within = sum(not section.overrun for section in analysis.sections) / len(analysis.sections)
+    return covered * within
+
+def score_script(script: str, analysis: ScriptAnalysis, video_type: str, index=None) -> float:
+    """Cheap local quality score (0-1) used to rank candidates without another model call"""
+    score = WEIGHTS["length"] * length_fit(analysis, video_type)
+    score += WEIGHTS["sections"] * section_completeness(analysis, video_type)
+    if index is not None:
+        score += WEIGHTS["style"] * index.style_overlap(script)
+    return round(score, 4)
@@ -0,0 +1,189 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from .providers import Provider, ProviderResponse
+
+logger = logging.getLogger(__name__)
+
+def request_key(prompt: str, system_prompt: str = "", max_tokens=None, temperature=None, model: str = None) -> str:
+    """Stable key for a provider request, used to match replays to recordings.
+    Without a model the key is the one cassettes recorded before models were part of it."""
+    parts = [prompt, system_prompt, max_tokens, temperature] + ([model] if model else [])
+    payload = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def cassette_path(cassette_dir: str, name: str) -> str:
+    return os.path.join(cassette_dir, f"{name}.jsonl")
+
+class RecordingProvider(Provider):
+    """Pass calls through to a real provider and append responses and timings to a cassette.
+
+    Each line of ``<cassette_dir>/<provider>.jsonl`` holds the request key, the
+    model, the text, token usage and either the total latency or, for streams,
+    the offset of every chunk from the start of the call.
+    """
+
+    def __init__(self, inner: Provider, cassette_dir: str = "cassettes"):
+        self.inner = inner
+        self.name = inner.name
+        self.path = cassette_path(cassette_dir, inner.name)
+        self._lock = threading.Lock()
+        os.makedirs(cassette_dir, exist_ok=True)
+
+    def _key(self, prompt, system_prompt, max_tokens, temperature):
+        model = getattr(self.inner, "model_name", None)
+        return {"key": request_key(prompt, system_prompt, max_tokens, temperature, model), "model": model}
+
+    def _append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+    def with_model(self, model_name: str) -> "RecordingProvider":
+        inner = self.inner.with_model(model_name)
+        if inner is self.inner:
+            return self
+        variant = copy.copy(self)  # same cassette file and lock
+        variant.inner = inner
+        return variant
+
+    def warmup(self):
+        self.inner.warmup()
+
+    def unavailable(self, error: Exception) -> bool:
+        return self.inner.unavailable(error)
+
+    def generate(self, prompt: str, system_prompt: str = "", max_tokens=None, temperature=None) -> ProviderResponse:
+        start = time.perf_counter()
+        response = self.inner.generate(prompt, system_prompt, max_tokens, temperature)
+        self._append({
+            **self._key(prompt, system_prompt, max_tokens, temperature),
+            "text": response.text,
+            "prompt_tokens": response.prompt_tokens,
+            "output_tokens": response.output_tokens,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+        })
+        return response
+
+    def stream(self, prompt: str, system_prompt: str = "", max_tokens=None, temperature=None):
+        start = time.perf_counter()
+        chunks = []
+        for text in self.inner.stream(prompt, system_prompt, max_tokens, temperature):
+            chunks.append([(time.perf_counter() - start) * 1000, text])
+            yield text
+        # Only complete streams are recorded; an exception above skips this
+        self._append({
+            **self._key(prompt, system_prompt, max_tokens, temperature),
+            "text": "".join(text for _, text in chunks).strip(),
+            "prompt_tokens": None,
+            "output_tokens": None,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "chunks": chunks,
+        })
+
+class ReplayProvider(Provider):
+    """Serve recorded responses with their recorded timing, no network or API key needed.
+
+    Requests are matched by key; repeated recordings of one key are served in
+    turn so the latency distribution is reproduced. ``with_model`` returns a
+    replay of only that model's recordings (what the router asks for); the
+    provider itself matches recordings of any model. Unmatched requests get a
+    recording picked deterministically from the key unless ``strict`` is set,
+    which keeps the real cost profile for prompts that were never recorded.
+    ``speed`` scales the delays (0 replays instantly).
+    """
+
+    def __init__(self, name: str, cassette_dir: str = "cassettes", speed: float = 1.0, strict: bool = False):
+        self.name = name
+        self.model_name = None
+        self.speed = speed
+        self.strict = strict
+        self._entries = []
+        self._by_key = {}
+        self._turns = {}
+        self._lock = threading.Lock()
+        with open(cassette_path(cassette_dir, name), "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._by_key.setdefault(entry["key"], []).append(entry)
+                    self._entries.append(entry)
+        if not self._entries:
+            raise ValueError(f"Cassette for {name} is empty")
+        # In recording order; None for entries recorded before the model was stored
+        self._models = list(dict.fromkeys(entry.get("model") for entry in self._entries))
+        logger.info(f"Replaying {len(self._entries)} recorded {name} responses")
+
+    def with_model(self, model_name: str) -> "ReplayProvider":
+        if model_name == self.model_name:
+            return self
+        variant = copy.copy(self)  # same recordings, turns and lock
+        variant.model_name = model_name
+        variant._models = [model_name]
+        variant._entries = [entry for entry in self._entries if entry.get("model") == model_name]
+        return variant
+
+    def _entry(self, prompt, system_prompt, max_tokens, temperature):
+        keys = [request_key(prompt, system_prompt, max_tokens, temperature, model) for model in self._models]
+        key = next((key for key in keys if key in self._by_key), None)
+        if key is None:
+            key = keys[0]
+            if self.strict or not self._entries:
+                # Another model's text and timing would make the replay meaningless
+                raise KeyError(f"No {self.name} recording for request {key[:12]}" + (f" ({self.model_name})" if self.model_name else ""))
+            return self._entries[int(key, 16) % len(self._entries)]
+        recordings = self._by_key[key]
+        with self._lock:
+            turn = self._turns.get(key, 0)
+            self._turns[key] = turn + 1
+        return recordings[turn % len(recordings)]
+
+    def _sleep(self, ms):
+        if self.speed and ms > 0:
+            time.sleep(ms * self.speed / 1000)
+
+    def generate(self, prompt: str, system_prompt: str = "", max_tokens=None, temperature=None) -> ProviderResponse:
+        entry = self._entry(prompt, system_prompt, max_tokens, temperature)
+        self._sleep(entry["latency_ms"])
+        return ProviderResponse(entry["text"], entry.get("prompt_tokens"), entry.get("output_tokens"))
+
+    def stream(self, prompt: str, system_prompt: str = "", max_tokens=None, temperature=None):
+        entry = self._entry(prompt, system_prompt, max_tokens, temperature)
+        chunks = entry.get("chunks") or [[entry["latency_ms"], entry["text"]]]
+        elapsed = 0.0
+        for offset_ms, text in chunks:
+            self._sleep(offset_ms - elapsed)
+            elapsed = offset_ms
+            yield text
+
+def apply_provider_mode(providers, mode: str = "live", cassette_dir: str = "cassettes", speed: float = 1.0):
+    """Wrap providers for the given mode.
+
+    ``live`` returns them unchanged, ``record`` captures every call to the
+    cassette directory, and ``replay`` ignores them and serves one
+    ReplayProvider per recorded cassette (Gemini first, then OpenAI, then others).
+    """
+    if mode == "record":
+        return [RecordingProvider(provider, cassette_dir) for provider in providers]
+    if mode == "replay":
+        if not os.path.isdir(cassette_dir):
+            logger.error(f"Cassette directory not found: {cassette_dir}")
+            return []
+        names = sorted(
+            (file_name[:-len(".jsonl")] for file_name in os.listdir(cassette_dir) if file_name.endswith(".jsonl")),
+            key=lambda name: ({"gemini": 0, "openai": 1}.get(name, 2), name),
+        )
+        replays = []
+        for name in names:
+            try:
+                replays.append(ReplayProvider(name, cassette_dir, speed))
+            except Exception as e:
+                logger.error(f"Failed to load {name} cassette: {e}")
+        return replays
+    return list(providers)
@@ -0,0 +1,119 @@
+import re
+from dataclasses import dataclass
+
+from .postprocess import SECTION_HEADER
+
+# Neighbouring text sent along with the section, per side
+CONTEXT_CHARS = 300
+
+REVISION_INSTRUCTIONS = (
+    "You are revising one part of an existing YouTube script. Rewrite only the TARGET part "
+    "in the same language, tone and format as the rest of the script, keeping its timestamp "
+    "header and roughly its length. Reply with the rewritten part only."
+)
+
+CONTINUATION_INSTRUCTIONS = (
+    "The YouTube script below was cut off before its end. Continue it from exactly where it stops, "
+    "in the same language, tone and format: finish the last sentence if it is unfinished, then add "
+    "the remaining timestamp sections and the closing subscribe lines. Reply with the continuation "
+    "only, without repeating any of the script."
+)
+
+# Most words of the script's end a continuation may repeat before it is trimmed
+ECHO_WORDS = 30
+
+CODE_FENCE = re.compile(r"^```\w*\n|\n```$")
+
+@dataclass
+class Revision:
+    """A script with one paragraph range rewritten, plus what the rewrite cost"""
+    script: str
+    original: str
+    revised: str
+    start: int  # paragraph range [start, end) that was replaced
+    end: int
+    provider: str
+    prompt_tokens: int
+    output_tokens: int
+    latency_ms: float
+
+def split_paragraphs(script: str):
+    """Paragraphs separated by blank lines, as the editors in the Streamlit apps split them"""
+    return [paragraph.strip() for paragraph in script.split("\n\n") if paragraph.strip()]
+
+def find_section(paragraphs, label: str):
+    """Paragraph range [start, end) of the timestamp section whose header matches ``label``"""
+    wanted = " ".join(label.lower().split())
+    start = None
+    for index, paragraph in enumerate(paragraphs):
+        match = SECTION_HEADER.search(paragraph)
+        if match is None:
+            continue
+        if start is not None:
+            return start, index
+        if " ".join(match.group(0).lower().split()) == wanted:
+            start = index
+    if start is None:
+        raise KeyError(f"No section {label}")
+    return start, len(paragraphs)
+
+def build_revision_prompt(paragraphs, start: int, end: int, topic: str = "", instruction: str = "") -> str:
+    """Prompt with just the target paragraphs and a clipped excerpt on either side"""
+    before = "\n\n".join(paragraphs[:start])[-CONTEXT_CHARS:]
+    after = "\n\n".join(paragraphs[end:])[:CONTEXT_CHARS]
+    parts = [REVISION_INSTRUCTIONS]
+    if topic:
+        parts += ["\n\nThe topic of the script is: ", topic, "."]
+    if instruction:
+        parts += ["\n\nWhat to change: ", instruction]
+    if before:
+        parts += ["\n\nText just before (for context, do not repeat):\n...", before]
+    parts += ["\n\nTARGET:\n", "\n\n".join(paragraphs[start:end])]
+    if after:
+        parts += ["\n\nText just after (for context, do not repeat):\n", after, "..."]
+    return "".join(parts)
+
+def clean_revision(text: str, original: str) -> str:
+    """Strip fences/labels the model may add and keep the original timestamp header"""
+    text = CODE_FENCE.sub("", text.strip()).strip()
+    if text.upper().startswith("TARGET:"):
+        text = text[len("TARGET:"):].strip()
+    header = SECTION_HEADER.search(original.split("\n", 1)[0])
+    if text and header and not SECTION_HEADER.search(text.split("\n", 1)[0]):
+        text = f"{header.group(0)}\n{text}"
+    return text
+
+def build_continuation_prompt(script: str, topic: str = "", until: str = "") -> str:
+    """Prompt with the end of a cut-off script, asking for the rest of it"""
+    parts = [CONTINUATION_INSTRUCTIONS]
+    if topic:
+        parts += ["\n\nThe topic of the script is: ", topic, "."]
+    if until:
+        parts += ["\n\nThe last section should end at ", until, "."]
+    parts += ["\n\nEnd of the script so far:\n...", script[-2 * CONTEXT_CHARS:]]
+    return "".join(parts)
+
+def _echo_key(word: str) -> str:
+    return word.strip(",.!?…").lower()
+
+def join_continuation(script: str, text: str) -> str:
+    """Append a continuation, dropping any repeat of the last line the model may echo"""
+    text = CODE_FENCE.sub("", text.strip()).strip()
+    last_line = script.rstrip().rsplit("\n", 1)[-1].strip()
+    # The longest run of the last line's final words (two or more) that the continuation starts with
+    words = text.split(" ")
+    tail = [_echo_key(word) for word in last_line.split()[-ECHO_WORDS:]]
+    head = [_echo_key(word) for word in words[:ECHO_WORDS]]
+    for size in range(min(len(tail), len(head)), 1, -1):
+        if tail[-size:] == head[:size]:
+            text = " ".join(words[size:]).lstrip()
+            break
+    if not text:
+        return script
+    script = script.rstrip()
+    if SECTION_HEADER.search(text.split("\n", 1)[0]):
+        return f"{script}\n\n{text}"
+    header = SECTION_HEADER.search(last_line)
+    # A new line after a finished sentence or a bare section header, a space inside a cut-off sentence
+    separator = "\n" if script[-1:] in ".!?…۔" or (header and header.end() == len(last_line)) else " "
+    return f"{script}{separator}{text}"
@@ -0,0 +1,179 @@
+import json
+import time
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class ModelChoice:
+    """One model a route can use, with the generation settings for it"""
+    provider: str
+    model: str
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+@dataclass
+class Route:
+    """Model choices for a video type, preferred first and faster ones after it"""
+    choices: List[ModelChoice]
+    slo_p95_ms: float
+
+# short: 60-90 seconds (~250 words), long: 3-6 minutes (~900 words)
+DEFAULT_ROUTES = {
+    "short": Route(
+        choices=[
+            ModelChoice("gemini", "gemini-2.0-flash", max_tokens=800, temperature=0.8),
+            ModelChoice("gemini", "gemini-2.0-flash-lite", max_tokens=800, temperature=0.8),
+            ModelChoice("openai", "gpt-3.5-turbo", max_tokens=800, temperature=0.7),
+        ],
+        slo_p95_ms=8000,
+    ),
+    "long": Route(
+        choices=[
+            ModelChoice("gemini", "gemini-2.0-flash", max_tokens=2000, temperature=0.7),
+            ModelChoice("gemini", "gemini-2.0-flash-lite", max_tokens=2000, temperature=0.7),
+            ModelChoice("openai", "gpt-3.5-turbo", max_tokens=2000, temperature=0.7),
+        ],
+        slo_p95_ms=25000,
+    ),
+}
+
+def load_routes(path: str):
+    """Routes from a JSON file shaped like ``{"short": {"slo_p95_ms": 8000, "choices": [{...}]}}``"""
+    with open(path, "r", encoding="utf-8") as file:
+        config = json.load(file)
+    return {
+        video_type: Route([ModelChoice(**choice) for choice in route["choices"]], float(route["slo_p95_ms"]))
+        for video_type, route in config.items()
+    }
+
+class ModelRouter:
+    """Picks model, max_tokens and temperature per video type and adapts to a latency SLO.
+
+    Each route starts on its first choice. Call latencies are kept per route
+    since the last switch, with failed calls counted as SLO misses; once
+    ``min_samples`` of them have a p95 above the route's SLO the route steps
+    to its next (faster) choice.
+    After ``probe_after_seconds`` on a fallback choice the route tries the
+    preferred one again and keeps it if it now meets the SLO. Choices whose
+    provider isn't configured are skipped, and configured providers missing
+    from a route are tried last with their own defaults.
+    """
+
+    def __init__(self, routes=None, metrics=None, min_samples=20, window=100, probe_after_seconds=300):
+        self.routes = routes or DEFAULT_ROUTES
+        self.metrics = metrics
+        self.min_samples = min_samples
+        self.window = window
+        self.probe_after_seconds = probe_after_seconds
+        self._variants = {}
+        self._lock = threading.Lock()
+        self._state = {
+            name: {"level": 0, "latencies": deque(maxlen=window), "switched_at": time.monotonic(), "switches": 0, "failures": 0}
+            for name in self.routes
+        }
+
+    def route_name(self, video_type: str) -> Optional[str]:
+        if video_type in self.routes:
+            return video_type
+        # Anything that isn't short uses the long route, as with the prompts
+        fallback = "short" if video_type == "short" else "long"
+        return fallback if fallback in self.routes else None
+
+    def _variant(self, provider, model: str):
+        key = (provider.name, model)
+        variant = self._variants.get(key)
+        if variant is None:
+            variant = self._variants[key] = provider.with_model(model)
+        return variant
+
+    def plan(self, video_type: str, providers):
+        """(provider, choice) pairs to try in order; choice is None for unrouted providers"""
+        name = self.route_name(video_type)
+        if name is None:
+            return [(provider, None) for provider in providers]
+        route = self.routes[name]
+        by_name = {provider.name: provider for provider in providers}
+        with self._lock:
+            state = self._state[name]
+            if state["level"] and time.monotonic() - state["switched_at"] >= self.probe_after_seconds:
+                self._switch(name, 0, "probing preferred model")
+            level = state["level"]
+        ordered = route.choices[level:] + route.choices[:level]
+        attempts = [(self._variant(by_name[choice.provider], choice.model), choice)
+                    for choice in ordered if choice.provider in by_name]
+        routed = {choice.provider for choice in route.choices}
+        attempts += [(provider, None) for provider in providers if provider.name not in routed]
+        if attempts and attempts[0][1] is not None:
+            logger.debug(f"Routing {video_type} via route {name} to {attempts[0][1].label}")
+        return attempts
+
+    def observe(self, video_type: str, choice: Optional[ModelChoice], latency_ms: float, primary: bool = True,
+                failed: bool = False):
+        """Record a call's latency and switch models if the route misses its SLO.
+
+        ``primary`` is False when earlier choices in the plan failed; such calls
+        say nothing about the route's current choice and only feed the metrics.
+        A ``failed`` call (error or timeout) counts as a miss, however quickly it
+        failed, so a choice that keeps failing is switched away from too.
+        """
+        name = self.route_name(video_type)
+        if name is None or choice is None:
+            return
+        route = self.routes[name]
+        if self.metrics is not None:
+            self.metrics.observe(f"route.{name}.{choice.label}", latency_ms)
+            if failed:
+                self.metrics.incr(f"route.{name}.{choice.label}.error")
+        if failed:
+            latency_ms = max(latency_ms, 2 * route.slo_p95_ms)
+        with self._lock:
+            state = self._state[name]
+            if not primary:
+                return
+            state["failures"] += failed
+            state["latencies"].append(latency_ms)
+            if len(state["latencies"]) < self.min_samples:
+                return
+            p95 = self._p95(state["latencies"])
+            if p95 > route.slo_p95_ms and state["level"] + 1 < len(route.choices):
+                self._switch(name, state["level"] + 1, f"p95 {p95:.0f} ms > SLO {route.slo_p95_ms:.0f} ms")
+
+    @staticmethod
+    def _p95(values):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * 0.95))]
+
+    def _switch(self, name: str, level: int, reason: str):
+        route, state = self.routes[name], self._state[name]
+        previous = route.choices[state["level"]]
+        state.update(level=level, switched_at=time.monotonic(), switches=state["switches"] + 1, failures=0)
+        state["latencies"].clear()
+        if self.metrics is not None:
+            self.metrics.incr(f"route.{name}.switch")
+        logger.warning(f"Route {name}: {previous.label} -> {route.choices[level].label} ({reason})")
+
+    def stats(self):
+        with self._lock:
+            summary = {}
+            for name, route in self.routes.items():
+                state = self._state[name]
+                latencies = list(state["latencies"])
+                summary[name] = {
+                    "model": route.choices[state["level"]].label,
+                    "level": state["level"],
+                    "slo_p95_ms": route.slo_p95_ms,
+                    "p95_ms": round(self._p95(latencies), 3) if latencies else None,
+                    "samples": len(latencies),
+                    "failures": state["failures"],
+                    "switches": state["switches"],
+                }
+            return summary
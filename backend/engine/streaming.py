@@ -0,0 +1,26 @@
+import time
+
+# Re-render only after the text has grown by this factor (or this many seconds
+# passed), so total rendering work stays linear in the script length
+RENDER_GROWTH = 1.25
+RENDER_MAX_WAIT = 1.0
+
+def render_incrementally(chunks, render, cursor=" ▌"):
+    """Call render(text_so_far) as chunks arrive, throttled, and return the full text"""
+    parts = []
+    length = 0
+    rendered_length = 0
+    last_render = time.monotonic()
+    for text in chunks:
+        if not text:
+            continue
+        parts.append(text)
+        length += len(text)
+        now = time.monotonic()
+        if length >= rendered_length * RENDER_GROWTH or now - last_render >= RENDER_MAX_WAIT:
+            render("".join(parts) + cursor)
+            rendered_length = length
+            last_render = now
+    script = "".join(parts).strip()
+    render(script)
+    return script
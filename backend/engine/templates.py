@@ -0,0 +1,131 @@
+import os
+import re
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "script_templates")
+
+SLOT_PATTERN = re.compile(r"\{(\w+)\}")
+
+class CompiledTemplate:
+    """A fallback script template split once into static segments and slots.
+
+    Rendering fills the slots and does a single join, so no parsing or
+    repeated interpolation happens per request.
+    """
+
+    def __init__(self, name: str, text: str, keywords=()):
+        self.name = name
+        self.keywords = frozenset(keyword.lower() for keyword in keywords)
+        self._parts = []
+        self._slots = []
+        last = 0
+        for match in SLOT_PATTERN.finditer(text):
+            self._parts.append(text[last:match.start()])
+            self._slots.append((len(self._parts), match.group(1)))
+            self._parts.append("")
+            last = match.end()
+        self._parts.append(text[last:])
+        self.slot_names = frozenset(name for _, name in self._slots)
+        # With a single slot name the statics can be joined with the value directly
+        self._statics = self._parts[::2] if len(self.slot_names) == 1 else None
+
+    def render(self, **values) -> str:
+        """Fill the slots; slots without a value keep their ``{name}`` text"""
+        if self._statics is not None:
+            (slot,) = self.slot_names
+            return values.get(slot, "{" + slot + "}").join(self._statics)
+        parts = self._parts[:]
+        for position, name in self._slots:
+            parts[position] = values.get(name, "{" + name + "}")
+        return "".join(parts)
+
+def parse_template_file(path: str) -> CompiledTemplate:
+    """Load a template file; an optional leading ``---`` block may set ``keywords: a, b``"""
+    with open(path, "r", encoding="utf-8") as file:
+        text = file.read()
+    keywords = []
+    if text.startswith("---\n"):
+        header, _, text = text[4:].partition("\n---\n")
+        for line in header.splitlines():
+            key, _, value = line.partition(":")
+            if key.strip() == "keywords":
+                keywords = [word.strip() for word in value.split(",") if word.strip()]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return CompiledTemplate(name, text.rstrip("\n"), keywords)
+
+class TemplateRegistry:
+    """Compiled fallback templates per video type, loaded from ``<directory>/<video_type>/*.txt``.
+
+    ``default.txt`` is used when no other template's keywords match the topic.
+    Keywords are matched against the topic words first and then against the
+    sample-script excerpt retrieved for the topic, so topics that only the
+    reference corpus ties to a theme still get that theme's template.
+    """
+
+    def __init__(self, directory: str = DEFAULT_TEMPLATES_DIR):
+        self.directory = directory
+        self.templates = {}
+        if os.path.isdir(directory):
+            for video_type in sorted(os.listdir(directory)):
+                type_dir = os.path.join(directory, video_type)
+                if not os.path.isdir(type_dir):
+                    continue
+                loaded = []
+                for file_name in sorted(os.listdir(type_dir)):
+                    if file_name.endswith(".txt"):
+                        try:
+                            loaded.append(parse_template_file(os.path.join(type_dir, file_name)))
+                        except Exception as e:
+                            logger.error(f"Failed to load template {file_name}: {e}")
+                self.templates[video_type] = loaded
+        logger.info(f"Loaded {sum(len(t) for t in self.templates.values())} fallback templates from {directory}")
+
+    def select(self, topic: str, video_type: str, reference: str = ""):
+        """Best template for the topic, or None when no templates exist"""
+        # Anything that isn't short uses the long templates, as with the prompts
+        candidates = self.templates.get("short" if video_type == "short" else "long") or []
+        if not candidates:
+            return None
+        default = next((t for t in candidates if t.name == "default"), candidates[0])
+
+        topic_words = set(topic.lower().replace("-", " ").split())
+        best, best_score = default, 0
+        for template in candidates:
+            if template.keywords:
+                score = 2 * len(template.keywords & topic_words)
+                if score > best_score:
+                    best, best_score = template, score
+        if best_score or not reference:
+            return best
+
+        reference_lower = reference.lower()
+        for template in candidates:
+            score = sum(keyword in reference_lower for keyword in template.keywords)
+            if score > best_score:
+                best, best_score = template, score
+        return best
+
+    def render(self, topic: str, video_type: str, reference: str = "") -> str:
+        template = self.select(topic, video_type, reference)
+        if template is None:
+            return f"Video Title: {topic}"
+        return template.render(topic=topic)
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+def default_template_registry() -> TemplateRegistry:
+    """Process-wide registry for TEMPLATES_DIR (or the bundled script_templates)"""
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = TemplateRegistry(os.getenv("TEMPLATES_DIR", DEFAULT_TEMPLATES_DIR))
+    return _default_registry
+
+def generate_techfela_template(topic: str, video_type: str, reference: str = "") -> str:
+    """Generate a TechFela-style template when AI is not available"""
+    return default_template_registry().render(topic, video_type, reference)
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+MAX_OPEN_TRACES = 10000
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+def parse_traceparent(header: str):
+    """(trace_id, parent_span_id) from a W3C traceparent header, or (None, None)"""
+    parts = (header or "").strip().split("-")
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16 and parts[1] != "0" * 32:
+        return parts[1], parts[2]
+    return None, None
+
+class Span:
+    """One timed operation, following the OpenTelemetry span data model"""
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.status = "OK"
+        self.status_message = ""
+        self.events = []
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.local_root = parent_id is None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_exception(self, error: Exception):
+        self.status = "ERROR"
+        self.status_message = str(error)[:500]
+        self.events.append({
+            "name": "exception",
+            "timeUnixNano": time.time_ns(),
+            "attributes": {"exception.type": type(error).__name__, "exception.message": self.status_message},
+        })
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self):
+        """OTLP/JSON-style representation"""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message},
+            "events": self.events,
+        }
+
+class FileSpanExporter:
+    """Appends each finished trace as one JSON line, so no collector is needed.
+
+    ``export`` only enqueues the line; a background thread appends it, so a
+    trace ending on the event loop never waits on the disk. Once the file
+    reaches ``max_bytes`` it is moved to ``<path>.1`` (replacing the previous
+    one) and a new file is started. When ``max_pending`` lines are waiting,
+    further traces are dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, path="traces.jsonl", max_bytes=50 * 1024 * 1024, max_pending=1000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+        self._writer.start()
+
+    def export(self, spans):
+        line = json.dumps({"resourceSpans": [span.to_dict() for span in spans]}, ensure_ascii=False)
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self):
+        while True:
+            line = self._queue.get()
+            if line is None:
+                break
+            lines = [line]
+            # Everything already queued goes out in the same write
+            while True:
+                try:
+                    line = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if line is None:
+                    break
+                lines.append(line)
+            try:
+                self._write(lines)
+            except OSError as e:
+                logger.error(f"Failed to write {len(lines)} traces to {self.path}: {e}")
+            if line is None:
+                break
+
+    def _write(self, lines):
+        if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            os.replace(self.path, self.path + ".1")
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("".join(line + "\n" for line in lines))
+
+    def close(self):
+        """Write queued traces and stop the writer thread"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+
+class Tracer:
+    """Minimal in-process tracer.
+
+    Spans nest through a context variable. When the outermost local span ends
+    the whole trace is handed to the exporter and kept in a ring buffer of
+    recent traces for the built-in viewer.
+    """
+
+    def __init__(self, exporter=None, max_recent=200):
+        self.exporter = exporter
+        self.recent = deque(maxlen=max_recent)
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def current_span(self):
+        return _current_span.get()
+
+    def start_span(self, name: str, parent: Span = None, traceparent: str = None, **attributes) -> Span:
+        """Start a span without making it current; pair with end_span (safe across generator yields)"""
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = parse_traceparent(traceparent)
+            trace_id = trace_id or _new_id(16)
+        span = Span(name, trace_id, parent_id, attributes)
+        span.local_root = parent is None
+        with self._lock:
+            if trace_id not in self._open and len(self._open) >= MAX_OPEN_TRACES:
+                # Drop the oldest unfinished trace (e.g. a stream nobody consumed)
+                self._open.pop(next(iter(self._open)))
+            self._open.setdefault(trace_id, []).append(span)
+        return span
+
+    def end_span(self, span: Span):
+        span.end_ns = time.time_ns()
+        if span.local_root:
+            self._finish(span)
+
+    @contextmanager
+    def activate(self, span: Span):
+        """Make a span started with start_span the parent of spans opened in this block"""
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    @contextmanager
+    def span(self, name: str, traceparent: str = None, **attributes):
+        """Start a child of the current span (or a new trace, continuing ``traceparent`` if given)"""
+        span = self.start_span(name, _current_span.get(), traceparent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def _finish(self, root: Span):
+        with self._lock:
+            spans = self._open.pop(root.trace_id, [root])
+        for span in spans:
+            if span.end_ns is None:
+                span.end_ns = root.end_ns
+        self.recent.append((root.duration_ms, spans))
+        if self.exporter is not None:
+            try:
+                self.exporter.export(spans)
+            except Exception as e:
+                logger.error(f"Trace export failed: {e}")
+
+    def slowest(self, limit=20, min_ms=0.0):
+        """Recent traces at least min_ms long, slowest first"""
+        traces = [trace for trace in list(self.recent) if trace[0] >= min_ms]
+        traces.sort(key=lambda trace: trace[0], reverse=True)
+        return traces[:limit]
+
+    def find(self, trace_id: str):
+        for _, spans in list(self.recent):
+            if spans and spans[0].trace_id == trace_id:
+                return spans
+        return None
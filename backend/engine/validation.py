@@ -0,0 +1,182 @@
+import re
+from dataclasses import dataclass
+from typing import List
+
+from .postprocess import MARKUP, SECTION_HEADER, SPEAKING_RATE_WPM, TOKENS_PER_WORD, UNSPOKEN_LINE, _seconds, duration_target
+from .revise import split_paragraphs
+
+# Most targeted retries spent on one script
+MAX_REPAIRS = 3
+
+# Seconds two neighbouring sections may be apart before the gap counts as a missing section
+GAP_TOLERANCE = 2
+
+# Frequent function words, to tell Roman Urdu from English without a model. Words both
+# languages use ("to", "is", "the" as in "woh the") are left out of both lists.
+ROMAN_URDU_WORDS = frozenset("""
+    hai hain ho hota hoti hote tha thi ke ki ka ko se mein main par pe aur bhi nahi nahin na
+    yeh ye woh wo kya kyun kyunke kaise kab jab tab toh agar lekin magar bas sab kuch koi
+    apna apni apne hum tum aap mujhe tumhein humein iska uska iski uski abhi phir kar karo
+    karna karte karta karti karein raha rahi rahe gaya gayi diya liya dekho bhai yaar acha
+    accha bohat bahut zyada wala wali wale sakta sakti sakte chahiye jaise waise hoga hogi
+""".split())
+ENGLISH_WORDS = frozenset("""
+    are was were and of that this it for with you your on be have has not but what which
+    will can they their there about from at an would should we our if been just more
+    than when who how very into because them these those it's don't
+""".split())
+
+# A section reads as English when it has this many marker words and this share of them is English
+LANGUAGE_MIN_MARKERS = 4
+ENGLISH_SHARE = 0.7
+
+WORD = re.compile(r"[a-z']+")
+# Arabic-script (Urdu) and Devanagari letters: the script must stay in Latin letters
+NATIVE_SCRIPT = re.compile(r"[؀-ۿݐ-ݿऀ-ॿ]")
+
+# Characters a finished line can end with; anything past U+2190 covers arrows and emoji
+TERMINAL = frozenset(".!?…۔\"')]")
+
+# Closing lines that often end without punctuation: hashtags ("#tech #gadgets") and short
+# calls to action ("Like aur subscribe karna na bhoolein")
+HASHTAG_LINE = re.compile(r"^(#\w+[\s,]*)+$")
+CALL_TO_ACTION = re.compile(r"\b(subscribe|like|share|comment|follow|bell)\b", re.IGNORECASE)
+CALL_TO_ACTION_WORDS = 12
+
+# An unfinished last line only counts as truncation when the last section also has less
+# than this share of the words its time span needs ("Bas itna hi dosto" ends a full script)
+SHORT_SECTION = 0.5
+
+LANGUAGE_INSTRUCTION = "This part is not in Roman Urdu. Rewrite it in Roman Urdu (Urdu written in English letters), keeping its meaning."
+SECTION_INSTRUCTION = "This section has no voiceover yet. Write it, following on from the text before and leading into the text after."
+
+@dataclass
+class Defect:
+    """A problem found in a generated script, and the paragraph range [start, end) a targeted retry rewrites.
+
+    ``missing_section`` has an empty range: the section is inserted at ``start``.
+    ``truncated`` and ``incomplete`` are fixed by continuing the script.
+    ``seconds`` is how much voiceover the fix has to write, to size max_tokens.
+    """
+    kind: str  # language, empty_section, missing_section, truncated, incomplete, no_sections
+    label: str
+    start: int
+    end: int
+    detail: str = ""
+    seconds: float = 0
+
+    @property
+    def repairable(self) -> bool:
+        return self.kind != "no_sections"
+
+    def describe(self) -> str:
+        return f"{self.kind} {self.label}".strip()
+
+def section_tokens(seconds: float) -> int:
+    """max_tokens for writing ``seconds`` of voiceover"""
+    return int(seconds * SPEAKING_RATE_WPM / 60 * TOKENS_PER_WORD) + 100
+
+def section_label(start: float, end: float) -> str:
+    return f"({int(start)}-{int(end)} seconds)"
+
+def language_of(text: str) -> str:
+    """"roman_urdu" unless the text is clearly English or written in Urdu/Hindi script"""
+    if len(NATIVE_SCRIPT.findall(text)) * 3 > len(text):
+        return "urdu_script"
+    english = urdu = 0
+    for word in WORD.findall(text.lower()):
+        if word in ROMAN_URDU_WORDS:
+            urdu += 1
+        elif word in ENGLISH_WORDS:
+            english += 1
+    if english + urdu >= LANGUAGE_MIN_MARKERS and english >= ENGLISH_SHARE * (english + urdu):
+        return "english"
+    return "roman_urdu"
+
+def _closing(line: str) -> bool:
+    if HASHTAG_LINE.match(line):
+        return True
+    return len(line.split()) <= CALL_TO_ACTION_WORDS and CALL_TO_ACTION.search(line) is not None
+
+def _ends_cleanly(paragraphs: List[str]) -> bool:
+    """Whether the last line that isn't a hashtag or call-to-action line ends like a sentence"""
+    for paragraph in reversed(paragraphs):
+        for line in reversed(paragraph.split("\n")):
+            line = line.strip()
+            if not line or _closing(line):
+                continue
+            line = line.strip(MARKUP)
+            return bool(line) and (line[-1] in TERMINAL or line[-1] >= "←")
+    return True
+
+def _spoken(text: str) -> str:
+    if "\n" not in text:
+        return "" if UNSPOKEN_LINE.match(text.strip(MARKUP)) else text
+    return "\n".join(line for line in text.split("\n") if not UNSPOKEN_LINE.match(line.strip(MARKUP)))
+
+def validate_script(script: str, video_type: str = "short", cut_off: bool = False) -> List[Defect]:
+    """Local checks for language, section coverage and truncation; defects in script order, ending ones last.
+
+    ``cut_off`` says the provider stopped mid-stream, so the script counts as
+    truncated however its ending reads.
+
+    One pass over the paragraphs with a few regex searches each, so it costs
+    well under a millisecond even for long scripts and runs on every result.
+    Neighbouring sections in the wrong language are merged into one defect,
+    so they are rewritten by a single retry.
+    """
+    paragraphs = split_paragraphs(script)
+    low, high = duration_target(video_type)
+
+    # (label, start seconds, end seconds, first paragraph, spoken text parts)
+    sections = []
+    for index, paragraph in enumerate(paragraphs):
+        match = SECTION_HEADER.search(paragraph)
+        if match is not None:
+            start, end, unit = match.groups()
+            body = paragraph[match.end():].strip()
+            sections.append((match.group(0), _seconds(start, unit), _seconds(end, unit), index, [_spoken(body)]))
+        elif sections:
+            sections[-1][4].append(_spoken(paragraph))
+    if not sections:
+        return [Defect("no_sections", "", 0, len(paragraphs), "no timestamp sections")]
+
+    defects = []
+    # Right after the last section's header, or cut off mid-sentence in a last section that's too short
+    _, last_start, last_end, _, last_parts = sections[-1]
+    last_words = sum(len(part.split()) for part in last_parts)
+    truncated = cut_off or not last_words or (not _ends_cleanly(paragraphs)
+                                   and last_words < SHORT_SECTION * (last_end - last_start) * SPEAKING_RATE_WPM / 60)
+    previous_end = 0
+    merged_from = None
+    for position, (label, start_seconds, end_seconds, first, parts) in enumerate(sections):
+        last = sections[position + 1][3] if position + 1 < len(sections) else len(paragraphs)
+        if start_seconds - previous_end > GAP_TOLERANCE:
+            missing = section_label(previous_end, start_seconds)
+            defects.append(Defect("missing_section", missing, first, first,
+                                  f"nothing between {previous_end:g}s and {start_seconds:g}s", start_seconds - previous_end))
+        previous_end = max(previous_end, end_seconds)
+
+        text = "\n".join(part for part in parts if part)
+        if not text.strip():
+            if last < len(paragraphs):
+                defects.append(Defect("empty_section", label, first, last, "no voiceover", end_seconds - start_seconds))
+            continue
+        language = language_of(text)
+        if language != "roman_urdu":
+            merged = defects[-1] if defects else None
+            if merged is not None and merged.kind == "language" and merged.end == first and merged.detail == language:
+                merged.label = f"{merged_from} … {label}"
+                merged.end = last
+            else:
+                merged_from = label
+                defects.append(Defect("language", label, first, last, language))
+
+    if truncated:
+        # At least a section's worth: the sections may all be there with only the last line cut
+        defects.append(Defect("truncated", sections[-1][0], len(paragraphs), len(paragraphs),
+                              "stopped mid-stream" if cut_off else "ends mid-sentence", max(15, high - previous_end)))
+    elif previous_end < low:
+        defects.append(Defect("incomplete", section_label(previous_end, low), len(paragraphs), len(paragraphs),
+                              f"sections end at {previous_end:g}s of at least {low}s", high - previous_end))
+    return defects
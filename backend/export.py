@@ -0,0 +1,249 @@
+import io
+import os
+import re
+import atexit
+import hashlib
+import logging
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from engine import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# format -> (media type, file extension)
+FORMATS = {
+    "pdf": ("application/pdf", ".pdf"),
+    "docx": ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", ".docx"),
+    "txt": ("text/plain", ".txt"),  # the response adds charset=utf-8
+}
+
+# Same page styling as the PDF download in the Streamlit apps
+PDF_CSS = """
+@page { size: letter; margin: 1cm; }
+body { font-family: Arial, sans-serif; line-height: 1.6; font-size: 12px; }
+h1 { color: #2c3e50; font-size: 24px; margin-top: 20px; }
+h2 { color: #3498db; font-size: 20px; margin-top: 15px; }
+h3 { font-size: 16px; margin-top: 10px; }
+p { margin: 10px 0; }
+strong { font-weight: bold; }
+em { font-style: italic; }
+code, pre { font-family: Courier, monospace; background-color: #f8f8f8; padding: 2px 4px; }
+"""
+
+class RendererUnavailable(RuntimeError):
+    """Rendering can't run right now (a missing library, a broken worker pool); a later retry may work"""
+
+class RenderError(ValueError):
+    """This script could not be rendered in the requested format"""
+
+HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+BOLD = re.compile(r"\*\*(.+?)\*\*")
+
+# ----------------------------
+# Rendering (runs in the worker processes)
+# ----------------------------
+# Prepared once per worker by _init_worker, so a render only does per-document work
+_worker = {}
+
+def _init_worker():
+    import markdown
+    from docx import Document
+
+    try:
+        from xhtml2pdf import pisa
+        from xhtml2pdf.default import DEFAULT_CSS
+    except ImportError:
+        pisa = DEFAULT_CSS = None
+
+    template = io.BytesIO()
+    document = Document()
+    document.styles["Normal"].font.name = "Arial"
+    document.save(template)
+    _worker.update(
+        markdown=markdown.Markdown(),
+        pisa=pisa,
+        # xhtml2pdf's defaults plus ours as one stylesheet, instead of a <style> block per document
+        css=(DEFAULT_CSS or "") + PDF_CSS,
+        docx_template=template.getvalue(),
+    )
+
+def render_pdf(script: str, title: str = "") -> bytes:
+    if not _worker:
+        _init_worker()
+    if _worker["pisa"] is None:
+        raise RendererUnavailable("PDF export needs xhtml2pdf")
+    converter = _worker["markdown"].reset()
+    body = converter.convert(f"# {title}\n\n{script}" if title else script)
+    result = io.BytesIO()
+    status = _worker["pisa"].CreatePDF(f'<html><head><meta charset="UTF-8"></head><body>{body}</body></html>',
+                                       dest=result, default_css=_worker["css"], encoding="utf-8")
+    if status.err:
+        raise RenderError("PDF conversion failed")
+    return result.getvalue()
+
+def render_docx(script: str, title: str = "") -> bytes:
+    if not _worker:
+        _init_worker()
+    from docx import Document
+
+    document = Document(io.BytesIO(_worker["docx_template"]))
+    if title:
+        document.add_heading(title, level=1)
+    for paragraph in script.split("\n\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        heading = HEADING.match(paragraph)
+        if heading:
+            document.add_heading(heading.group(2).strip("*"), level=min(len(heading.group(1)), 3))
+            continue
+        block = document.add_paragraph()
+        for line_number, line in enumerate(paragraph.split("\n")):
+            if line_number:
+                block.add_run().add_break()
+            # **bold** segments alternate with plain text after the split
+            for index, text in enumerate(BOLD.split(line)):
+                if text:
+                    block.add_run(text).bold = index % 2 == 1
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+def render_txt(script: str, title: str = "") -> bytes:
+    return (f"{title}\n\n{script}" if title else script).encode("utf-8")
+
+RENDERERS = {"pdf": render_pdf, "docx": render_docx, "txt": render_txt}
+
+def render(fmt: str, script: str, title: str = "") -> bytes:
+    return RENDERERS[fmt](script, title)
+
+# ----------------------------
+# Exporter
+# ----------------------------
+def content_key(fmt: str, script: str, title: str = "") -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (fmt, title, script):
+        # surrogatepass: a lone surrogate from the JSON body fails in the renderer, not here
+        digest.update(part.encode("utf-8", "surrogatepass"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def safe_filename(name: str, fallback: str = "script") -> str:
+    name = re.sub(r"[^\w\- ]+", "", name).strip().replace(" ", "_")[:80]
+    return name or fallback
+
+class Exporter:
+    """Renders scripts to PDF/DOCX/TXT on a process pool, with a content-hash cache.
+
+    PDF and DOCX rendering is CPU-bound, so it runs in ``workers`` processes
+    (one per core by default) that each prepare their converters once. TXT is
+    rendered in-process. Outputs are cached by a hash of format, title and
+    script, so re-exporting an unchanged script costs nothing.
+    """
+
+    def __init__(self, workers=None, cache_entries=256, cache_ttl_seconds=3600):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = ResponseCache(max_entries=cache_entries, ttl_seconds=cache_ttl_seconds)
+        self._pool = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _executor(self):
+        # Started on first use, so importing the app doesn't fork worker processes
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+                logger.info(f"Export pool started with {self.workers} workers")
+            return self._pool
+
+    def _broken(self, pool):
+        # A worker died (e.g. killed for memory) and took the pool with it; the next export starts a fresh one
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        logger.error("Export pool broke; it is restarted on the next export")
+
+    def _submit(self, fmt, script, title):
+        """A future for the rendered bytes, or the bytes themselves for in-process formats"""
+        if fmt == "txt":
+            return self._rendered(lambda: render(fmt, script, title))
+        pool = self._executor()
+        try:
+            future = pool.submit(render, fmt, script, title)
+        except BrokenProcessPool as e:
+            self._broken(pool)
+            raise RendererUnavailable("Export pool is unavailable") from e
+        future.add_done_callback(
+            lambda done: self._broken(pool) if not done.cancelled() and isinstance(done.exception(), BrokenProcessPool) else None)
+        return future
+
+    def _rendered(self, render_call):
+        """Bytes from a render call, with renderer errors mapped to RenderError / RendererUnavailable"""
+        try:
+            return render_call()
+        except (RenderError, RendererUnavailable):
+            raise
+        except BrokenProcessPool as e:
+            raise RendererUnavailable("Export pool is unavailable") from e
+        except Exception as e:
+            # xhtml2pdf and python-docx raise their own types, e.g. ValueError for control characters
+            raise RenderError(f"{type(e).__name__}: {e}") from e
+
+    def _result(self, pending) -> bytes:
+        return pending if isinstance(pending, bytes) else self._rendered(pending.result)
+
+    def export(self, script: str, fmt: str = "pdf", title: str = "") -> bytes:
+        """Rendered document bytes. Raises KeyError for unknown formats, RenderError when this script
+        can't be rendered and RendererUnavailable when rendering can't run at the moment."""
+        if fmt not in FORMATS:
+            raise KeyError(fmt)
+        key = content_key(fmt, script, title)
+        data = self.cache.get(key)
+        if data is None:
+            data = self._result(self._submit(fmt, script, title))
+            self.cache.set(key, data)
+        return data
+
+    def export_zip(self, items, fmt: str = "pdf") -> bytes:
+        """Zip of many (filename stem, script, title) items, rendered in parallel across the pool"""
+        if fmt not in FORMATS:
+            raise KeyError(fmt)
+        extension = FORMATS[fmt][1]
+        pending = {}
+        documents = []
+        for stem, script, title in items:
+            key = content_key(fmt, script, title)
+            data = self.cache.get(key)
+            if data is None and key not in pending:
+                pending[key] = self._submit(fmt, script, title)
+            documents.append((stem, key, data))
+
+        output = io.BytesIO()
+        # PDF and DOCX are compressed already; only text benefits from deflate
+        compression = zipfile.ZIP_DEFLATED if fmt == "txt" else zipfile.ZIP_STORED
+        used = set()
+        with zipfile.ZipFile(output, "w", compression) as archive:
+            for stem, key, data in documents:
+                if data is None:
+                    data = pending[key] = self._result(pending[key])
+                    self.cache.set(key, data)
+                name, counter = stem, 1
+                while name in used:
+                    counter += 1
+                    name = f"{stem}_{counter}"
+                used.add(name)
+                archive.writestr(name + extension, data)
+        return output.getvalue()
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    def stats(self):
+        return {"workers": self.workers, "started": self._pool is not None, "cache": self.cache.stats()}
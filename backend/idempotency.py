@@ -0,0 +1,132 @@
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+class IdempotencyConflict(Exception):
+    """An Idempotency-Key was reused for a different request"""
+
+class _Entry:
+    __slots__ = ("fingerprint", "future", "expires_at")
+
+    def __init__(self, fingerprint, future):
+        self.fingerprint = fingerprint
+        self.future = future
+        self.expires_at = None  # set once the result is in
+
+class IdempotencyStore:
+    """Results of keyed POSTs, so a client's retry never starts a second generation.
+
+    The first request with an ``Idempotency-Key`` runs. A repeat while it is
+    still running awaits the same result ("attached"), and a repeat after it
+    finished gets the stored result ("replayed"); neither reaches a provider.
+    A key reused with a different request body raises IdempotencyConflict.
+    Failed runs are forgotten, so the retry runs again. Results are kept for
+    ``ttl_seconds`` in a least-recently-used store of ``max_entries``.
+
+    ``coalesce`` also covers requests without a key: one identical to a
+    request already running awaits that generation, the same result the
+    response cache would give it a moment later. A shared generation runs
+    as its own task, so it finishes for the others when the request that
+    started it is cancelled. Everything runs on the event loop, so there is
+    no locking.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._running = {}
+        self.started = 0
+        self.attached = 0
+        self.replayed = 0
+        self.conflicts = 0
+        self.failed = 0
+        self.evicted = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def fingerprint(*parts) -> str:
+        return hashlib.blake2b(json.dumps(parts, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+    async def run(self, key: str, fingerprint: str, produce, coalesce: bool = True):
+        """Await ``produce()`` once per key. Returns (result, how): how is None for a fresh run, else "attached" or "replayed".
+        ``coalesce=False`` keeps the run from sharing an identical unkeyed request's generation."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            entry = None
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                self.conflicts += 1
+                raise IdempotencyConflict(key)
+            self._entries.move_to_end(key)
+            if entry.expires_at is not None:
+                self.replayed += 1
+                return entry.future.result(), "replayed"
+            self.attached += 1
+            # Shielded: a retry that disconnects must not cancel the original run
+            return await asyncio.shield(entry.future), "attached"
+
+        # The generation runs as its own task: the request that started it may be cancelled
+        # (client gone, timeout) while retries are attached, and they still get its result
+        work = asyncio.ensure_future(self.coalesce(fingerprint, produce) if coalesce else produce())
+        entry = self._entries[key] = _Entry(fingerprint, work)
+        work.add_done_callback(lambda _: self._finished(key, entry))
+        self._evict()
+        self.started += 1
+        return await asyncio.shield(work), None
+
+    def _finished(self, key, entry):
+        if entry.future.cancelled() or entry.future.exception() is not None:
+            # Forgotten, so the retry runs again; attached requests fail with the same error
+            self.failed += 1
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        else:
+            entry.expires_at = time.monotonic() + self.ttl_seconds
+
+    async def coalesce(self, fingerprint: str, produce):
+        """Await ``produce()``, or the identical request that is already running"""
+        running = self._running.get(fingerprint)
+        if running is not None:
+            self.coalesced += 1
+            return await asyncio.shield(running)
+        # Its own task for the same reason as in run(): waiters outlive the request that started it
+        work = self._running[fingerprint] = asyncio.ensure_future(produce())
+        work.add_done_callback(lambda _: self._stopped(fingerprint, work))
+        return await asyncio.shield(work)
+
+    def _stopped(self, fingerprint, work):
+        if self._running.get(fingerprint) is work:
+            del self._running[fingerprint]
+        if not work.cancelled():
+            work.exception()  # retrieved, even when every waiter is gone
+
+    def _evict(self):
+        # Oldest first; running entries are skipped, their requests still need them
+        if len(self._entries) <= self.max_entries:
+            return
+        for key in list(self._entries):
+            if len(self._entries) <= self.max_entries:
+                break
+            if self._entries[key].future.done():
+                del self._entries[key]
+                self.evicted += 1
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "in_flight": sum(not entry.future.done() for entry in self._entries.values()),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "started": self.started,
+            "attached": self.attached,
+            "replayed": self.replayed,
+            "coalesced": self.coalesced,
+            "generations_avoided": self.attached + self.replayed + self.coalesced,
+            "conflicts": self.conflicts,
+            "failed": self.failed,
+            "evicted": self.evicted,
+        }
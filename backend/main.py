@@ -1,13 +1,45 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import openai
+from pydantic import BaseModel, ValidationError
 import os
+import json
+import hmac
+import asyncio
+import sqlite3
 from dotenv import load_dotenv
 import time
 import logging
-from docx import Document
-import google.generativeai as genai
+from typing import Dict, List, Optional
+
+from engine import (
+    ChannelRegistry,
+    DEFAULT_CHANNEL,
+    FileSpanExporter,
+    GenerationResult,
+    ModelRouter,
+    PromptExperiment,
+    ResponseCache,
+    ScriptEngine,
+    Tracer,
+    analyze,
+    apply_provider_mode,
+    create_providers,
+    find_section,
+    load_experiment,
+    load_routes,
+    split_paragraphs,
+)
+from cluster import FORWARDED_HEADER, Cluster
+from export import FORMATS, Exporter, RenderError, safe_filename
+from idempotency import IdempotencyConflict, IdempotencyStore
+from pregen import Pregenerator, TopicTracker
+from sessions import EditSession, SessionRegistry
+from store import ScriptStore
+from trace_viewer import render_timeline
+from transport import CompressionMiddleware, TracingMiddleware, build_response, compute_etag
+from warmup import Warmup
 
 # Load environment variables
 load_dotenv()
@@ -17,61 +49,147 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # ----------------------------
-# Load Reference Scripts and Prompts
+# Load Channels (prompts, reference scripts and retrieval index per channel)
 # ----------------------------
-def load_sample_scripts(file_path="sample_scripts.docx"):
-    """Load sample scripts from DOCX file"""
-    try:
-        if not os.path.exists(file_path):
-            logger.warning(f"Sample scripts file not found: {file_path}")
-            return []
-        document = Document(file_path)
-        scripts = [p.text.strip() for p in document.paragraphs if p.text.strip()]
-        logger.info(f"Loaded {len(scripts)} sample script paragraphs")
-        return scripts
-    except Exception as e:
-        logger.error(f"Error loading sample scripts: {e}")
-        return []
+channel_registry = ChannelRegistry(
+    channels_dir=os.getenv("CHANNELS_DIR", "channels"),
+    memory_budget_bytes=int(os.getenv("CHANNEL_MEMORY_BUDGET_MB", "64")) * 1024 * 1024,
+)
 
-def load_prompt(file_path="prompt.txt"):
-    """Load prompt from TXT file"""
-    try:
-        if not os.path.exists(file_path):
-            logger.warning(f"Prompt file not found: {file_path}")
-            return ""
-        with open(file_path, "r", encoding="utf-8") as file:
-            content = file.read()
-            logger.info(f"Loaded prompt from {file_path}")
-            return content
-    except Exception as e:
-        logger.error(f"Error loading prompt: {e}")
-        return ""
-
-# Load prompts and samples on startup
-base_prompt = load_prompt("prompt.txt")
-short_video_prompt = load_prompt("prompt that already worked no 2.txt")
-long_video_prompt = load_prompt("prompt long Video.txt")
-sample_scripts = load_sample_scripts("sample_scripts.docx")
-
-# Initialize Gemini AI if API key is available
-gemini_model = None
-if os.getenv("GOOGLE_API_KEY"):
+# Load the default channel on startup, other channels load on first use
+default_channel = channel_registry.get(DEFAULT_CHANNEL)
+
+# Persistent store of generated scripts (set SCRIPT_STORE_PATH="" to disable)
+script_store = None
+if os.getenv("SCRIPT_STORE_PATH", "scripts.db"):
     try:
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        gemini_model = genai.GenerativeModel("gemini-2.0-flash")
-        logger.info("Gemini AI initialized successfully")
+        script_store = ScriptStore(os.getenv("SCRIPT_STORE_PATH", "scripts.db"))
     except Exception as e:
-        logger.error(f"Failed to initialize Gemini AI: {e}")
+        logger.error(f"Failed to open script store: {e}")
+
+# ----------------------------
+# Generation Engine (providers in fallback order: Gemini, then OpenAI)
+# ----------------------------
+# PROVIDER_MODE: live (default), record (save responses + timings) or replay (serve them offline)
+providers = apply_provider_mode(
+    create_providers(os.getenv("GOOGLE_API_KEY"), os.getenv("OPENAI_API_KEY")),
+    mode=os.getenv("PROVIDER_MODE", "live"),
+    cassette_dir=os.getenv("PROVIDER_CASSETTE_DIR", "cassettes"),
+    speed=float(os.getenv("PROVIDER_REPLAY_SPEED", "1.0")),
+)
+
+# Model, max_tokens and temperature per video type, adapted to each route's p95 latency SLO
+# (ROUTES_FILE overrides the built-in table, see engine/routing.py)
+router = ModelRouter(
+    load_routes(os.getenv("ROUTES_FILE")) if os.getenv("ROUTES_FILE") else None,
+    probe_after_seconds=int(os.getenv("ROUTE_PROBE_AFTER", "300")),
+)
+
+# Per-request traces are kept in memory for /traces; TRACE_FILE (e.g. traces.jsonl) also appends
+# them to a file, which is rotated to TRACE_FILE.1 at TRACE_FILE_MAX_MB
+tracer = Tracer(
+    FileSpanExporter(os.getenv("TRACE_FILE"), max_bytes=int(os.getenv("TRACE_FILE_MAX_MB", "50")) * 1024 * 1024)
+    if os.getenv("TRACE_FILE") else None,
+    max_recent=int(os.getenv("TRACE_RECENT", "200")),
+)
 
-# Initialize OpenAI if API key is available
-openai_client = None
-if os.getenv("OPENAI_API_KEY"):
+# Prompt A/B experiment: requests are bucketed onto prompt variants by client id (or topic)
+# (PROMPT_EXPERIMENT=true to run it; EXPERIMENT_FILE overrides the built-in variants, see engine/experiments.py)
+experiment = None
+if os.getenv("PROMPT_EXPERIMENT", "false").lower() in ("1", "true", "yes"):
     try:
-        openai.api_key = os.getenv("OPENAI_API_KEY")
-        openai_client = openai
-        logger.info("OpenAI initialized successfully")
+        experiment = load_experiment(os.getenv("EXPERIMENT_FILE")) if os.getenv("EXPERIMENT_FILE") else PromptExperiment()
     except Exception as e:
-        logger.error(f"Failed to initialize OpenAI: {e}")
+        logger.error(f"Failed to set up the prompt experiment: {e}")
+
+engine = ScriptEngine(
+    channel_registry,
+    providers=providers,
+    cache=ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "512")),
+        ttl_seconds=int(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+    ),
+    tracer=tracer,
+    router=router,
+    # Stop generating once a script reaches its video type's length (LENGTH_CONTROL=false to disable)
+    length_control=os.getenv("LENGTH_CONTROL", "true").lower() in ("1", "true", "yes"),
+    experiment=experiment,
+    # Check every generated script locally (language, sections, cut-off ending) and retry only
+    # the defective part (OUTPUT_VALIDATION=false to disable)
+    validation=os.getenv("OUTPUT_VALIDATION", "true").lower() in ("1", "true", "yes"),
+)
+
+# ----------------------------
+# Speculative Pre-generation (fills the cache for popular topics while idle)
+# ----------------------------
+topic_tracker = TopicTracker()
+pregenerator = Pregenerator(
+    engine,
+    topic_tracker,
+    topics=[topic.strip() for topic in os.getenv("PREGEN_TOPICS", "").split(",") if topic.strip()],
+    idle_seconds=int(os.getenv("PREGEN_IDLE_SECONDS", "60")),
+    token_budget=int(os.getenv("PREGEN_TOKEN_BUDGET", "200000")),
+    stale_after_seconds=int(os.getenv("PREGEN_STALE_AFTER", "21600")),
+)
+
+# ----------------------------
+# Export (PDF/DOCX/TXT rendered on a process pool, one worker per core by default)
+# ----------------------------
+exporter = Exporter(
+    workers=int(os.getenv("EXPORT_WORKERS", "0")) or None,
+    cache_entries=int(os.getenv("EXPORT_CACHE_SIZE", "256")),
+)
+
+# Most scripts one /export/bulk request may zip
+MAX_BULK_EXPORT = int(os.getenv("MAX_BULK_EXPORT", "200"))
+
+# Upper bound for ScriptRequest.candidates
+MAX_CANDIDATES = int(os.getenv("MAX_CANDIDATES", "4"))
+
+# Interactive editing over WebSocket: open sessions at most, and idle seconds before one is closed
+sessions = SessionRegistry(max_sessions=int(os.getenv("MAX_EDIT_SESSIONS", "200")))
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "900"))
+SESSION_OPS = ("start", "retry", "length", "revise", "undo", "script")
+
+# Responses by Idempotency-Key, so client retries attach to or replay the first generation
+idempotency = IdempotencyStore(
+    max_entries=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")),
+    ttl_seconds=int(os.getenv("IDEMPOTENCY_TTL", "86400")),
+)
+
+# ----------------------------
+# Cluster mode (CLUSTER_PEERS = the other nodes' base URLs): each topic has one owner node
+# ----------------------------
+cluster = None
+if os.getenv("CLUSTER_PEERS"):
+    cluster = Cluster(
+        # How peers reach this node
+        self_url=os.getenv("CLUSTER_SELF_URL", f"http://127.0.0.1:{os.getenv('PORT', '8000')}"),
+        peers=os.getenv("CLUSTER_PEERS", "").split(","),
+        timeout_seconds=float(os.getenv("CLUSTER_FORWARD_TIMEOUT", "60")),
+        health_interval_seconds=float(os.getenv("CLUSTER_HEALTH_INTERVAL", "5")),
+        # Shared by all nodes; needed for nodes to join and leave without reconfiguring the others
+        secret=os.getenv("CLUSTER_SECRET", ""),
+    )
+
+# Required in the X-Admin-Token header of /admin endpoints when set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# ----------------------------
+# Warm-up (GET /ready stays 503 until these finish, or WARMUP_TIMEOUT passes)
+# ----------------------------
+warmup = Warmup(timeout_seconds=float(os.getenv("WARMUP_TIMEOUT", "60")))
+# Touch the retrieval index and templates so the first request doesn't build them
+warmup.add("corpus", lambda: default_channel.index.best_match("warm up"), critical=True)
+warmup.add("templates", lambda: analyze(engine.templates.render("warm up", "short")), critical=True)
+for provider in engine.providers:
+    # Opens the HTTP connection and checks the key; a failure only degrades (templates still serve)
+    warmup.add(f"provider.{provider.name}", provider.warmup)
+    if os.getenv("WARMUP_GENERATE", "false").lower() in ("1", "true", "yes"):
+        warmup.add(f"generate.{provider.name}",
+                   lambda p=provider: p.generate("Reply with the single word OK.", "", max_tokens=5, temperature=0))
+if script_store:
+    warmup.add("store", lambda: script_store.search("", 1, 1))
 
 app = FastAPI(
     title="TechFela YouTube Script Writer API",
@@ -88,160 +206,270 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses above the threshold with brotli or gzip, as the client accepts
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_BYTES", "1024")))
+
+# Outermost, so request traces include compression time
+# Probes are polled constantly and say nothing about request latency
+app.add_middleware(TracingMiddleware, tracer=tracer, exclude_paths=("/traces", "/live", "/ready", "/health"))
+
 # Request/Response models
 class ScriptRequest(BaseModel):
     topic: str
     video_type: str = "short"  # short (60-90 secs), long (3-6 mins)
+    channel: str = DEFAULT_CHANNEL  # directory name under CHANNELS_DIR
+    candidates: int = 1  # variants generated in one round trip, best returned first (max MAX_CANDIDATES)
+    fresh: bool = False  # skip the response cache and generate a new version (Regenerate)
+
+class ScriptSection(BaseModel):
+    label: str  # e.g. "(0-15 seconds)"
+    start_seconds: float
+    end_seconds: float
+    word_count: int
+    estimated_seconds: float
+    overrun: bool  # more words than fit the time slot
 
 class ScriptResponse(BaseModel):
     script: str
     word_count: int
     estimated_duration: str
+    estimated_seconds: float = 0.0  # spoken duration at 150 words per minute
+    sections: List[ScriptSection] = []
+    overrun: bool = False  # longer than the video type allows
+    tokens_saved: int = 0  # estimated output tokens saved by stopping at the target length
+    score: Optional[float] = None  # local ranking score when several candidates were requested
+    candidates: List["ScriptCandidate"] = []  # the other variants, best first
+    prompt_variant: Optional[str] = None  # prompt experiment variant that produced the script
+    repairs: List[str] = []  # defects fixed by retrying just that part, e.g. "truncated (75-90 seconds)"
+    defects: List[str] = []  # defects validation found that are still in the script
+
+class ScriptCandidate(BaseModel):
+    script: str
+    word_count: int
+    estimated_duration: str
+    estimated_seconds: float
+    score: float
 
-# Initialize OpenAI client
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
-def generate_techfela_script(topic: str, video_type: str = "short") -> str:
-    """Generate script using TechFela prompts and Gemini AI"""
-    
-    try:
-        # Choose appropriate prompt based on video type
-        if video_type == "short":
-            prompt = short_video_prompt  # 60-90 seconds
-        else:  # long
-            prompt = long_video_prompt   # 3-6 minutes
-        
-        # Find relevant reference from sample scripts
-        reference = ""
-        if sample_scripts and topic:
-            # Find the most relevant sample script based on topic keywords
-            topic_lower = topic.lower()
-            reference = max(sample_scripts, key=lambda s: sum(word in s.lower() for word in topic_lower.split()))
-        
-        # Construct full prompt
-        full_prompt = f"{prompt}\n\nThe topic of the script is: {topic}."
-        
-        if reference and len(reference) > 50:  # Only add if we have substantial reference
-            full_prompt += f"\n\nReference Script Excerpt:\n{reference}\n\n"
-        
-        # Try Gemini first, then fallback to OpenAI
-        if gemini_model:
-            try:
-                logger.info("Generating script with Gemini AI")
-                response = gemini_model.generate_content(full_prompt)
-                if response.text:
-                    return response.text.strip()
-            except Exception as e:
-                logger.error(f"Gemini generation failed: {e}")
-        
-        # Fallback to OpenAI
-        if openai_client:
-            try:
-                logger.info("Generating script with OpenAI")
-                response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a creative scriptwriter for TechFela YouTube channel that creates engaging, humorous content in Roman Urdu for a Pakistani audience."},
-                        {"role": "user", "content": full_prompt}
-                    ],
-                    max_tokens=2000,
-                    temperature=0.7
-                )
-                return response.choices[0].message.content.strip()
-            except Exception as e:
-                logger.error(f"OpenAI generation failed: {e}")
-        
-        # Ultimate fallback to template
-        return generate_techfela_template(topic, video_type)
-        
-    except Exception as e:
-        logger.error(f"Error in TechFela script generation: {e}")
-        return generate_techfela_template(topic, video_type)
-
-def generate_techfela_template(topic: str, video_type: str) -> str:
-    """Generate a TechFela-style template when AI is not available"""
-    
-    if video_type == "short":
-        return f"""Video Title: {topic}: Yeh Kyun Itna Popular Hai? 🤔
-
-(0-15 seconds)
-{topic} ke baare mein suna hai? Agar nahi toh aaj tumhein pata chal jayega kyun sab is ke peeche pagal hain!
-
-(15-30 seconds)
-Dekho bhai, {topic} actually yeh hai ke... *explains basic concept in simple Urdu*. Lekin masla yeh hai ke log ise samajh nahi pa rahe.
-
-(30-45 seconds)
-Pehle zamane mein hum log purane methods use karte the, lekin ab {topic} se sab kuch itna easy ho gaya hai!
+ScriptResponse.model_rebuild()
 
-(45-60 seconds)
-Lekin yahan twist yeh hai - {topic} ke saath ek problem bhi hai. Woh yeh ke sab log ise galat samajh rahe hain.
+class ReviseRequest(BaseModel):
+    script: str
+    paragraph: Optional[int] = None  # 0-based paragraph (blocks separated by blank lines)
+    section: Optional[str] = None  # or a timestamp header such as "(15-30 seconds)"
+    instruction: str = ""  # e.g. "make it funnier"
+    topic: str = ""
+    video_type: str = "short"
+    channel: str = DEFAULT_CHANNEL
+
+class ReviseResponse(BaseModel):
+    script: str
+    original: str
+    revised: str
+    paragraph_start: int
+    paragraph_end: int
+    word_count: int
+    estimated_duration: str
+    prompt_tokens: int
+    output_tokens: int
 
-(60-75 seconds)
-Toh conclusion yeh hai ke {topic} zaroori hai, lekin samajhdari se use karna parega.
+# WebSocket session operations; fields other than these are ignored
+class SessionStart(BaseModel):
+    topic: str
+    video_type: str = "short"
+    channel: str = DEFAULT_CHANNEL
+    script: str = ""  # an existing script to edit instead of generating one
 
-(75-90 seconds)
-Agar video pasand aya toh like kar do, TechFela ko subscribe karna mat bhoolna! Comment mein batao ke tum {topic} use karte ho ya nahi!"""
-    
-    else:  # Long format (3-6 minutes)
-        return f"""Video Title: {topic}: Complete Guide - Sab Kuch Jo Tumhein Jaanna Chahiye! 🔥
+class SessionLength(BaseModel):
+    video_type: str = "short"
 
-(0-30 seconds)
-Assalam o Alaikum TechFela family! Aaj hum detail mein baat karenge {topic} ke baare mein. Agar tum tech ke fan ho toh yeh video tumhare liye perfect hai!
+class SessionRevise(BaseModel):
+    paragraph: Optional[int] = None
+    section: Optional[str] = None
+    instruction: str = ""
 
-(30-90 seconds)
-Pehle main batata hun ke {topic} hai kya. Basically yeh ek technology/concept hai jo aaj kal har jagah use ho raha hai. Pakistan mein bhi iska trend barh raha hai.
+class ExportRequest(BaseModel):
+    script: str
+    format: str = "pdf"  # pdf, docx or txt
+    title: str = ""
 
-(90-150 seconds)
-{topic} ke main benefits yeh hain:
-- Pehla faida: Time save hota hai
-- Doosra faida: Efficiency barh jati hai  
-- Teesra faida: Cost effective hai
+class BulkExportRequest(BaseModel):
+    format: str = "pdf"
+    scripts: List[ExportRequest] = []  # inline scripts (their own format is ignored)
+    script_ids: List[int] = []  # and/or stored scripts, see GET /scripts
 
-(150-210 seconds)
-Lekin har cheez ke kuch disadvantages bhi hote hain. {topic} ke saath main issues yeh hain:
-- Privacy concerns
-- Technical knowledge chahiye
-- Initial setup thoda complex ho sakta hai
+class ExperimentWeights(BaseModel):
+    weights: Dict[str, float]  # variant name -> weight; unlisted variants keep theirs
 
-(210-270 seconds)
-Pakistan mein {topic} ka future kya hai? Main tumhein batata hun ke experts kya keh rahe hain. Agले 2-3 saal mein yeh technology aur bhi common ho jayegi.
+class StoredScriptSummary(BaseModel):
+    id: int
+    created_at: float
+    topic: str
+    video_type: str
+    channel: str
+    provider: str
+    latency_ms: float
+    prompt_tokens: int
+    output_tokens: int
+    word_count: int
+    snippet: str
 
-(270-330 seconds)
-Agar tum {topic} use karna chahte ho toh yeh steps follow karo:
-1. Pehle research karo
-2. Budget decide karo
-3. Slowly slowly implement karo
+class StoredScript(BaseModel):
+    id: int
+    created_at: float
+    topic: str
+    video_type: str
+    channel: str
+    provider: str
+    latency_ms: float
+    prompt_tokens: int
+    output_tokens: int
+    word_count: int
+    script: str
 
-(330-360 seconds)
-Toh dosto, yeh tha complete overview of {topic}. Agar video helpful laga toh like karo, subscribe karo aur bell icon press karna mat bhoolna! Comments mein batao ke tumhara experience kya hai!"""
+class ScriptSearchResponse(BaseModel):
+    total: int
+    page: int
+    page_size: int
+    results: List[StoredScriptSummary]
+
+def generate_techfela_script(topic: str, video_type: str = "short", channel: str = DEFAULT_CHANNEL,
+                             unit: str = None, use_cache: bool = True) -> GenerationResult:
+    """Generate script using the channel's prompts (or the unit's experiment variant), the configured providers and the template fallback"""
+    return engine.generate(topic, video_type, channel, use_cache=use_cache, unit=unit)
+
+def _require_admin(http_request: Request):
+    if ADMIN_TOKEN and not hmac.compare_digest(http_request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def _require_experiment():
+    if experiment is None:
+        raise HTTPException(status_code=404, detail="No prompt experiment is running (set PROMPT_EXPERIMENT=true)")
+    return experiment
+
+def _generate_response(request: ScriptRequest, unit: str = None):
+    """Generate, store and describe a script; returns (response payload, ETag). Blocks on the providers."""
+    # Generate script for the requested channel; several candidates come from one provider call
+    alternatives = []
+    if request.candidates > 1:
+        result, *alternatives = engine.generate_candidates(request.topic, request.video_type, request.candidates, request.channel, unit=unit)
+    else:
+        result = generate_techfela_script(request.topic, request.video_type, request.channel, unit, use_cache=not request.fresh)
+    script = result.script
+    
+    # Word count, sections and duration were computed while the script was produced
+    analysis = result.analysis
+    word_count = analysis.word_count
+    
+    # Persist in the background, never on the request path (cache hits are already stored)
+    if script_store and not result.cached:
+        script_store.add(
+            topic=request.topic,
+            video_type=request.video_type,
+            channel=request.channel,
+            provider=result.provider,
+            latency_ms=result.latency_ms,
+            prompt_tokens=result.prompt_tokens,
+            output_tokens=result.output_tokens,
+            word_count=word_count,
+            script=script,
+        )
+    
+    estimated_duration = analysis.estimated_duration
+    if analysis.overrun:
+        logger.warning(f"Script for '{request.topic}' runs {estimated_duration}, longer than a {request.video_type} video")
+    
+    logger.info(f"Script generated successfully. Word count: {word_count}")
+    
+    response = ScriptResponse(
+        script=script,
+        word_count=word_count,
+        estimated_duration=estimated_duration,
+        estimated_seconds=analysis.estimated_seconds,
+        sections=[section.to_dict() for section in analysis.sections],
+        overrun=analysis.overrun,
+        tokens_saved=result.tokens_saved,
+        score=result.score,
+        candidates=[
+            ScriptCandidate(
+                script=candidate.script,
+                word_count=candidate.analysis.word_count,
+                estimated_duration=candidate.analysis.estimated_duration,
+                estimated_seconds=candidate.analysis.estimated_seconds,
+                score=candidate.score,
+            )
+            for candidate in alternatives
+        ],
+        prompt_variant=result.variant,
+        repairs=result.repairs,
+        defects=result.defects,
+    )
+    etag = compute_etag(script, estimated_duration, *(candidate.script for candidate in alternatives))
+    return response.model_dump(), etag
 
 @app.get("/")
 async def root():
     """Health check endpoint"""
     return {"message": "TechFela Script Writer API is running!", "status": "healthy"}
 
+@app.get("/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: 503 until startup warm-up is done, with per-component timings"""
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
     return {
         "status": "healthy",
+        "ready": warmup.ready,
         "timestamp": time.time(),
         "version": "1.0.0",
         "ai_services": {
-            "gemini_configured": gemini_model is not None,
-            "openai_configured": openai_client is not None,
+            "gemini_configured": any(p.name == "gemini" for p in engine.providers),
+            "openai_configured": any(p.name == "openai" for p in engine.providers),
         },
         "data_loaded": {
-            "base_prompt": bool(base_prompt),
-            "short_video_prompt": bool(short_video_prompt),
-            "long_video_prompt": bool(long_video_prompt),
-            "sample_scripts_count": len(sample_scripts)
-        }
+            "base_prompt": bool(default_channel.prompts.get("base")),
+            "short_video_prompt": bool(default_channel.prompts.get("short")),
+            "long_video_prompt": bool(default_channel.prompts.get("long")),
+            "sample_scripts_count": len(default_channel.index.paragraphs)
+        },
+        "channels": channel_registry.stats()
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Generation engine metrics: stage timings, provider outcomes, cache, channels and pre-generation"""
+    return {**engine.stats(), "pregeneration": pregenerator.stats(), "export": exporter.stats(), "sessions": sessions.stats(),
+            "idempotency": idempotency.stats(), "cluster": cluster.stats() if cluster else None}
+
+@app.get("/channels")
+async def list_channels():
+    """List available channels and which ones are loaded in memory"""
+    return channel_registry.stats()
+
 @app.post("/generate-script", response_model=ScriptResponse)
-async def generate_script(request: ScriptRequest):
-    """Generate a YouTube script based on the provided topic and video type"""
+async def generate_script(request: ScriptRequest, http_request: Request):
+    """Generate a YouTube script based on the provided topic and video type.
+
+    Responses carry an ETag for caches and clients to compare versions (a POST
+    never gets a 304; use an Idempotency-Key to avoid regenerating). Send ``Accept: application/x-msgpack``
+    (or ``?format=msgpack``) for a msgpack body. While a prompt experiment runs,
+    an ``X-Client-ID`` header keeps a client on the same prompt variant.
+
+    Send an ``Idempotency-Key`` header to make retries safe: a repeat of the key
+    waits for the first request's generation or gets its stored response
+    (marked ``Idempotent-Replayed: true``) instead of generating again.
+
+    In cluster mode the request is forwarded to the node that owns the topic
+    (``X-Cluster-Node`` names it), or generated here if that node is unreachable.
+    """
     
     try:
         logger.info(f"Generating {request.video_type} script for topic: {request.topic}")
@@ -253,25 +481,59 @@ async def generate_script(request: ScriptRequest):
         if len(request.topic) > 200:
             raise HTTPException(status_code=400, detail="Topic too long (max 200 characters)")
         
-        # Generate TechFela script
-        script = generate_techfela_script(request.topic, request.video_type)
+        if not 1 <= request.candidates <= MAX_CANDIDATES:
+            raise HTTPException(status_code=400, detail=f"candidates must be between 1 and {MAX_CANDIDATES}")
         
-        # Calculate metrics
-        word_count = len(script.split())
+        try:
+            channel_registry.get(request.channel)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Unknown channel: {request.channel}")
         
-        # Estimate duration based on video type
-        if request.video_type == "short":
-            estimated_duration = "60-90 seconds"
-        else:
-            estimated_duration = "3-6 minutes"
+        if cluster is not None:
+            if FORWARDED_HEADER in http_request.headers:
+                cluster.received += 1
+            else:
+                owner = cluster.owner(request.topic, request.video_type, request.channel)
+                if not cluster.is_local(owner):
+                    with tracer.span("cluster.forward", owner=owner) as span:
+                        # The owner's spans continue this trace
+                        headers = {**http_request.headers, "traceparent": span.traceparent}
+                        forwarded = await cluster.forward(owner, "/generate-script", request.model_dump(), headers)
+                        span.set_attribute("fallback", forwarded is None)
+                    if forwarded is not None:
+                        return forwarded
         
-        logger.info(f"Script generated successfully. Word count: {word_count}")
+        topic_tracker.record(request.topic, request.video_type, request.channel)
         
-        return ScriptResponse(
-            script=script,
-            word_count=word_count,
-            estimated_duration=estimated_duration
-        )
+        # Runs in a thread, so a retry with the same Idempotency-Key can attach while it generates
+        # The client id picks the prompt variant, so it is part of what makes two requests identical
+        unit = http_request.headers.get("x-client-id")
+        fingerprint = IdempotencyStore.fingerprint(request.topic, request.video_type, request.channel, request.candidates, unit,
+                                                   request.fresh)
+
+        async def produce():
+            return await run_in_threadpool(_generate_response, request, unit)
+
+        replayed = None
+        idempotency_key = http_request.headers.get("idempotency-key")
+        if idempotency_key:
+            if len(idempotency_key) > 255:
+                raise HTTPException(status_code=400, detail="Idempotency-Key too long (max 255 characters)")
+            try:
+                (payload, etag), replayed = await idempotency.run(idempotency_key, fingerprint, produce, coalesce=not request.fresh)
+            except IdempotencyConflict:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        elif request.fresh:
+            # A new version was asked for: don't hand out the one another request is generating
+            payload, etag = await produce()
+        else:
+            payload, etag = await idempotency.coalesce(fingerprint, produce)
+
+        with tracer.span("serialize"):
+            response = build_response(http_request, payload, etag=etag)
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return response
         
     except HTTPException:
         raise
@@ -279,45 +541,368 @@ async def generate_script(request: ScriptRequest):
         logger.error(f"Error generating script: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error while generating script")
 
-async def generate_ai_script(request: ScriptRequest) -> str:
-    """Generate script using OpenAI API - simplified for TechFela only"""
-    
+@app.post("/revise-section", response_model=ReviseResponse)
+def revise_section(request: ReviseRequest):
+    """Regenerate one paragraph or timestamp section and splice it back into the script.
+
+    Only the section and a short excerpt around it are sent to the model, so
+    cost and latency follow the size of the section, not the script.
+    """
+    if not request.script.strip():
+        raise HTTPException(status_code=400, detail="Script cannot be empty")
+    if len(request.script) > 50000:
+        raise HTTPException(status_code=400, detail="Script too long (max 50000 characters)")
+    if len(request.instruction) > 500:
+        raise HTTPException(status_code=400, detail="Instruction too long (max 500 characters)")
+
+    paragraphs = split_paragraphs(request.script)
+    if request.section:
+        try:
+            start, end = find_section(paragraphs, request.section)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Section not found: {request.section}")
+    elif request.paragraph is not None:
+        start, end = request.paragraph, request.paragraph + 1
+    else:
+        raise HTTPException(status_code=400, detail="Give either paragraph or section")
+
     try:
-        # Choose prompt based on video type
-        if request.video_type == "short":
-            prompt = short_video_prompt
+        revision = engine.revise(request.script, start, end, request.topic, request.instruction,
+                                 request.video_type, request.channel)
+    except IndexError:
+        raise HTTPException(status_code=400, detail=f"Paragraph must be between 0 and {len(paragraphs) - 1}")
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown channel: {request.channel}")
+    except RuntimeError as e:
+        logger.error(f"Error revising section: {e}")
+        raise HTTPException(status_code=503, detail="No AI provider available to revise the section")
+
+    analysis = analyze(revision.script, request.video_type)
+    return ReviseResponse(
+        script=revision.script,
+        original=revision.original,
+        revised=revision.revised,
+        paragraph_start=revision.start,
+        paragraph_end=revision.end,
+        word_count=analysis.word_count,
+        estimated_duration=analysis.estimated_duration,
+        prompt_tokens=revision.prompt_tokens,
+        output_tokens=revision.output_tokens,
+    )
+
+async def _session_generate(session: EditSession, send, op: str, fresh: bool = False):
+    # Chunks joined (and stripped) are the new script, which replaces the previous version whole
+    async for text in iterate_in_threadpool(session.generate(fresh)):
+        await send({"type": "chunk", "text": text})
+    result = session.last_result
+    await send({"type": "generated", "op": op, "provider": result.provider, "cached": result.cached,
+                "latency_ms": round(result.latency_ms, 1), "prompt_tokens": result.prompt_tokens,
+                "output_tokens": result.output_tokens, "defects": result.defects, "error": result.error,
+                **session.summary()})
+    if result.defects:
+        patch = await run_in_threadpool(session.repair)
+        if patch is not None:
+            result = session.last_result
+            await send({"type": "patch", "op": "repair", **patch, "repairs": result.repairs, "defects": result.defects,
+                        "error": result.error, **session.summary()})
+
+async def _session_op(session: EditSession, message: dict, send):
+    op = message.get("op")
+    if op == "start":
+        start = SessionStart.model_validate(message)
+        topic, script = start.topic.strip(), start.script
+        if not topic:
+            raise ValueError("Topic cannot be empty")
+        if len(topic) > 200:
+            raise ValueError("Topic too long (max 200 characters)")
+        if len(script) > 50000:
+            raise ValueError("Script too long (max 50000 characters)")
+        patch = session.start(topic, start.video_type, start.channel, script)
+        if patch is None:
+            await _session_generate(session, send, op)
         else:
-            prompt = long_video_prompt
-            
-        full_prompt = f"{prompt}\n\nThe topic of the script is: {request.topic}."
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a creative scriptwriter for TechFela YouTube channel that creates engaging, humorous content in Roman Urdu for a Pakistani audience."},
-                {"role": "user", "content": full_prompt}
-            ],
-            max_tokens=2000,
-            temperature=0.7
-        )
-        
-        return response.choices[0].message.content.strip()
-        
-    except Exception as e:
-        logger.error(f"OpenAI API error: {str(e)}")
-        # Fallback to template generation
-        return generate_techfela_template(request.topic, request.video_type)
-
-def estimate_duration(word_count: int) -> str:
-    """Estimate video duration based on word count"""
-    minutes = word_count / 150
-    
-    if minutes < 1.5:
-        return "60-90 seconds"
-    elif minutes < 6:
-        return "3-6 minutes"
+            await send({"type": "patch", "op": op, **patch, **session.summary()})
+        return
+    if not session.topic:
+        raise ValueError("Send a start operation first")
+    if op == "retry":
+        await _session_generate(session, send, op, fresh=True)
+    elif op == "length":
+        session.set_length(SessionLength.model_validate(message).video_type)
+        await _session_generate(session, send, op)
+    elif op == "revise":
+        revise = SessionRevise.model_validate(message)
+        if len(revise.instruction) > 500:
+            raise ValueError("Instruction too long (max 500 characters)")
+        patch, revision = await run_in_threadpool(session.revise, revise.paragraph, revise.section, revise.instruction)
+        await send({"type": "patch", "op": op, **patch, "prompt_tokens": revision.prompt_tokens,
+                    "output_tokens": revision.output_tokens, **session.summary()})
+    elif op == "undo":
+        patch = session.undo()
+        if patch is None:
+            raise ValueError("Nothing to undo")
+        await send({"type": "patch", "op": op, **patch, **session.summary()})
+    elif op == "script":
+        await send({"type": "script", "script": session.script, **session.summary()})
     else:
-        return "6+ minutes"
+        raise ValueError(f"Unknown op: {op} (use {', '.join(SESSION_OPS)})")
+
+@app.websocket("/ws/session")
+async def edit_session(websocket: WebSocket):
+    """Interactive editing session: the script and its generation context stay on the server.
+
+    Clients send JSON operations and get small messages back:
+
+    - ``{"op": "start", "topic": ..., "video_type": ..., "channel": ...}`` generates a script
+      (streamed as ``chunk`` messages, then ``generated``); add ``"script"`` to edit an existing one
+    - ``{"op": "revise", "paragraph": 2}`` or ``{"op": "revise", "section": "(15-30 seconds)",
+      "instruction": ...}`` rewrites one part
+    - ``{"op": "retry"}`` regenerates with the same context, ``{"op": "length", "video_type": "long"}``
+      regenerates at another length, ``{"op": "undo"}`` reverts the last change and
+      ``{"op": "script"}`` returns the whole script
+    - edits answer with a ``patch``: replace paragraphs [start, end) of the previous version with
+      ``paragraphs`` (paragraphs are separated by blank lines)
+
+    Errors come back as ``{"type": "error"}`` messages and leave the session open. An
+    ``X-Client-ID`` header or ``client_id`` query parameter picks the prompt experiment variant.
+    """
+    await websocket.accept()
+    if not sessions.open():
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
+    session = EditSession(engine, unit=websocket.headers.get("x-client-id") or websocket.query_params.get("client_id"))
+
+    async def send(message):
+        data = json.dumps(message, ensure_ascii=False)
+        sessions.bytes_sent += len(data.encode("utf-8"))
+        await websocket.send_text(data)
+
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive_json(), SESSION_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                await websocket.close(code=1001)
+                return
+            except ValueError:
+                await send({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            if not isinstance(message, dict):
+                await send({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            op = str(message.get("op"))
+            started = time.perf_counter()
+            try:
+                await _session_op(session, message, send)
+            except ValidationError as e:
+                fields = "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors())
+                await send({"type": "error", "op": op, "detail": f"Invalid {op} message ({fields})"})
+            except KeyError as e:
+                await send({"type": "error", "op": op, "detail": f"Not found: {e.args[0] if e.args else e}"})
+            except (IndexError, ValueError) as e:
+                await send({"type": "error", "op": op, "detail": str(e)})
+            except RuntimeError as e:
+                logger.error(f"Session {op} failed: {e}")
+                await send({"type": "error", "op": op, "detail": "No AI provider available"})
+            except Exception as e:
+                # Anything else is a bug, but it shouldn't take the client's session down with it
+                logger.exception(f"Session {op} failed: {e}")
+                await send({"type": "error", "op": op, "detail": "Internal error"})
+            if op in SESSION_OPS:
+                sessions.operations += 1
+                engine.metrics.observe(f"session.{op}", (time.perf_counter() - started) * 1000)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sessions.close()
+
+def _check_export_format(fmt: str):
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format: {fmt} (use {', '.join(FORMATS)})")
+
+def _attachment(data: bytes, media_type: str, file_name: str) -> Response:
+    return Response(data, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{file_name}"'})
+
+@app.post("/export")
+def export_script(request: ExportRequest):
+    """Download a script as PDF, DOCX or TXT (rendered on the export process pool)"""
+    _check_export_format(request.format)
+    if not request.script.strip():
+        raise HTTPException(status_code=400, detail="Script cannot be empty")
+    if len(request.script) > 50000:
+        raise HTTPException(status_code=400, detail="Script too long (max 50000 characters)")
+    try:
+        with tracer.span("export", format=request.format):
+            data = exporter.export(request.script, request.format, request.title)
+    except RenderError as e:
+        logger.warning(f"Export failed: {e}")
+        raise HTTPException(status_code=422, detail=f"This script could not be rendered as {request.format}")
+    except RuntimeError as e:
+        # RendererUnavailable, or the pool shutting down
+        logger.error(f"Export failed: {e}")
+        raise HTTPException(status_code=503, detail=f"Could not export as {request.format}")
+    media_type, extension = FORMATS[request.format]
+    return _attachment(data, media_type, safe_filename(request.title) + extension)
+
+@app.post("/export/bulk")
+def export_scripts(request: BulkExportRequest):
+    """Zip of many scripts in one format, rendered in parallel across the export pool"""
+    _check_export_format(request.format)
+    count = len(request.scripts) + len(request.script_ids)
+    if not count:
+        raise HTTPException(status_code=400, detail="Give scripts and/or script_ids")
+    if count > MAX_BULK_EXPORT:
+        raise HTTPException(status_code=400, detail=f"Too many scripts (max {MAX_BULK_EXPORT})")
+
+    items = [(safe_filename(item.title, f"script_{index + 1}"), item.script, item.title)
+             for index, item in enumerate(request.scripts)]
+    if request.script_ids:
+        if not script_store:
+            raise HTTPException(status_code=503, detail="Script store is disabled")
+        for script_id in request.script_ids:
+            row = script_store.get(script_id)
+            if row is None:
+                raise HTTPException(status_code=404, detail=f"Script not found: {script_id}")
+            items.append((f"{script_id}_{safe_filename(row['topic'])}", row["script"], row["topic"]))
+
+    try:
+        with tracer.span("export_bulk", format=request.format, scripts=count):
+            data = exporter.export_zip(items, request.format)
+    except RenderError as e:
+        logger.warning(f"Bulk export failed: {e}")
+        raise HTTPException(status_code=422, detail=f"A script could not be rendered as {request.format}")
+    except RuntimeError as e:
+        logger.error(f"Bulk export failed: {e}")
+        raise HTTPException(status_code=503, detail=f"Could not export as {request.format}")
+    return _attachment(data, "application/zip", f"scripts_{request.format}.zip")
+
+@app.get("/admin/experiments")
+async def experiment_results(http_request: Request):
+    """Prompt experiment results: per variant and video type, tokens, latency, fallback rate and length fit"""
+    _require_admin(http_request)
+    return _require_experiment().stats()
+
+@app.post("/admin/experiments/weights")
+async def set_experiment_weights(request: ExperimentWeights, http_request: Request):
+    """Change variant weights, e.g. to ramp a winner up (units near the old bucket edges move variant)"""
+    _require_admin(http_request)
+    current = _require_experiment()
+    try:
+        current.set_weights(request.weights)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return current.stats()
+
+@app.post("/admin/experiments/reset")
+async def reset_experiment(http_request: Request):
+    """Start collecting results from zero, e.g. after changing a prompt file"""
+    _require_admin(http_request)
+    current = _require_experiment()
+    current.reset()
+    return current.stats()
+
+class ClusterMember(BaseModel):
+    url: str
+
+def _cluster_member_change(request: ClusterMember, http_request: Request):
+    if cluster is None:
+        raise HTTPException(status_code=404, detail="Cluster mode is off (set CLUSTER_PEERS)")
+    if not cluster.check_secret(http_request.headers.get("x-cluster-secret", "")):
+        raise HTTPException(status_code=403, detail="Joining and leaving need the shared CLUSTER_SECRET")
+    if not request.url.startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="url must be an http(s) base URL")
+
+@app.get("/cluster")
+async def cluster_status():
+    """Cluster members, unreachable nodes and forwarding counts"""
+    if cluster is None:
+        return {"enabled": False}
+    return {"enabled": True, **cluster.stats()}
+
+@app.post("/cluster/join")
+async def cluster_join(request: ClusterMember, http_request: Request):
+    """Add a node to this node's ring (nodes announce themselves at startup)"""
+    _cluster_member_change(request, http_request)
+    cluster.join(request.url)
+    return {"enabled": True, **cluster.stats()}
+
+@app.post("/cluster/leave")
+async def cluster_leave(request: ClusterMember, http_request: Request):
+    """Remove a node from this node's ring (nodes announce it when shutting down)"""
+    _cluster_member_change(request, http_request)
+    cluster.leave(request.url)
+    return {"enabled": True, **cluster.stats()}
+
+@app.get("/scripts", response_model=ScriptSearchResponse)
+def search_scripts(q: str = "", page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=100)):
+    """Search previously generated scripts (full-text over topic and script)"""
+    if not script_store:
+        raise HTTPException(status_code=503, detail="Script store is disabled")
+    try:
+        total, rows = script_store.search(q, page, page_size)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid search query: {e}")
+    return ScriptSearchResponse(total=total, page=page, page_size=page_size, results=rows)
+
+@app.get("/scripts/{script_id}", response_model=StoredScript)
+def get_stored_script(script_id: int, http_request: Request):
+    """Fetch a previously generated script (stored scripts never change, so the ETag is stable)"""
+    if not script_store:
+        raise HTTPException(status_code=503, detail="Script store is disabled")
+    row = script_store.get(script_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Script not found")
+    return build_response(http_request, StoredScript(**row).model_dump(), etag=compute_etag(str(script_id), row["script"]))
+
+@app.get("/traces", response_class=HTMLResponse)
+def list_traces(http_request: Request, min_ms: float = Query(0.0, ge=0), limit: int = Query(20, ge=1, le=200)):
+    """Timeline view of the slowest recent requests"""
+    # Spans carry topics and error messages, so they are admin-only
+    _require_admin(http_request)
+    return render_timeline(tracer.slowest(limit, min_ms))
+
+@app.get("/traces/{trace_id}")
+def get_trace(trace_id: str, http_request: Request):
+    """All spans of one recent trace (the X-Trace-Id response header), OTLP/JSON style"""
+    _require_admin(http_request)
+    spans = tracer.find(trace_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail="Trace not found (only recent traces are kept)")
+    return {"trace_id": trace_id, "spans": [span.to_dict() for span in spans]}
+
+@app.on_event("startup")
+def start_warmup():
+    """Warm up in the background so liveness answers immediately"""
+    warmup.start()
+
+@app.on_event("startup")
+def start_cluster():
+    """Start peer health checks and announce this node when cluster mode is on"""
+    if cluster is not None:
+        cluster.start()
+
+@app.on_event("startup")
+def start_pregenerator():
+    """Start idle-time pre-generation when PREGEN_ENABLED is set"""
+    if os.getenv("PREGEN_ENABLED", "false").lower() in ("1", "true", "yes"):
+        pregenerator.start()
+
+@app.on_event("shutdown")
+def close_script_store():
+    """Stop background work and flush queued scripts to disk before exiting"""
+    pregenerator.stop()
+    if script_store:
+        script_store.close()
+    exporter.close()
+    if tracer.exporter is not None:
+        tracer.exporter.close()
+
+@app.on_event("shutdown")
+async def stop_cluster():
+    """Tell peers this node is leaving and close forwarding connections"""
+    if cluster is not None:
+        await cluster.stop()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,161 @@
+import time
+import logging
+import threading
+
+from engine import DEFAULT_CHANNEL, cache_key
+
+logger = logging.getLogger(__name__)
+
+class TopicTracker:
+    """Decaying popularity counts of requested topics.
+
+    Every request adds ``weight`` to its (topic, video_type, channel) key and
+    scores halve every ``half_life_seconds``, so the ranking follows what is
+    popular now rather than all-time totals.
+    """
+
+    def __init__(self, half_life_seconds=6 * 3600, max_topics=1000):
+        self.half_life_seconds = half_life_seconds
+        self.max_topics = max_topics
+        self._scores = {}
+        self._lock = threading.Lock()
+        self.last_request_at = 0.0
+
+    def _decayed(self, score, updated_at, now):
+        return score * 0.5 ** ((now - updated_at) / self.half_life_seconds)
+
+    def record(self, topic: str, video_type: str = "short", channel: str = DEFAULT_CHANNEL, weight: float = 1.0):
+        """Count a generation request for a topic (searches are left out: a query is not a topic)"""
+        topic = " ".join(topic.split())
+        if not topic:
+            return
+        now = time.time()
+        key = (topic.lower(), video_type, channel)
+        with self._lock:
+            self.last_request_at = now
+            score, updated_at, _ = self._scores.get(key, (0.0, now, topic))
+            self._scores[key] = (self._decayed(score, updated_at, now) + weight, now, topic)
+            if len(self._scores) > self.max_topics:
+                # Drop the least popular half instead of pruning on every insert
+                ranked = sorted(self._scores.items(), key=lambda item: self._decayed(item[1][0], item[1][1], now))
+                for stale_key, _ in ranked[:len(ranked) // 2]:
+                    del self._scores[stale_key]
+
+    def top(self, n: int = 10):
+        """Most popular (topic, video_type, channel) tuples, best first"""
+        now = time.time()
+        with self._lock:
+            ranked = sorted(
+                ((self._decayed(score, updated_at, now), (topic, video_type, channel))
+                 for (_, video_type, channel), (score, updated_at, topic) in self._scores.items()),
+                reverse=True,
+            )
+        return [entry for _, entry in ranked[:n]]
+
+    def idle_for(self) -> float:
+        """Seconds since the last real generation request"""
+        return time.time() - self.last_request_at
+
+class Pregenerator:
+    """Pre-generates likely topics into the response cache while the service is idle.
+
+    Candidates are the configured topics followed by the tracker's most popular
+    ones. Work only starts after ``idle_seconds`` without requests, stops as
+    soon as traffic returns, and is capped by a token budget per
+    ``budget_window_seconds``. Entries are cached for ``stale_after_seconds``
+    and regenerated once they expire.
+    """
+
+    def __init__(self, engine, tracker: TopicTracker, topics=(), idle_seconds=60, interval_seconds=30,
+                 token_budget=200000, budget_window_seconds=24 * 3600, stale_after_seconds=6 * 3600, max_learned=20):
+        self.engine = engine
+        self.tracker = tracker
+        self.topics = list(topics)
+        self.idle_seconds = idle_seconds
+        self.interval_seconds = interval_seconds
+        self.token_budget = token_budget
+        self.budget_window_seconds = budget_window_seconds
+        self.stale_after_seconds = stale_after_seconds
+        self.max_learned = max_learned
+        self.tokens_used = 0
+        self.generated = 0
+        self.last_run_at = None
+        self._window_started = time.time()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="pregenerator", daemon=True)
+            self._thread.start()
+            logger.info(f"Pre-generation enabled ({len(self.topics)} configured topics)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def candidates(self):
+        """Configured topics first, then learned ones, without duplicates"""
+        seen = set()
+        result = []
+        for entry in [(topic, "short", DEFAULT_CHANNEL) for topic in self.topics] + self.tracker.top(self.max_learned):
+            key = cache_key(*entry)
+            if key not in seen:
+                seen.add(key)
+                result.append(entry)
+        return result
+
+    def _budget_left(self) -> int:
+        if time.time() - self._window_started >= self.budget_window_seconds:
+            self._window_started = time.time()
+            self.tokens_used = 0
+        return self.token_budget - self.tokens_used
+
+    def run_once(self) -> int:
+        """Fill missing or expired cache entries while idle and within budget; returns how many were generated"""
+        generated = 0
+        self.last_run_at = time.time()
+        for topic, video_type, channel in self.candidates():
+            if self._stop.is_set() or self.tracker.idle_for() < self.idle_seconds or self._budget_left() <= 0:
+                break
+            try:
+                # The key requests look up, with the prompt variant an experiment assigns
+                key = self.engine.cache_key_for(topic, video_type, channel)
+                if self.engine.cache.peek(key) is not None:
+                    continue
+                # Background work stays out of the experiment and routing statistics
+                result = self.engine.generate(topic, video_type, channel, use_cache=False, record=False)
+            except KeyError:
+                continue  # channel no longer exists
+            self.tokens_used += result.prompt_tokens + result.output_tokens
+            if result.provider == "template":
+                # Providers are down; templates are cheap to make on demand
+                break
+            self.engine.cache.set(key, result, ttl_seconds=self.stale_after_seconds)
+            self.engine.metrics.incr("pregen.generated")
+            generated += 1
+        self.generated += generated
+        if generated:
+            logger.info(f"Pre-generated {generated} scripts ({self.tokens_used}/{self.token_budget} tokens used)")
+        return generated
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            if self.tracker.idle_for() < self.idle_seconds:
+                continue
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Pre-generation failed: {e}")
+
+    def stats(self):
+        return {
+            "enabled": self._thread is not None,
+            "configured_topics": len(self.topics),
+            "candidates": [list(entry) for entry in self.candidates()[:10]],
+            "generated": self.generated,
+            "tokens_used": self.tokens_used,
+            "token_budget": self.token_budget,
+            "last_run_at": self.last_run_at,
+        }
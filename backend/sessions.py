@@ -0,0 +1,159 @@
+from engine import DEFAULT_CHANNEL, analyze, find_section, split_paragraphs
+
+def paragraph_patch(old, new):
+    """Smallest single replacement turning paragraph list old into new: (start, end, replacement)"""
+    start = 0
+    limit = min(len(old), len(new))
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end_old, end_new = len(old), len(new)
+    while end_old > start and end_new > start and old[end_old - 1] == new[end_new - 1]:
+        end_old -= 1
+        end_new -= 1
+    return start, end_old, new[start:end_new]
+
+class EditSession:
+    """Server-side state for one interactive editing session.
+
+    Holds the current script as paragraphs, a bounded undo history and the
+    prepared generation context (reference excerpt and assembled prompt), so
+    edits are small operations: the client never re-sends the script, and
+    retries reuse the context instead of rebuilding it. Every edit returns a
+    paragraph patch against the previous version rather than the whole
+    script. Methods block on the providers; the WebSocket handler runs them
+    in a thread.
+    """
+
+    def __init__(self, engine, unit: str = None, max_versions: int = 20):
+        self.engine = engine
+        self.unit = unit
+        self.max_versions = max_versions
+        self.topic = ""
+        self.video_type = "short"
+        self.channel = DEFAULT_CHANNEL
+        self.paragraphs = []
+        self.version = 0
+        self._history = []
+        self._prepared = None
+        self.last_result = None
+
+    @property
+    def script(self) -> str:
+        return "\n\n".join(self.paragraphs)
+
+    def _commit(self, paragraphs):
+        """Make paragraphs the current version and return the patch from the previous one"""
+        self._history.append(self.paragraphs)
+        del self._history[:-self.max_versions]
+        start, end, replacement = paragraph_patch(self.paragraphs, paragraphs)
+        self.paragraphs = paragraphs
+        self.version += 1
+        return {"version": self.version, "start": start, "end": end, "paragraphs": replacement}
+
+    def summary(self):
+        analysis = analyze(self.script, self.video_type)
+        return {
+            "version": self.version,
+            "paragraph_count": len(self.paragraphs),
+            "word_count": analysis.word_count,
+            "estimated_duration": analysis.estimated_duration,
+            "overrun": analysis.overrun,
+        }
+
+    def start(self, topic: str, video_type: str = "short", channel: str = DEFAULT_CHANNEL, script: str = ""):
+        """Set what the session is about; an existing script (e.g. from /generate-script) can be loaded as version 1.
+        Raises KeyError for unknown channels."""
+        self.engine.registry.get(channel)
+        if (topic, video_type, channel) != (self.topic, self.video_type, self.channel):
+            self._prepared = None
+        self.topic, self.video_type, self.channel = topic, video_type, channel
+        if script:
+            return self._commit(split_paragraphs(script))
+        return None
+
+    def generate(self, fresh: bool = False):
+        """Stream a whole new script; yields text chunks, then the stream's result is committed.
+
+        ``fresh`` skips the response cache (a retry). The context prepared by the
+        first generation is reused until the topic, video type or channel change.
+        """
+        stream = self.engine.stream(self.topic, self.video_type, self.channel, use_cache=not fresh,
+                                    unit=self.unit, prepared=self._prepared)
+        self._prepared = stream.prepared
+        yield from stream
+        self.last_result = stream.result
+        if stream.result is not None:
+            self._commit(split_paragraphs(stream.result.script))
+
+    def repair(self):
+        """Fix the last generated script's defects with targeted retries; returns the patch, or None when nothing changed.
+        Streamed text can't be retried part by part while it streams, so this runs after generate()."""
+        result = self.last_result
+        if result is None or not result.defects or not (self.engine.validation or result.error):
+            return None
+        self.last_result = self.engine.repair(result, self.topic, self.video_type, self.channel)
+        if not self.last_result.repairs:
+            return None
+        return self._commit(split_paragraphs(self.last_result.script))
+
+    def set_length(self, video_type: str):
+        """Switch video type; the next generate() builds the prompt for the new length"""
+        if video_type != self.video_type:
+            self.video_type = video_type
+            self._prepared = None
+
+    def revise(self, paragraph: int = None, section: str = None, instruction: str = ""):
+        """Rewrite one paragraph or timestamp section; returns (patch, Revision).
+        Raises KeyError for an unknown section, IndexError for a bad paragraph,
+        ValueError when neither is given and RuntimeError when no provider answers."""
+        if section:
+            start, end = find_section(self.paragraphs, section)
+        elif paragraph is not None:
+            start, end = paragraph, paragraph + 1
+        else:
+            raise ValueError("Give either paragraph or section")
+        revision = self.engine.revise(self.script, start, end, self.topic, instruction, self.video_type, self.channel)
+        return self._commit(split_paragraphs(revision.script)), revision
+
+    def undo(self):
+        """Go back one version; returns the patch, or None when there is nothing to undo"""
+        if not self._history:
+            return None
+        previous = self._history.pop()
+        start, end, replacement = paragraph_patch(self.paragraphs, previous)
+        self.paragraphs = previous
+        self.version += 1
+        return {"version": self.version, "start": start, "end": end, "paragraphs": replacement}
+
+class SessionRegistry:
+    """Counts open sessions against a limit; sessions themselves live with their connection.
+    Only touched from the event loop, so no locking."""
+
+    def __init__(self, max_sessions: int = 200):
+        self.max_sessions = max_sessions
+        self.active = 0
+        self.opened = 0
+        self.rejected = 0
+        self.operations = 0
+        self.bytes_sent = 0
+
+    def open(self) -> bool:
+        if self.active >= self.max_sessions:
+            self.rejected += 1
+            return False
+        self.active += 1
+        self.opened += 1
+        return True
+
+    def close(self):
+        self.active -= 1
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "max_sessions": self.max_sessions,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "operations": self.operations,
+            "bytes_sent": self.bytes_sent,
+        }
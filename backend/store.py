@@ -0,0 +1,166 @@
+import time
+import queue
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scripts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    topic TEXT NOT NULL,
+    video_type TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    latency_ms REAL NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    word_count INTEGER NOT NULL,
+    script TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS scripts_fts USING fts5(
+    topic, script, content='scripts', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS scripts_ai AFTER INSERT ON scripts BEGIN
+    INSERT INTO scripts_fts(rowid, topic, script) VALUES (new.id, new.topic, new.script);
+END;
+CREATE TRIGGER IF NOT EXISTS scripts_ad AFTER DELETE ON scripts BEGIN
+    INSERT INTO scripts_fts(scripts_fts, rowid, topic, script) VALUES ('delete', old.id, old.topic, old.script);
+END;
+"""
+
+COLUMNS = (
+    "created_at", "topic", "video_type", "channel", "provider",
+    "latency_ms", "prompt_tokens", "output_tokens", "word_count", "script",
+)
+
+def fts_query(text: str) -> str:
+    """Quote every term so user input can't break the FTS5 query syntax"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+class ScriptStore:
+    """SQLite store of generated scripts with FTS5 search.
+
+    ``add`` only enqueues the record; a background thread writes queued
+    records in batches, so persisting never adds to request latency.
+    """
+
+    def __init__(self, db_path="scripts.db", batch_size=50, flush_interval=0.5):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._closed = False
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="script-store-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"Script store ready at {db_path}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ----------------------------
+    # Writes
+    # ----------------------------
+    def add(self, **record):
+        """Queue a generated script for persistence"""
+        if self._closed:
+            return
+        record.setdefault("created_at", time.time())
+        self._queue.put(tuple(record[column] for column in COLUMNS))
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                with conn:
+                    conn.executemany(
+                        f"INSERT INTO scripts ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                        batch,
+                    )
+            except Exception as e:
+                logger.error(f"Failed to persist {len(batch)} scripts: {e}")
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                break
+        conn.close()
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write pending records and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+
+    # ----------------------------
+    # Reads
+    # ----------------------------
+    def search(self, query: str = "", page: int = 1, page_size: int = 20):
+        """Full-text search over topics and scripts, newest first when no query is given"""
+        offset = (page - 1) * page_size
+        conn = self._connect()
+        try:
+            if query.strip():
+                match = fts_query(query)
+                total = conn.execute(
+                    "SELECT COUNT(*) FROM scripts_fts WHERE scripts_fts MATCH ?", (match,)
+                ).fetchone()[0]
+                rows = conn.execute(
+                    "SELECT s.id, s.created_at, s.topic, s.video_type, s.channel, s.provider, s.latency_ms, "
+                    "s.prompt_tokens, s.output_tokens, s.word_count, "
+                    "snippet(scripts_fts, 1, '[', ']', '...', 16) AS snippet "
+                    "FROM scripts_fts JOIN scripts s ON s.id = scripts_fts.rowid "
+                    "WHERE scripts_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?",
+                    (match, page_size, offset),
+                ).fetchall()
+            else:
+                total = conn.execute("SELECT COUNT(*) FROM scripts").fetchone()[0]
+                rows = conn.execute(
+                    "SELECT id, created_at, topic, video_type, channel, provider, latency_ms, "
+                    "prompt_tokens, output_tokens, word_count, substr(script, 1, 200) AS snippet "
+                    "FROM scripts ORDER BY id DESC LIMIT ? OFFSET ?",
+                    (page_size, offset),
+                ).fetchall()
+            return total, [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def get(self, script_id: int):
+        """Fetch one stored script, or None"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM scripts WHERE id = ?", (script_id,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
@@ -0,0 +1,65 @@
+import html
+import json
+
+def _bar(span, depth, trace_start, total_ns):
+    """One timeline row: the span's offset and width as a share of the whole trace"""
+    end_ns = span.end_ns or span.start_ns
+    left = 100 * (span.start_ns - trace_start) / total_ns
+    width = max(100 * (end_ns - span.start_ns) / total_ns, 0.3)
+    color = "#d9534f" if span.status == "ERROR" else "#5b8def"
+    details = html.escape(json.dumps(span.attributes, ensure_ascii=False, default=str))
+    if span.status_message:
+        details += "<br>" + html.escape(span.status_message)
+    return (
+        f'<div class="row"><div class="name" style="padding-left:{depth * 14}px" title="{details}">{html.escape(span.name)}</div>'
+        f'<div class="lane"><div class="bar" style="left:{left:.2f}%;width:{width:.2f}%;background:{color}"></div></div>'
+        f'<div class="ms">{span.duration_ms:.1f} ms</div></div>'
+    )
+
+def _ordered(spans):
+    """Spans depth-first from the local root, so children sit under their parent"""
+    children = {}
+    ids = {span.span_id for span in spans}
+    roots = []
+    for span in sorted(spans, key=lambda span: span.start_ns):
+        if span.parent_id in ids:
+            children.setdefault(span.parent_id, []).append(span)
+        else:
+            roots.append(span)
+    ordered = []
+
+    def visit(span, depth):
+        ordered.append((span, depth))
+        for child in children.get(span.span_id, []):
+            visit(child, depth + 1)
+
+    for root in roots:
+        visit(root, 0)
+    return ordered
+
+def render_timeline(traces) -> str:
+    """HTML page with a waterfall per trace; ``traces`` is a list of (duration_ms, spans)"""
+    sections = []
+    for duration_ms, spans in traces:
+        trace_start = min(span.start_ns for span in spans)
+        total_ns = max((span.end_ns or span.start_ns) for span in spans) - trace_start or 1
+        rows = [_bar(span, depth, trace_start, total_ns) for span, depth in _ordered(spans)]
+        trace_id = html.escape(spans[0].trace_id)
+        sections.append(
+            f'<section><h2>{html.escape(spans[0].name)} — {duration_ms:.1f} ms '
+            f'<a href="/traces/{trace_id}">{trace_id}</a></h2>{"".join(rows)}</section>'
+        )
+    body = "".join(sections) or "<p>No traces recorded yet.</p>"
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Traces</title>
+<style>
+body {{ font-family: sans-serif; margin: 20px; color: #222; }}
+h2 {{ font-size: 15px; margin: 18px 0 6px; }}
+h2 a {{ font-weight: normal; font-size: 12px; color: #888; }}
+.row {{ display: flex; align-items: center; font-size: 12px; height: 20px; }}
+.name {{ width: 260px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }}
+.lane {{ flex: 1; position: relative; height: 12px; background: #f2f2f2; }}
+.bar {{ position: absolute; top: 0; height: 12px; border-radius: 2px; }}
+.ms {{ width: 90px; text-align: right; color: #555; }}
+</style></head>
+<body><h1>Slowest recent requests</h1>{body}</body></html>"""
@@ -0,0 +1,216 @@
+import zlib
+import hashlib
+import logging
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+# Content types that are already compressed; recompressing them only costs CPU
+INCOMPRESSIBLE_PREFIXES = (
+    "image/", "video/", "audio/", "application/zip", "application/gzip", "application/pdf",
+    "application/vnd.openxmlformats",  # docx and friends are zip files
+)
+
+# ----------------------------
+# Compression
+# ----------------------------
+def choose_encoding(accept_encoding: str):
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0"""
+    offered = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip()] = quality
+    wildcard = offered.get("*", 0.0)
+    if brotli is not None and offered.get("br", wildcard) > 0:
+        return "br"
+    if offered.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+class _Compressor:
+    """Incremental gzip/brotli compressor so streamed responses can be compressed too"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=5)
+        else:
+            self._zlib = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + self._brotli.flush() if flush else out
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip compression for responses of at least ``minimum_size`` bytes.
+
+    Small payloads are sent as-is (compression would cost more than it saves);
+    streamed responses are compressed chunk by chunk and flushed per chunk so
+    clients still see data as it is produced.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                response_headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in message.get("headers", [])}
+                content_type = response_headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in response_headers
+                    or content_type.startswith(INCOMPRESSIBLE_PREFIXES)
+                    or message["status"] in (204, 304)
+                )
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    # Whole response is small: send it untouched
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                new_headers = [(k, v) for k, v in start_message.get("headers", []) if k.lower() != b"content-length"]
+                new_headers += [(b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+                if not more_body:
+                    compressed = compressor.compress(body) + compressor.finish()
+                    new_headers.append((b"content-length", str(len(compressed)).encode()))
+                    await send({**start_message, "headers": new_headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send({**start_message, "headers": new_headers})
+
+            if more_body:
+                await send({"type": "http.response.body", "body": compressor.compress(body, flush=True), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.compress(body) + compressor.finish()})
+
+        await self.app(scope, receive, send_wrapper)
+
+# ----------------------------
+# Response format & ETags
+# ----------------------------
+def wants_msgpack(request: Request) -> bool:
+    """True when the client asked for msgpack via ?format=msgpack or the Accept header"""
+    if msgpack is None:
+        return False
+    return request.query_params.get("format") == "msgpack" or MSGPACK_MEDIA_TYPE in request.headers.get("accept", "")
+
+def compute_etag(*parts: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match covers this ETag (weak comparison)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+def build_response(request: Request, payload: dict, etag: str = None, headers: dict = None) -> Response:
+    """Serialize payload as JSON or msgpack; answer 304 when the client already has this ETag.
+
+    304 is only defined for GET and HEAD, so other methods always get the body
+    (POST retries are deduplicated by the idempotency layer instead).
+    """
+    headers = dict(headers or {})
+    if etag:
+        headers["ETag"] = etag
+        if request.method in ("GET", "HEAD") and etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+    if wants_msgpack(request):
+        return Response(msgpack.packb(payload, use_bin_type=True), media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+    return JSONResponse(payload, headers=headers)
+
+# ----------------------------
+# Tracing
+# ----------------------------
+class TracingMiddleware:
+    """Wraps each HTTP request in a root span.
+
+    An incoming W3C ``traceparent`` header is continued, and the response
+    carries ``traceparent``/``X-Trace-Id`` so a slow request can be looked up
+    in the trace viewer. Paths in ``exclude_paths`` (the viewer itself) are
+    not traced.
+    """
+
+    def __init__(self, app, tracer, exclude_paths=("/traces",)):
+        self.app = app
+        self.tracer = tracer
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        name = f"{scope['method']} {scope['path']}"
+        with self.tracer.span(name, traceparent=headers.get("traceparent"), **{"http.method": scope["method"], "http.target": scope["path"]}) as span:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    trace_headers = [(b"traceparent", span.traceparent.encode()), (b"x-trace-id", span.trace_id.encode())]
+                    message = {**message, "headers": list(message.get("headers", [])) + trace_headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,77 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class Warmup:
+    """Startup warm-up steps, run once in the background, and the readiness they imply.
+
+    Steps run in the order they were added. The instance is ready once every
+    step has finished and all ``critical`` ones succeeded; a failing
+    non-critical step (a provider that is down, say) only marks it degraded,
+    since the template fallback still serves. After ``timeout_seconds`` the
+    instance reports ready regardless, so a hanging step can't keep it out
+    of rotation forever.
+    """
+
+    def __init__(self, timeout_seconds: float = 60):
+        self.timeout_seconds = timeout_seconds
+        self._steps = []
+        self.components = {}
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+
+    def add(self, name: str, fn, critical: bool = False):
+        self._steps.append((name, fn, critical))
+        self.components[name] = {"status": "pending", "critical": critical, "duration_ms": None, "error": None}
+
+    def start(self):
+        if self._thread is None:
+            self.started_at = time.monotonic()
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def run(self):
+        self.started_at = self.started_at or time.monotonic()
+        for name, fn, _ in self._steps:
+            component = self.components[name]
+            component["status"] = "running"
+            started = time.perf_counter()
+            try:
+                fn()
+                component["status"] = "ok"
+            except Exception as e:
+                component["status"] = "failed"
+                component["error"] = f"{type(e).__name__}: {e}"[:300]
+                logger.warning(f"Warm-up step {name} failed: {e}")
+            component["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.finished_at = time.monotonic()
+        logger.info(f"Warm-up finished in {(self.finished_at - self.started_at) * 1000:.0f} ms "
+                    f"({'ready' if self.ready else 'not ready'})")
+
+    @property
+    def timed_out(self) -> bool:
+        return (self.finished_at is None and self.started_at is not None
+                and time.monotonic() - self.started_at >= self.timeout_seconds)
+
+    @property
+    def ready(self) -> bool:
+        if self.timed_out:
+            return True
+        if self.finished_at is None:
+            return False
+        return all(c["status"] == "ok" for c in self.components.values() if c["critical"])
+
+    def status(self):
+        components = {name: dict(component) for name, component in self.components.items()}
+        degraded = any(c["status"] == "failed" for c in components.values()) or self.timed_out
+        elapsed_end = self.finished_at or time.monotonic()
+        return {
+            "ready": self.ready,
+            "degraded": degraded,
+            "timed_out": self.timed_out,
+            "warmup_ms": round((elapsed_end - self.started_at) * 1000, 1) if self.started_at else None,
+            "components": components,
+        }
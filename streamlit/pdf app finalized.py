@@ -1,77 +1,62 @@
 import os
+import sys
 import streamlit as st
-from docx import Document
-import google.generativeai as genai
 import io
 import markdown
 import base64
 from xhtml2pdf import pisa
 
 # ----------------------------
-# 1. Load Reference Scripts from DOCX
+# 1. Shared Generation Engine (backend/engine)
 # ----------------------------
-def load_sample_scripts(file_path="sample_scripts.docx"):
-    if not os.path.exists(file_path):
-        return []
-    document = Document(file_path)
-    scripts = [p.text.strip() for p in document.paragraphs if p.text.strip()]
-    return scripts
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "backend"))
 
-sample_scripts = load_sample_scripts()  # Reads from sample_scripts.docx
+from engine import ChannelRegistry, GeminiProvider, ScriptEngine, render_incrementally
 
-# ----------------------------
-# 2. Load Prompt from TXT
-# ----------------------------
-def load_prompt(file_path="prompt.txt"):
-    if not os.path.exists(file_path):
-        return ""
-    with open(file_path, "r", encoding="utf-8") as file:
-        return file.read()
+@st.cache_resource(show_spinner=False)
+def get_engine():
+    """One engine per process, so the corpus index, Gemini client and metrics are shared by every session"""
+    registry = ChannelRegistry(
+        channels_dir=os.path.join(BASE_DIR, "..", "backend", "channels"),
+        default_dir=BASE_DIR,  # sample_scripts.docx and prompt files
+    )
+    # Errors are shown to the user rather than replaced by a template script
+    return ScriptEngine(registry, providers=[GeminiProvider(st.secrets["google_api"])], template_fallback=False)
 
-# Load the prompt from the external file
-base_prompt = load_prompt()
+engine = get_engine()
 
 # ----------------------------
-# 3. YouTube Script Generation Function
+# 2. YouTube Script Generation Function
 # ----------------------------
-def generate_youtube_script(topic):
+# Sidebar "Script Length" choices mapped to the engine's video types
+VIDEO_TYPES = {"Short": "short", "Medium": "long", "Long": "long"}
+
+def generate_youtube_script(topic, video_type="short", placeholder=None):
     """
-    Generates a YouTube script using Gemini 2.0 Flash.
-    It uses a base prompt with a preset context and (optionally) a reference excerpt.
+    Generates a YouTube script using Gemini 2.0 Flash through the shared engine.
+    It uses the prompt from prompt.txt (see channel.json) and the best matching reference excerpt.
+    When a placeholder is given the response is streamed into it as it arrives.
     """
-    # Optionally find a reference excerpt from the sample scripts
-    reference = ""
-    if sample_scripts:
-        reference = max(sample_scripts, key=lambda s: s.lower().count(topic.lower()))
-    
-    # Append the topic to the base prompt
-    full_prompt = base_prompt + "\n\nThe topic of the script is: {}.".format(topic)
-    
-    if reference:
-        full_prompt += "\n\nReference Script Excerpts:\n" + reference + "\n\n"
-    
+    # Every click should produce a fresh script, so skip the response cache
     try:
-        response = model.generate_content(full_prompt)
-        if response.text:
-            return response.text.strip()
+        if placeholder is None:
+            script = engine.generate(topic, video_type, use_cache=False).script
         else:
-            return "No content generated. Please try again."
-    except Exception as e:
+            stream = engine.stream(topic, video_type, use_cache=False)
+            script = render_incrementally(stream, placeholder.markdown)
+            if stream.result is not None and stream.result.error:
+                # The provider failed mid-stream: continue the cut-off script, or show the error
+                result = engine.repair(stream.result, topic, video_type)
+                if result.error:
+                    return f"Error generating script: {result.error}"
+                script = result.script
+    except RuntimeError as e:
         return f"Error generating script: {e}"
+    return script or "No content generated. Please try again."
 
 # ----------------------------
-# 4. Configure Gemini 2.0 Flash API
-
-api_key = st.secrets["google_api"]
-
-# Configure the API
-genai.configure(api_key=api_key)
-
-# Initialize the model
-model = genai.GenerativeModel("gemini-2.0-flash")
-
-# ----------------------------
-# 5. Helper Functions for Markdown and PDF Conversion
+# 3. Helper Functions for Markdown and PDF Conversion
 # ----------------------------
 def convert_markdown_to_html(markdown_text):
     """Convert markdown text to HTML for preview display with enhanced styling"""
@@ -248,8 +233,9 @@ def convert_html_to_pdf(source_html):
     result_file.seek(0)
     return result_file.getvalue()
 
+@st.cache_data(show_spinner=False, max_entries=32)
 def markdown_to_pdf(markdown_text):
-    """Convert markdown to PDF"""
+    """Convert markdown to PDF (cached by content: the download button re-renders on every rerun)"""
     # First convert markdown to HTML (without the style tags for xhtml2pdf)
     html = markdown.markdown(markdown_text)
     
@@ -257,7 +243,7 @@ def markdown_to_pdf(markdown_text):
     return convert_html_to_pdf(html)
 
 # ----------------------------
-# 6. Streamlit App Layout & Settings
+# 4. Streamlit App Layout & Settings
 # ----------------------------
 st.set_page_config(page_title="YouTube Script Generator", page_icon="🎬")
 st.title("🎬 YouTube Script Generator")
@@ -266,10 +252,10 @@ st.caption("Powered by Gemini 2.0 Flash with Retrieval-Augmented Generation")
 # Sidebar: Additional Settings
 st.sidebar.header("Settings")
 script_length = st.sidebar.selectbox("Script Length", ["Short", "Medium", "Long"])
-# (You could further modify the prompt based on the chosen length)
+# (Sets the video type, see VIDEO_TYPES; every length uses prompt.txt, see streamlit/channel.json)
 
 # ----------------------------
-# 7. Session State & Script Storage
+# 5. Session State & Script Storage
 # ----------------------------
 if "current_script" not in st.session_state:
     st.session_state.current_script = ""
@@ -282,19 +268,23 @@ if st.button("🆕 New Script"):
     st.experimental_rerun()
 
 # ----------------------------
-# 8. Topic Input and Script Generation
+# 6. Topic Input and Script Generation
 # ----------------------------
 topic_input = st.text_input("Enter the topic for your YouTube script:")
 
 if st.button("Generate Script") and topic_input:
-    with st.spinner("Generating script..."):
-        generated_script = generate_youtube_script(topic_input)
+    # Stream the script into a temporary placeholder; the preview below takes over once done
+    stream_placeholder = st.empty()
+    stream_placeholder.caption("Generating script...")
+    generated_script = generate_youtube_script(topic_input, VIDEO_TYPES[script_length], stream_placeholder)
+    stream_placeholder.empty()
     st.session_state.current_script = generated_script
+    st.session_state.current_topic = topic_input
     st.session_state.script_history.append(generated_script)
     st.success("Script generated successfully!")
 
 # ----------------------------
-# 9. Display the Generated Script and Download Option
+# 7. Display the Generated Script and Download Option
 # ----------------------------
 if st.session_state.current_script:
     st.subheader("Generated Script:")
@@ -341,7 +331,7 @@ if st.session_state.current_script:
             st.error(f"Could not generate PDF: {str(e)}")
 
 # ----------------------------
-# 10. Modify a Specific Paragraph
+# 8. Modify a Specific Paragraph
 # ----------------------------
 if st.session_state.current_script:
     st.subheader("Modify a Specific Paragraph")
@@ -359,9 +349,30 @@ if st.session_state.current_script:
             st.session_state.current_script = updated_full_script
             st.success("Paragraph updated!")
             st.experimental_rerun()
+        
+        # Or let the AI rewrite only this paragraph (the rest of the script is not regenerated)
+        instruction = st.text_input("What should change? (optional)", placeholder="e.g. make it funnier, add a stat")
+        if st.button("✨ Regenerate Paragraph with AI"):
+            with st.spinner("Rewriting paragraph..."):
+                try:
+                    revision = engine.revise(
+                        st.session_state.current_script,
+                        para_idx - 1,
+                        para_idx,
+                        topic=st.session_state.get("current_topic", ""),
+                        instruction=instruction,
+                        video_type=VIDEO_TYPES[script_length],
+                    )
+                except RuntimeError:
+                    revision = None
+                    st.error("Could not rewrite the paragraph, please try again.")
+            if revision:
+                st.session_state.current_script = revision.script
+                st.success("Paragraph regenerated!")
+                st.experimental_rerun()
 
 # ----------------------------
-# 11. Display Full Script History (if needed)
+# 9. Display Full Script History (if needed)
 # ----------------------------
 if st.session_state.script_history:
     st.subheader("Previously Generated Scripts:")
@@ -369,7 +380,7 @@ if st.session_state.script_history:
         st.text_area(f"Script {idx}", script, height=150)
 
 # ----------------------------
-# 12. Close App Button
+# 10. Close App Button
 # ----------------------------
 if st.sidebar.button("Close App"):
     st.warning("The app is closing...")
@@ -0,0 +1,70 @@
+// Service Worker for the GitHub Pages frontend (index.html)
+// Serves the static shell instantly from cache and refreshes it in the background.
+// API requests to the backend are never cached here: past scripts live in IndexedDB.
+
+const CACHE_NAME = 'techfela-shell-v1';
+const SHELL_URLS = [
+    './',
+    './index.html',
+    'https://cdnjs.cloudflare.com/ajax/libs/html2pdf.js/0.10.1/html2pdf.bundle.min.js'
+];
+
+// Install event - cache the app shell
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE_NAME)
+            .then(cache => cache.addAll(SHELL_URLS).catch(err => {
+                console.log('Service Worker: Some shell resources could not be cached:', err);
+            }))
+            .then(() => self.skipWaiting())
+    );
+});
+
+// Activate event - drop caches from older versions
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(cacheNames => Promise.all(
+                cacheNames
+                    .filter(cacheName => cacheName !== CACHE_NAME)
+                    .map(cacheName => caches.delete(cacheName))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+// Fetch event - stale-while-revalidate for the shell, network only for everything else
+self.addEventListener('fetch', event => {
+    const { request } = event;
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    const url = new URL(request.url);
+    const isShell = request.mode === 'navigate'
+        || (url.origin === self.location.origin && url.pathname.endsWith('.html'))
+        || SHELL_URLS.includes(request.url);
+    if (!isShell) {
+        return;
+    }
+
+    event.respondWith(
+        caches.open(CACHE_NAME).then(cache =>
+            cache.match(request, { ignoreSearch: request.mode === 'navigate' }).then(cached => {
+                const refresh = fetch(request)
+                    .then(response => {
+                        if (response.ok) {
+                            cache.put(request, response.clone());
+                        }
+                        return response;
+                    })
+                    .catch(() => cached || cache.match('./index.html'));
+                if (cached) {
+                    event.waitUntil(refresh);
+                    return cached;
+                }
+                return refresh;
+            })
+        )
+    );
+});